@@ -1,43 +1,79 @@
 """
-Path: main.py
-
+Path: app_flask.py
+Factory de la aplicación Flask. Para producción usar serve.py (waitress)
+o gunicorn con wsgi:app y gunicorn.conf.py.
 """
 
+import os
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
-from componente_flask.controllers.data_controller import data_controller
 from core.logs.config_logger import LoggerConfigurator
 
-# Configuración del logger al inicio del script
-logger = LoggerConfigurator().configure()
+# Configuración del logger al inicio del script (única vez en el proceso)
+logger_configurator = LoggerConfigurator()
+logger = logger_configurator.configure()
 logger.debug("Logger configurado correctamente al inicio del servidor.")
 
-# Cargar variables de entorno desde el archivo .env
-try:
+
+def create_app() -> Flask:
+    """
+    Crea la aplicación Flask, carga las variables de entorno desde .env
+    (si existe) y registra el blueprint del controlador.
+
+    Los servicios (cliente LLM, ModelConfig, DataService) no se crean aquí:
+    el ServiceContainer los construye en la primera solicitud de cada proceso,
+    de modo que la app puede precargarse antes del fork de los workers.
+    """
     logger.debug("Intentando cargar el archivo .env")
-    if not load_dotenv():
-        raise FileNotFoundError(".env file not found")
-    logger.debug(".env file cargado correctamente")
-except FileNotFoundError as e:
-    logger.error("Error loading .env file: %s", e)
-    logger.debug("Asegúrate de que el archivo .env existe en el directorio raíz del proyecto")
-    print("Please create a .env file with the necessary environment variables.")
-    exit(1)
-
-app = Flask(__name__)
-CORS(app)
-
-# Registrar el blueprint del controlador
-try:
+    if load_dotenv():
+        logger.debug(".env file cargado correctamente")
+    else:
+        logger.warning("No se encontró el archivo .env; se usan las variables de entorno del proceso.")
+
+    # El controlador se importa después de cargar .env porque lee su configuración al importarse
+    from componente_flask.controllers.data_controller import data_controller
+    from componente_flask.request_tracing import init_tracing
+    from core.observability.metrics import configure_metrics, register_gauges
+    from core.services.service_container import ServiceContainer
+
+    app = Flask(__name__)
+    # Límite global para cuerpos sin Content-Length (chunked); el controlador
+    # rechaza antes los que declaran un tamaño mayor al de cada ruta
+    max_request_bytes = int(os.getenv('MAX_REQUEST_BYTES', '16384'))
+    app.config['MAX_CONTENT_LENGTH'] = max_request_bytes * int(os.getenv('BATCH_MAX_ITEMS', '100'))
+    CORS(app)
+    app.extensions['madybot_services'] = ServiceContainer()
+    # Con METRICS_DIR, metrics/ suma las métricas de todos los workers
+    configure_metrics(os.getenv('METRICS_DIR') or None, float(os.getenv('METRICS_FLUSH_INTERVAL', '5')))
+    register_gauges("log_queue", logger_configurator.queue_stats)
+    init_tracing(app)
+
+    # Registrar el blueprint del controlador
     app.register_blueprint(data_controller)
     logger.info("Blueprint registrado correctamente.")
-except Exception as e:
-    logger.error("Error al registrar el blueprint: %s", e)
-    exit(1)
+    return app
 
 
 if __name__ == '__main__':
+    # Cargar variables de entorno desde el archivo .env
+    try:
+        logger.debug("Intentando cargar el archivo .env")
+        if not load_dotenv():
+            raise FileNotFoundError(".env file not found")
+        logger.debug(".env file cargado correctamente")
+    except FileNotFoundError as e:
+        logger.error("Error loading .env file: %s", e)
+        logger.debug("Asegúrate de que el archivo .env existe en el directorio raíz del proyecto")
+        print("Please create a .env file with the necessary environment variables.")
+        exit(1)
+
+    try:
+        app = create_app()
+    except Exception as e:
+        logger.error("Error al registrar el blueprint: %s", e)
+        exit(1)
+
     try:
         app.run(host='0.0.0.0', port=5000)
         logger.info("Servidor configurado para HTTP.")
@@ -0,0 +1,120 @@
+"""
+Path: benchmarks/bench_admission.py
+Mide el control de admisión con tráfico de replay (en el mismo proceso, con
+FakeLLMClient): un usuario inunda receive-data/ mientras otros envían a un
+ritmo normal. Sin admisión el usuario abusivo se queda con casi todas las
+llamadas al modelo; con admisión debe quedar acotado a su ráfaga más su tasa
+y los demás no deben ser rechazados. También mide el costo de admit() con los
+backends en memoria y SQLite.
+
+Uso:
+    python -m benchmarks.bench_admission [--seconds 4] [--rate 50] [--users 10]
+
+Termina con código 1 si la admisión no es justa.
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks import replay
+from core.services.admission import AdmissionController, MemoryBucketBackend, RateLimitedError, SQLiteBucketBackend
+
+PAYLOADS = os.path.join(os.path.dirname(__file__), "payloads.sample.jsonl")
+FLOODER = "flooder"
+USER_RATE, USER_BURST = 1.0, 5.0
+
+def traffic(seconds: float, rate: float, users: int):
+    """
+    Payloads del replay reasignados: cuatro de cada cinco son del usuario
+    abusivo y el resto se reparte entre `users` usuarios normales.
+    """
+    templates = itertools.cycle(list(replay.read_payloads(PAYLOADS)))
+    normal = itertools.cycle(f"usuario-{index}" for index in range(users))
+    for index in range(int(seconds * rate)):
+        payload = dict(next(templates), stream=False)
+        user_id = FLOODER if index % 5 else next(normal)
+        payload["user_data"] = dict(payload["user_data"], id=user_id)
+        yield payload
+
+def run_replay(args, admission: bool):
+    os.environ["ADMISSION_ENABLED"] = "true" if admission else "false"
+    os.environ["ADMISSION_USER_RATE"] = str(USER_RATE)
+    os.environ["ADMISSION_USER_BURST"] = str(USER_BURST)
+    os.environ["LLM_COALESCE_ENABLED"] = "false"
+    sender_args = argparse.Namespace(llm_latency=0.005, llm_tokens_per_second=0.0, llm_response_tokens=0, verbose=False)
+    send = replay.build_in_process_sender(os.getenv('ROOT_API', '/') + 'receive-data/', sender_args)
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def send_and_count(payload):
+        status = send(payload)
+        with lock:
+            outcomes[(payload["user_data"]["id"] == FLOODER, status)] += 1
+        return status
+
+    latencies, statuses, duration = replay.replay(traffic(args.seconds, args.rate, args.users), send_and_count,
+                                                  concurrency=8, rate=args.rate)
+    return outcomes, replay.summarize(latencies, statuses, duration), duration
+
+def admit_cost(backend, threads: int, calls: int) -> float:
+    """
+    Microsegundos por admit() con `threads` hilos y 1000 usuarios.
+    """
+    controller = AdmissionController(backend, user_rate=1e6, user_burst=1e6, global_rate=1e6, global_burst=1e6)
+
+    def work(offset):
+        for index in range(calls):
+            try:
+                controller.admit(f"usuario-{(offset * 7919 + index) % 1000}")
+            except RateLimitedError:
+                pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(work, range(threads)))
+    return (time.perf_counter() - start) / (threads * calls) * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--rate", type=float, default=50.0, help="solicitudes por segundo del replay")
+    parser.add_argument("--users", type=int, default=10, help="usuarios normales")
+    args = parser.parse_args()
+    failures = []
+
+    for admission in (False, True):
+        outcomes, summary, duration = run_replay(args, admission)
+        flooder_ok = outcomes[(True, 200)]
+        normal_ok = outcomes[(False, 200)]
+        normal_rejected = sum(count for (flooder, status), count in outcomes.items() if not flooder and status != 200)
+        share = flooder_ok / (flooder_ok + normal_ok) if flooder_ok + normal_ok else 0.0
+        print(f"admisión {'sí' if admission else 'no'}: abusivo {flooder_ok} admitidas "
+              f"({share:.0%} de las llamadas al modelo), normales {normal_ok} admitidas / {normal_rejected} rechazadas; "
+              f"p50 {summary['p50_ms']} ms, estados {summary['statuses']}")
+        if admission:
+            allowed = USER_BURST + USER_RATE * duration + 1
+            if flooder_ok > allowed:
+                failures.append(f"el abusivo superó su límite ({flooder_ok} > {allowed:.0f})")
+            if normal_rejected:
+                failures.append(f"{normal_rejected} solicitudes normales rechazadas")
+    logging.getLogger("app_logger").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, backend in (("memoria", MemoryBucketBackend()),
+                              ("sqlite", SQLiteBucketBackend(os.path.join(directory, "admission.sqlite3")))):
+            calls = 20000 if name == "memoria" else 2000
+            print(f"admit() {name:8s}: {admit_cost(backend, 1, calls):7.2f} us (1 hilo), "
+                  f"{admit_cost(backend, 8, calls // 8):7.2f} us (8 hilos)")
+
+    print("OK" if not failures else "FALLA: " + "; ".join(failures))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
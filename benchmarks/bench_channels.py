@@ -0,0 +1,121 @@
+"""
+Path: benchmarks/bench_channels.py
+Mide WebhookMessagingChannel contra el stub local de webhooks: compara el
+tiempo que send_message retiene al hilo de la solicitud frente a un POST
+síncrono por mensaje, el throughput con lotes por chat, y verifica el orden
+por chat, los reintentos ante 503, el rechazo con cola llena y la partición
+de respuestas largas.
+
+Uso:
+    python -m benchmarks.bench_channels [--messages 2000] [--chats 50] [--latency 0.01]
+
+Termina con código 1 si alguna verificación falla.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.checks import check
+from benchmarks.webhook_stub import WebhookStubServer
+from core.channels.outbound_dispatcher import OutboundQueueFullError
+from core.channels.webhook_channel import WebhookMessagingChannel
+
+def send_all(send, messages: int, chats: int) -> float:
+    """
+    Envía `messages` mensajes repartidos en `chats` chats desde 8 hilos (los
+    de cada chat en orden, desde un mismo hilo) y retorna los microsegundos
+    por send() que se retiene a quien llama.
+    """
+    def work(chat):
+        durations = []
+        for index in range(messages // chats):
+            start = time.perf_counter()
+            send(f"chat-{chat}", f"mensaje {index}")
+            durations.append(time.perf_counter() - start)
+        return durations
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        durations = [duration for chat in executor.map(work, range(chats)) for duration in chat]
+    return sum(durations) / len(durations) * 1e6
+
+def in_order(stub: WebhookStubServer, chats: int, per_chat: int) -> bool:
+    return all(
+        stub.messages[f"chat-{chat}"] == [f"mensaje {index}" for index in range(per_chat)]
+        for chat in range(chats)
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01, help="latencia del stub por POST (s)")
+    args = parser.parse_args()
+    failures = []
+
+    # Referencia: un POST síncrono por mensaje en el hilo de la solicitud
+    with WebhookStubServer(latency=args.latency) as stub:
+        session = requests.Session()
+        start = time.perf_counter()
+        sync_us = send_all(lambda chat_id, text: session.post(stub.url, json={"chat_id": chat_id, "messages": [text]}),
+                           args.messages, args.chats)
+        duration = time.perf_counter() - start
+        print(f"POST síncrono: {sync_us:9.1f} us por mensaje, {args.messages / duration:7.0f} mensajes/s "
+              f"({stub.requests} POST)")
+
+    with WebhookStubServer(latency=args.latency) as stub:
+        channel = WebhookMessagingChannel(stub.url, workers=4, max_queue=args.messages)
+        start = time.perf_counter()
+        queued_us = send_all(lambda chat_id, text: channel.send_message(text, chat_id=chat_id), args.messages, args.chats)
+        flushed = channel.dispatcher.flush(timeout=60)
+        duration = time.perf_counter() - start
+        stats = channel.stats()
+        print(f"cola + lotes:  {queued_us:9.1f} us por mensaje, {args.messages / duration:7.0f} mensajes/s "
+              f"({stub.requests} POST)")
+        check("entrega", flushed and stats["sent_total"] == args.messages and in_order(
+            stub, args.chats, args.messages // args.chats),
+              f"{stub.received()} de {args.messages} mensajes, en orden por chat", failures)
+        channel.close()
+
+    # Reintentos: los 503 se reintentan y el mensaje llega una sola vez
+    with WebhookStubServer() as stub:
+        channel = WebhookMessagingChannel(stub.url, backoff_base=0.01)
+        stub.fail_next(2, 503)
+        channel.send_message("hola", chat_id="chat-0")
+        channel.dispatcher.flush()
+        stats = channel.stats()
+        check("reintentos", stub.messages["chat-0"] == ["hola"] and stats["retries_total"] == 2,
+              f"{stats['retries_total']} reintentos, recibido {stub.messages['chat-0']}", failures)
+        channel.close()
+
+    # Contrapresión: con la cola llena send_message falla de inmediato
+    with WebhookStubServer(latency=0.2) as stub:
+        channel = WebhookMessagingChannel(stub.url, workers=1, max_queue=10, max_batch=1)
+        rejected = 0
+        start = time.perf_counter()
+        for index in range(50):
+            try:
+                channel.send_message(f"mensaje {index}", chat_id="chat-0")
+            except OutboundQueueFullError:
+                rejected += 1
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        check("contrapresión", rejected >= 30 and elapsed_ms < 100,
+              f"{rejected} de 50 rechazados en {elapsed_ms:.1f} ms", failures)
+        channel.close(timeout=0)
+
+    # Respuestas largas: fragmentos de hasta max_chars que reconstruyen el texto
+    with WebhookStubServer() as stub:
+        channel = WebhookMessagingChannel(stub.url, max_chars=4096)
+        text = "\n\n".join(f"Párrafo {index}. " + "texto de la respuesta " * 40 for index in range(30))
+        channel.send_message(text, chat_id="chat-0")
+        channel.dispatcher.flush()
+        chunks = stub.messages["chat-0"]
+        check("partición", len(chunks) > 1 and max(map(len, chunks)) <= 4096 and "".join(chunks) == text,
+              f"{len(text)} caracteres en {len(chunks)} fragmentos", failures)
+        channel.close()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
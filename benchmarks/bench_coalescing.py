@@ -0,0 +1,148 @@
+"""
+Path: benchmarks/bench_coalescing.py
+Verifica CoalescingLLMClient con FakeLLMClient: una ráfaga de prompts idénticos
+sin sesión debe producir una sola llamada al modelo (en modo normal y en
+streaming), los errores y las esperas vencidas deben llegar a todos los
+seguidores y las conversaciones con sesión no deben agruparse. También
+verifica lo mismo a través de la ruta receive-data/: las solicitudes con
+"stateless": true se agrupan y las demás no.
+
+Uso:
+    python -m benchmarks.bench_coalescing [--burst 50] [--latency 0.2]
+
+Termina con código 1 si alguna verificación falla.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.checks import check
+from core.observability.metrics import collect_gauges
+from core.services.llm_coalescing import CoalescingLLMClient
+from core.services.llm_dispatcher import LLMOverloadedError
+from core.services.llm_impl.fake_llm import FakeLLMClient
+
+PROMPT_VARIANTS = ["¿Cuál es el horario?", "¿cual es el  horario?", "  ¿CUÁL es el horario? "]
+
+def burst(size: int, call):
+    """
+    Ejecuta `call(index)` en `size` hilos que arrancan a la vez. Retorna el
+    resultado o la excepción de cada uno y la duración total.
+    """
+    barrier = threading.Barrier(size)
+
+    def run(index):
+        barrier.wait()
+        try:
+            return call(index)
+        except Exception as e:
+            return e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        results = list(executor.map(run, range(size)))
+    return results, time.perf_counter() - start
+
+def coalescing_gauges() -> dict:
+    return {gauge["name"]: gauge["value"] for gauge in collect_gauges() if gauge["name"].startswith("llm_coalescing_")}
+
+def check_route(args, failures: list) -> None:
+    """
+    Envía ráfagas de solicitudes idénticas de distintos usuarios a receive-data/
+    (en el mismo proceso, con FakeLLMClient), con y sin "stateless".
+    """
+    from benchmarks import replay
+
+    os.environ["LLM_COALESCE_ENABLED"] = "true"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["ADMISSION_ENABLED"] = "false"
+    sender_args = argparse.Namespace(llm_latency=args.latency, llm_tokens_per_second=0.0, llm_response_tokens=0,
+                                     verbose=False)
+    send = replay.build_in_process_sender(os.getenv('ROOT_API', '/') + 'receive-data/', sender_args)
+
+    def payload(index: int, stateless: bool) -> dict:
+        return {"prompt_user": PROMPT_VARIANTS[index % 3], "stream": index % 2 == 0, "stateless": stateless,
+                "user_data": {"id": f"usuario-{index}", "browserData": {
+                    "userAgent": "Mozilla/5.0", "screenResolution": "1920x1080", "language": "es-AR",
+                    "platform": "Win32"}},
+                "datetime": 1737400000}
+
+    results, duration = burst(args.burst, lambda i: send(payload(i, True)))
+    stats = coalescing_gauges()
+    check("ruta sin historial", results == [200] * args.burst and stats.get("llm_coalescing_issued_total") == 2,
+          f"{stats.get('llm_coalescing_issued_total')} llamada(s) (normal y streaming) para {args.burst} solicitudes "
+          f"en {duration:.2f}s", failures)
+
+    results, _ = burst(10, lambda i: send(payload(i, False)))
+    bypassed = coalescing_gauges().get("llm_coalescing_bypassed_total")
+    check("ruta con sesión", results == [200] * 10 and bypassed == 10, f"{bypassed} llamadas sin agrupar", failures)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    failures = []
+
+    # Modo normal: sin agrupar, una llamada por solicitud
+    fake = FakeLLMClient(response_text="respuesta", first_chunk_delay=args.latency)
+    results, duration = burst(args.burst, lambda i: fake.send_message(PROMPT_VARIANTS[i % 3]))
+    print(f"sin agrupar: {args.burst} llamadas al modelo en {duration:.2f}s")
+
+    client = CoalescingLLMClient(FakeLLMClient(response_text="respuesta", first_chunk_delay=args.latency))
+    results, duration = burst(args.burst, lambda i: client.send_message(PROMPT_VARIANTS[i % 3]))
+    stats = client.stats()
+    check("normal", all(result == "respuesta" for result in results) and stats["issued_total"] == 1,
+          f"{stats['issued_total']} llamada(s) para {args.burst} solicitudes en {duration:.2f}s", failures)
+
+    # Streaming: todos reciben el stream completo, aunque el líder y algunos seguidores lo abandonen
+    text = "fragmento " * 40
+    client = CoalescingLLMClient(FakeLLMClient(response_text=text, chunk_size=8, first_chunk_delay=args.latency,
+                                               chunk_delay=0.002))
+
+    def stream(index):
+        chunks = client.stream_message(PROMPT_VARIANTS[index % 3])
+        if index % 10 == 0:
+            next(chunks)
+            chunks.close()
+            return None
+        return "".join(chunks)
+
+    results, duration = burst(args.burst, stream)
+    complete = [result for result in results if result is not None]
+    stats = client.stats()
+    check("streaming", all(result == text for result in complete) and stats["issued_total"] == 1
+          and stats["in_flight"] == 0,
+          f"{len(complete)} streams completos, {stats['issued_total']} llamada(s) en {duration:.2f}s", failures)
+
+    # Errores: todos los seguidores reciben el error del líder y la siguiente ráfaga vuelve a llamar
+    client = CoalescingLLMClient(FakeLLMClient(first_chunk_delay=args.latency, scripted_failures=[True, False]))
+    results, _ = burst(args.burst, lambda i: client.send_message("hola"))
+    failed = all(isinstance(result, RuntimeError) for result in results)
+    retry = client.send_message("hola")
+    check("errores", failed and retry.endswith("hola") and client.stats()["issued_total"] == 2,
+          f"{sum(isinstance(r, RuntimeError) for r in results)} errores propagados; reintento '{retry}'", failures)
+
+    # Esperas vencidas: el líder termina, los seguidores reciben LLMOverloadedError
+    client = CoalescingLLMClient(FakeLLMClient(response_text="lento", first_chunk_delay=1.0), follower_timeout=0.2)
+    results, _ = burst(10, lambda i: client.send_message("hola"))
+    overloaded = sum(isinstance(result, LLMOverloadedError) for result in results)
+    check("timeouts", overloaded == 9 and results.count("lento") == 1 and client.stats()["timeouts_total"] == 9,
+          f"{overloaded} seguidores con LLMOverloadedError", failures)
+
+    # Con sesión no se agrupa
+    client = CoalescingLLMClient(FakeLLMClient(response_text="ok", first_chunk_delay=0.05))
+    burst(10, lambda i: client.send_message("hola", session_id=f"usuario-{i}"))
+    stats = client.stats()
+    check("sesiones", stats["bypassed_total"] == 10 and stats["issued_total"] == 0,
+          f"{stats['bypassed_total']} llamadas sin agrupar", failures)
+
+    check_route(args, failures)
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Path: benchmarks/bench_conversation_store.py
+Mide SQLConversationRepository sobre SQLite: compara el tiempo que el hilo de
+la solicitud pasa en record_turn (solo encola) con una inserción síncrona por
+turno, y verifica que se escriban todas las filas por lotes y que una sesión
+nueva de ChatSessionStore recupere el historial persistido.
+
+Uso:
+    python -m benchmarks.bench_conversation_store [--turns 2000] [--threads 8]
+
+Termina con código 1 si alguna verificación falla.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.checks import check
+from core.services.conversation_store import SQLConversationRepository, conversation_turns
+from core.services.session_store import ChatSessionStore
+
+BROWSER_DATA = {"userAgent": "Mozilla/5.0", "screenResolution": "1920x1080", "language": "es-ES", "platform": "Linux"}
+
+def run(turns: int, threads: int, record) -> float:
+    """
+    Registra `turns` turnos repartidos en `threads` hilos y retorna la latencia
+    media por turno en microsegundos.
+    """
+    def work(index):
+        start = time.perf_counter()
+        record(f"usuario-{index % 50}", f"pregunta {index}", f"respuesta {index}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        durations = list(executor.map(work, range(turns)))
+    return sum(durations) / len(durations) * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    failures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Referencia: una transacción por turno en el hilo de la solicitud
+        sync_repo = SQLConversationRepository("sqlite:///" + os.path.join(directory, "sync.sqlite3"))
+
+        def insert_now(user_id, prompt, response):
+            with sync_repo.engine.begin() as connection:
+                connection.execute(conversation_turns.insert(), {
+                    "user_id": user_id, "prompt": prompt, "response": response, "created_at": time.time()
+                })
+
+        sync_us = run(args.turns, args.threads, insert_now)
+        sync_repo.close()
+        print(f"inserción síncrona:  {sync_us:9.1f} us por turno")
+
+        repository = SQLConversationRepository("sqlite:///" + os.path.join(directory, "batched.sqlite3"))
+        start = time.perf_counter()
+        batched_us = run(args.turns, args.threads,
+                         lambda user_id, prompt, response: repository.record_turn(
+                             user_id, prompt, response, browser_data=BROWSER_DATA, instruction="default"))
+        flushed = repository.flush(timeout=30)
+        total = time.perf_counter() - start
+        stats = repository.stats()
+        print(f"escritura por lotes: {batched_us:9.1f} us por turno "
+              f"({stats['batches_total']} lotes, todo escrito en {total:.2f}s)")
+        check("escritura", flushed and stats["written_total"] == args.turns and stats["dropped_total"] == 0,
+              f"{stats['written_total']} de {args.turns} filas escritas", failures)
+
+        # Una sesión nueva (otro worker o tras desalojarla) recupera los últimos turnos
+        store = ChatSessionStore(max_history_turns=5, history_loader=repository.load_history)
+        with store.session("usuario-7") as entry:
+            prompts = [content["parts"][0] for content in entry.history if content["role"] == "user"]
+        expected = [f"pregunta {index}" for index in range(7, args.turns, 50)][-5:]
+        check("historial", prompts == expected, f"{len(prompts)} turnos recuperados, último '{prompts[-1:]}'",
+              failures)
+        repository.close()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Path: benchmarks/bench_hot_path.py
+Microbenchmarks de cada etapa del camino de una solicitud a receive-data/
+(validación, canal, DataService, render y logging) usando FakeLLMClient.
+
+Los resultados se comparan con la línea base guardada en
+benchmarks/baseline_hot_path.json y el proceso termina con código 1 si alguna
+etapa empeora más que el umbral indicado.
+
+Uso:
+    python -m benchmarks.bench_hot_path                    # compara con la línea base
+    python -m benchmarks.bench_hot_path --update-baseline  # guarda una nueva línea base
+    python -m benchmarks.bench_hot_path --threshold 0.5    # tolera hasta +50%
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+BASELINE_PATH = Path(__file__).with_name("baseline_hot_path.json")
+
+PAYLOAD = {
+    "prompt_user": "¿Cuál es el horario de atención?",
+    "stream": False,
+    "user_data": {
+        "id": "bench-user",
+        "browserData": {
+            "userAgent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+            "screenResolution": "1920x1080",
+            "language": "es-AR",
+            "platform": "Win32"
+        }
+    },
+    "datetime": 1737400000
+}
+
+def measure(func: Callable[[], object], loops: int, rounds: int) -> float:
+    """
+    Ejecuta `func` `loops` veces por ronda y retorna la mediana del costo
+    por llamada (en microsegundos) entre las rondas.
+    """
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - start) / loops * 1e6)
+    return statistics.median(per_call)
+
+def build_stages() -> Dict[str, Callable[[], object]]:
+    os.environ['LLM_PROVIDER'] = 'fake'
+    # Perfil de logging fijo para que las mediciones sean comparables con la línea base
+    os.environ['IS_DEVELOPMENT'] = 'false'
+    os.environ['FAKE_LLM_FIRST_CHUNK_DELAY'] = '0'
+    os.environ['LLM_CACHE_ENABLED'] = 'false'
+    os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+
+    from app_flask import create_app
+    from componente_flask.views.data_view import render_json_response, render_static_json_response
+
+    # Los handlers escriben a /dev/null: se mide el costo de formatear y
+    # filtrar los registros, no el de la terminal.
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+
+    app = create_app()
+    client = app.test_client()
+    data_service = app.extensions['madybot_services'].data_service
+    logger = logging.getLogger("app_logger")
+    receive_data_path = os.getenv('ROOT_API', '/') + 'receive-data/'
+    valid_data = data_service.validator.validate(copy.deepcopy(PAYLOAD))
+
+    return {
+        "validate": lambda: data_service.validator.validate(PAYLOAD),
+        "channel_receive_message": lambda: data_service.channel.receive_message(valid_data),
+        "log_request_json": lambda: logger.info("Request JSON: \n| %s \n", PAYLOAD),
+        "process_incoming_data": lambda: data_service.process_incoming_data(PAYLOAD),
+        # El render ya no usa jsonify, por lo que no necesita contexto de solicitud
+        "render_json_response": lambda: render_json_response(200, "Respuesta simulada."),
+        "render_static_json_response": lambda: render_static_json_response(200, "El servidor está operativo."),
+        "receive_data_end_to_end": lambda: client.post(receive_data_path, json=PAYLOAD),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loops", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.30,
+                        help="Empeoramiento relativo tolerado respecto de la línea base.")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    stages = build_stages()
+    results = {name: round(measure(func, args.loops, args.rounds), 2) for name, func in stages.items()}
+
+    if args.update_baseline or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(results, indent=4) + "\n", encoding='utf-8')
+        for name, value in results.items():
+            print(f"{name:<26} {value:>10.2f} us")
+        print(f"Línea base guardada en {BASELINE_PATH}")
+        return 0
+
+    baseline = json.loads(BASELINE_PATH.read_text(encoding='utf-8'))
+    regressions = []
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<26} {value:>10.2f} us  (sin línea base)")
+            continue
+        change = (value - reference) / reference
+        flag = "REGRESIÓN" if change > args.threshold else ""
+        print(f"{name:<26} {value:>10.2f} us  base={reference:>10.2f} us  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+
+    if regressions:
+        print(f"Etapas con regresión mayor a {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Path: benchmarks/bench_jobs.py
+Compara receive-data/ en modo normal y en modo job con respuestas largas:
+levanta gunicorn con FakeLLMClient lento, pocos workers de un hilo y
+JOBS_BACKEND=sqlite, y mide cuánto tarda health-check mientras se procesan
+las solicitudes. En modo job los workers HTTP quedan libres y cada job se
+consulta en jobs/<id>/ (desde cualquier worker) hasta que termina.
+
+Uso (Linux/macOS):
+    python -m benchmarks.bench_jobs [--workers 2] [--requests 8] [--seconds 2]
+
+Termina con código 1 si algún job no termina, no expone salida parcial o
+health-check no responde rápido en modo job.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_hot_path import PAYLOAD
+from benchmarks.bench_serving import ROOT, free_port, server_command, wait_until_ready
+
+RESPONSE_TOKENS = 400
+
+def request_json(url: str, payload: dict = None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return response.status, json.loads(response.read())
+
+def probe_health(base_url: str, stop: threading.Event) -> list:
+    """
+    Mide health-check cada 50 ms hasta que se active `stop`; retorna las latencias en ms.
+    """
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        urllib.request.urlopen(base_url + "/health-check/", timeout=120).read()
+        latencies.append((time.perf_counter() - start) * 1e3)
+        time.sleep(0.05)
+    return latencies
+
+def with_probe(base_url: str, work):
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        probe = executor.submit(probe_health, base_url, stop)
+        start = time.perf_counter()
+        result = work()
+        duration = time.perf_counter() - start
+        stop.set()
+        return result, duration, max(probe.result())
+
+def run_sync(base_url: str, count: int):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(lambda _: request_json(base_url + "/receive-data/", PAYLOAD), range(count)))
+
+def run_jobs(base_url: str, count: int):
+    """
+    Encola `count` jobs y los consulta hasta que terminan. Retorna la latencia
+    máxima de encolado, los jobs finales y si alguno mostró salida parcial.
+    """
+    submits, job_ids = [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        status, body = request_json(base_url + "/receive-data/?mode=job", PAYLOAD)
+        submits.append((time.perf_counter() - start) * 1e3)
+        job_ids.append(body["id"] if status == 202 else None)
+
+    finished, saw_partial = {}, False
+    deadline = time.time() + 120
+    while len(finished) < count and time.time() < deadline:
+        for job_id in job_ids:
+            if job_id is None or job_id in finished:
+                continue
+            _, job = request_json(f"{base_url}/jobs/{job_id}/")
+            if job["status"] == "running" and job["partial"]:
+                saw_partial = True
+            if job["status"] in ("done", "failed"):
+                finished[job_id] = job
+        time.sleep(0.1)
+    return max(submits), list(finished.values()), saw_partial
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=2.0, help="duración de cada respuesta simulada")
+    args = parser.parse_args()
+    failures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        env = dict(os.environ, LLM_PROVIDER="fake", IS_DEVELOPMENT="false", WEB_CONCURRENCY=str(args.workers),
+                   SERVER_THREADS="1", FAKE_LLM_RESPONSE_TOKENS=str(RESPONSE_TOKENS),
+                   FAKE_LLM_TOKENS_PER_SECOND=str(RESPONSE_TOKENS / args.seconds),
+                   JOBS_BACKEND="sqlite", JOBS_PATH=os.path.join(directory, "jobs.sqlite3"),
+                   JOBS_MAX_WORKERS=str(args.requests))
+        process = subprocess.Popen(server_command("gunicorn", port), cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_ready(base_url)
+            results, duration, health_ms = with_probe(base_url, lambda: run_sync(base_url, args.requests))
+            print(f"modo normal: {len(results)} respuestas en {duration:.2f}s; health-check máx {health_ms:.0f} ms")
+
+            (submit_ms, jobs, saw_partial), duration, health_ms = with_probe(
+                base_url, lambda: run_jobs(base_url, args.requests))
+            done = [job for job in jobs if job["status"] == "done" and job["result"]]
+            print(f"modo job:    {len(done)} jobs completos en {duration:.2f}s; encolado máx {submit_ms:.0f} ms; "
+                  f"health-check máx {health_ms:.0f} ms; salida parcial {'sí' if saw_partial else 'no'}")
+            if len(done) != args.requests:
+                failures.append("jobs incompletos")
+            if not saw_partial:
+                failures.append("sin salida parcial")
+            if health_ms > args.seconds * 1e3 / 2:
+                failures.append("health-check lento en modo job")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print("OK" if not failures else "FALLA: " + ", ".join(failures))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
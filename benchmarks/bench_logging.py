@@ -0,0 +1,48 @@
+"""
+Path: benchmarks/bench_logging.py
+Compara las solicitudes por segundo del servidor (en proceso, con FakeLLMClient)
+usando el perfil de logging 'development' y el perfil 'production'
+(payloads resumidos y escritura desde un hilo en segundo plano).
+
+Uso:
+    python -m benchmarks.bench_logging [--repeat 200] [--concurrency 8]
+
+Cada perfil se ejecuta en un subproceso nuevo porque LoggerConfigurator
+configura el logging una sola vez por proceso. La salida de los logs se
+descarta para medir el costo del pipeline y no el de la terminal.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SAMPLE_PAYLOADS = Path(__file__).with_name("payloads.sample.jsonl")
+
+def run_profile(profile: str, args) -> dict:
+    env = dict(os.environ, LOG_PROFILE=profile)
+    command = [
+        sys.executable, "-m", "benchmarks.replay", str(args.jsonl),
+        "--repeat", str(args.repeat), "--concurrency", str(args.concurrency),
+        "--json", "--verbose",
+    ]
+    completed = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, check=True, cwd=Path(__file__).resolve().parent.parent)
+    return json.loads(completed.stdout[completed.stdout.index("{"):])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jsonl", default=SAMPLE_PAYLOADS)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    for profile in ("development", "production"):
+        summary = run_profile(profile, args)
+        print(f"{profile:<12} {summary['throughput_rps']:>9} req/s  "
+              f"p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms")
+
+if __name__ == "__main__":
+    main()
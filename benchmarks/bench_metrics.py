@@ -0,0 +1,122 @@
+"""
+Path: benchmarks/bench_metrics.py
+Verifica la agregación de métricas entre workers de gunicorn: levanta el
+servidor con FakeLLMClient y varios workers que se reciclan cada pocas
+solicitudes (GUNICORN_MAX_REQUESTS), envía solicitudes y comprueba que
+metrics/ cuente todas y que el total nunca retroceda entre lecturas. También
+verifica que los gauges de proporciones, promedios y máximos no se sumen
+entre workers.
+
+Uso (Linux/macOS):
+    python -m benchmarks.bench_metrics [--workers 3] [--requests 600] [--max-requests 50]
+
+Termina con código 1 si el total no coincide o retrocede, o si un gauge se
+combina mal.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_hot_path import PAYLOAD
+from benchmarks.bench_serving import ROOT, free_port, server_command, wait_until_ready
+from core.observability.metrics import _aggregate_gauges
+
+_OK_REQUESTS = re.compile(r'^madybot_http_requests_total\{route="data_controller.receive_data",status="200"\} (\S+)$', re.M)
+
+def scrape(base_url: str) -> str:
+    with urllib.request.urlopen(base_url + "/metrics/", timeout=10) as response:
+        return response.read().decode("utf-8")
+
+def ok_requests(text: str) -> float:
+    match = _OK_REQUESTS.search(text)
+    return float(match.group(1)) if match else 0.0
+
+def post(base_url: str) -> int:
+    request = urllib.request.Request(
+        base_url + "/receive-data/", data=json.dumps(PAYLOAD).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+        return response.status
+
+def check_gauge_aggregation() -> int:
+    """
+    Combina los gauges de tres workers simulados y retorna la cantidad de
+    series con un valor distinto del esperado.
+    """
+    workers = [
+        {"llm_cache_hit_ratio": 0.5, "llm_dispatcher_wait_time_avg": 0.1, "llm_dispatcher_wait_time_max": 0.4,
+         "gemini_transport_reuse_ratio": 0.9, "llm_dispatcher_in_flight": 2},
+        {"llm_cache_hit_ratio": 0.7, "llm_dispatcher_wait_time_avg": 0.3, "llm_dispatcher_wait_time_max": 1.2,
+         "gemini_transport_reuse_ratio": 0.8, "llm_dispatcher_in_flight": 3},
+        {"llm_cache_hit_ratio": 0.9, "llm_dispatcher_wait_time_avg": 0.2, "llm_dispatcher_wait_time_max": 0.8,
+         "gemini_transport_reuse_ratio": 1.0, "llm_dispatcher_in_flight": 1},
+    ]
+    expected = {"llm_cache_hit_ratio": 0.7, "llm_dispatcher_wait_time_avg": 0.2, "llm_dispatcher_wait_time_max": 1.2,
+                "gemini_transport_reuse_ratio": 0.9, "llm_dispatcher_in_flight": 6}
+    gauges = [{"name": name, "labels": {}, "value": value} for worker in workers for name, value in worker.items()]
+    failures = 0
+    for entry in _aggregate_gauges(gauges):
+        if abs(entry["value"] - expected[entry["name"]]) > 1e-9:
+            failures += 1
+            print(f"GAUGE {entry['name']}: {entry['value']} (se esperaba {expected[entry['name']]})")
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--max-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ, LLM_PROVIDER="fake", IS_DEVELOPMENT="false", WEB_CONCURRENCY=str(args.workers),
+               SERVER_THREADS="4", GUNICORN_MAX_REQUESTS=str(args.max_requests), METRICS_FLUSH_INTERVAL="1")
+    env.pop("METRICS_DIR", None)
+    process = subprocess.Popen(server_command("gunicorn", port), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    failures = check_gauge_aggregation()
+    try:
+        wait_until_ready(base_url)
+        previous = 0.0
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [executor.submit(post, base_url) for _ in range(args.requests)]
+            # Lecturas mientras los workers se reciclan: el total no debe retroceder
+            while not all(future.done() for future in futures):
+                current = ok_requests(scrape(base_url))
+                if current < previous:
+                    failures += 1
+                    print(f"RETROCESO: {previous} -> {current}")
+                previous = current
+                time.sleep(0.05)
+            statuses = [future.result() for future in futures]
+
+        # Los workers que no atienden la lectura vuelcan sus métricas cada METRICS_FLUSH_INTERVAL
+        time.sleep(1.5)
+        start = time.perf_counter()
+        text = scrape(base_url)
+        scrape_ms = (time.perf_counter() - start) * 1e3
+        total = ok_requests(text)
+        expected = statuses.count(200)
+        print(f"solicitudes 200: enviadas={expected} metrics={total:.0f}  (lectura de metrics/ {scrape_ms:.1f} ms)")
+        if total != expected:
+            failures += 1
+        in_flight = re.search(r"^madybot_llm_dispatcher_in_flight (\S+)$", text, re.M)
+        print(f"llm_dispatcher_in_flight={in_flight.group(1) if in_flight else 'n/d'}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    print("OK" if not failures else f"{failures} errores")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
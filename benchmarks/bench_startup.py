@@ -0,0 +1,74 @@
+"""
+Path: benchmarks/bench_startup.py
+Mide el arranque en frío: tiempo de importación de app_flask (con -X importtime),
+de create_app() y de la primera solicitud, que es cuando el ServiceContainer
+construye el cliente LLM.
+
+Uso:
+    python -m benchmarks.bench_startup [--provider fake|gemini] [--top 10]
+
+Con --provider gemini se incluye el import del SDK de Gemini en la primera
+solicitud (requiere GEMINI_API_KEY y config/system_instruction.txt).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import time, json
+start = time.perf_counter()
+import app_flask
+imported = time.perf_counter()
+app = app_flask.create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.post('/receive-data/', json={
+    "prompt_user": "hola",
+    "user_data": {"id": "startup", "browserData": {
+        "userAgent": "bench", "screenResolution": "1x1", "language": "es", "platform": "bench"}}
+})
+first_request = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1e3,
+    "create_app_ms": (created - imported) * 1e3,
+    "first_request_ms": (first_request - created) * 1e3,
+}))
+"""
+
+def parse_importtime(stderr: str):
+    """
+    Retorna una lista (módulo, microsegundos acumulados) de la salida de -X importtime.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        entries.append((name, int(cumulative)))
+    return entries
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="fake")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, LLM_PROVIDER=args.provider, IS_DEVELOPMENT="false")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=ROOT, env=env,
+                               capture_output=True, text=True, check=True)
+    timings = completed.stdout.strip().splitlines()[-1]
+    entries = parse_importtime(completed.stderr)
+
+    print(f"Tiempos: {timings}")
+    print(f"Módulos importados: {len(entries)}")
+    print(f"Importaciones más costosas (acumulado, top {args.top}):")
+    for name, cumulative in sorted(entries, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1e3:>9.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
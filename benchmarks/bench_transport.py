@@ -0,0 +1,81 @@
+"""
+Path: benchmarks/bench_transport.py
+Compara HTTPGeminiTransport (pool keep-alive) con una conexión nueva por llamada
+contra el stub local de Gemini, y verifica reintentos y streaming.
+
+Uso:
+    python -m benchmarks.bench_transport [--calls 300] [--concurrency 8]
+
+El stub es HTTP plano en localhost, por lo que solo se ahorra el handshake TCP;
+contra la API real cada conexión nueva agrega además el handshake TLS.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.gemini_stub import GeminiStubServer
+from benchmarks.replay import percentile
+from core.services.llm_impl.gemini_llm import GeminiLLMClient
+from core.services.llm_impl.gemini_transport import GeminiHTTPError, HTTPGeminiTransport
+
+REQUEST = {"contents": [{"role": "user", "parts": [{"text": "hola"}]}]}
+
+def run(call, calls: int, concurrency: int):
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed, range(calls)))
+    return latencies, time.perf_counter() - start
+
+def report(name: str, latencies, duration: float, connections: int) -> None:
+    print(f"{name:<14} {len(latencies) / duration:>8.0f} req/s  p50={percentile(latencies, 0.5) * 1e3:.2f}ms "
+          f"p99={percentile(latencies, 0.99) * 1e3:.2f}ms  conexiones={connections}")
+
+def check_retries_and_streaming(server: GeminiStubServer) -> None:
+    transport = HTTPGeminiTransport("stub", base_url=server.base_url, max_retries=3, sleep=lambda _: None)
+    client = GeminiLLMClient("stub", "Sos un asistente.", transport=transport)
+
+    server.fail_next(2, status=429)
+    assert client.send_message("reintento") == "Respuesta simulada para: reintento"
+    assert "".join(client.stream_message("streaming " * 10)) == "Respuesta simulada para: " + "streaming " * 10
+
+    server.fail_next(1, status=400)
+    try:
+        client.send_message("error")
+        raise AssertionError("Se esperaba GeminiHTTPError")
+    except GeminiHTTPError as e:
+        assert e.status_code == 400
+    print(f"reintentos y streaming OK: {transport.stats()}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with GeminiStubServer() as server:
+        url = f"{server.base_url}/v1beta/models/gemini-1.5-flash:generateContent"
+
+        def new_connection():
+            response = requests.post(url, json=REQUEST, headers={"Connection": "close"}, timeout=10)
+            response.raise_for_status()
+
+        latencies, duration = run(new_connection, args.calls, args.concurrency)
+        report("sin pool", latencies, duration, server.connections)
+
+        server.connections = 0
+        transport = HTTPGeminiTransport("stub", base_url=server.base_url, pool_size=args.concurrency)
+        latencies, duration = run(lambda: transport.generate_content("gemini-1.5-flash", REQUEST),
+                                  args.calls, args.concurrency)
+        report("pool keep-alive", latencies, duration, server.connections)
+        print(f"métricas del transporte: {transport.stats()}")
+
+        check_retries_and_streaming(server)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Path: benchmarks/bench_validation.py
+Verifica que CompiledDataValidator sea equivalente a DataSchemaValidator
+(mismo resultado o mismos mensajes de error) sobre un conjunto de casos fijos
+y de mutaciones aleatorias, y compara el costo de ambos.
+
+Uso:
+    python -m benchmarks.bench_validation [--mutations 5000] [--loops 20000] [--seed 1]
+
+Termina con código 1 si encuentra alguna diferencia.
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+from marshmallow import ValidationError
+from benchmarks.bench_hot_path import PAYLOAD
+from core.services.data_validator import CompiledDataValidator, DataSchemaValidator
+
+# Valores de distintos tipos JSON (y algunos que solo llegan desde Python)
+SAMPLE_VALUES = [
+    None, True, False, 0, 1, -7, 2 ** 70, 1.0, 1.5, float("inf"), float("nan"), "", "x", "true", "False",
+    "yes", "0", "1", "12", "1.5", "a" * 255, "a" * 256, [], ["x"], {}, {"x": 1}, b"bytes",
+]
+
+FIXED_CASES = [
+    PAYLOAD,
+    {**PAYLOAD, "stream": True},
+    {**PAYLOAD, "stream": "true"},
+    {**PAYLOAD, "stream": 1},
+    {**PAYLOAD, "stream": "maybe"},
+    {**PAYLOAD, "datetime": "1737400000"},
+    {**PAYLOAD, "datetime": True},
+    {**PAYLOAD, "datetime": 1.9},
+    {**PAYLOAD, "prompt_user": "a" * 256},
+    {**PAYLOAD, "prompt_user": None},
+    {**PAYLOAD, "instruction": "example1"},
+    {**PAYLOAD, "instruction": "x" * 65},
+    {**PAYLOAD, "extra": 1},
+    {**PAYLOAD, "user_data": {"id": "u"}},
+    {**PAYLOAD, "user_data": {**PAYLOAD["user_data"], "extra": 1}},
+    {**PAYLOAD, "user_data": None},
+    {**PAYLOAD, "user_data": "u"},
+    {key: value for key, value in PAYLOAD.items() if key != "prompt_user"},
+    {},
+    [],
+    "payload",
+    None,
+]
+
+def outcome(validate, data):
+    try:
+        return "ok", validate(copy.deepcopy(data))
+    except ValidationError as err:
+        return "error", err.messages
+
+def mutate(rng: random.Random, payload: dict) -> dict:
+    """
+    Reemplaza, elimina o agrega un campo en algún nivel del payload.
+    """
+    data = copy.deepcopy(payload)
+    target = data
+    while isinstance(target, dict) and target and rng.random() < 0.5:
+        nested = [value for value in target.values() if isinstance(value, dict)]
+        if not nested:
+            break
+        target = rng.choice(nested)
+    action = rng.random()
+    if action < 0.6 and target:
+        target[rng.choice(list(target))] = rng.choice(SAMPLE_VALUES)
+    elif action < 0.8 and target:
+        del target[rng.choice(list(target))]
+    else:
+        target[rng.choice(["extra", "instruction", "stream", "datetime"])] = rng.choice(SAMPLE_VALUES)
+    return data
+
+def check_equivalence(mutations: int, seed: int) -> int:
+    reference, compiled = DataSchemaValidator(), CompiledDataValidator()
+    rng = random.Random(seed)
+    cases = FIXED_CASES + [mutate(rng, PAYLOAD) for _ in range(mutations)]
+
+    mismatches = 0
+    for case in cases:
+        expected, actual = outcome(reference.validate, case), outcome(compiled.validate, case)
+        if repr(expected) != repr(actual):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"DIFERENCIA: {case!r}\n  marshmallow: {expected!r}\n  compilado:   {actual!r}")
+
+    batches = [cases[index:index + 7] for index in range(0, len(cases), 7)] + [[PAYLOAD] * 3, "lote", []]
+    for batch in batches:
+        expected, actual = outcome(reference.validate_many, batch), outcome(compiled.validate_many, batch)
+        if repr(expected) != repr(actual):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"DIFERENCIA en lote:\n  marshmallow: {expected!r}\n  compilado:   {actual!r}")
+
+    print(f"Equivalencia: {len(cases)} casos y {len(batches)} lotes, {mismatches} diferencias.")
+    return mismatches
+
+def per_call_us(validate, data, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        validate(data)
+    return (time.perf_counter() - start) / loops * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mutations", type=int, default=5000)
+    parser.add_argument("--loops", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mismatches = check_equivalence(args.mutations, args.seed)
+
+    reference, compiled = DataSchemaValidator(), CompiledDataValidator()
+    baseline = per_call_us(reference.validate, PAYLOAD, args.loops)
+    fast = per_call_us(compiled.validate, PAYLOAD, args.loops)
+    print(f"marshmallow {baseline:8.2f} us/solicitud")
+    print(f"compilado   {fast:8.2f} us/solicitud  ({baseline / fast:.1f}x)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
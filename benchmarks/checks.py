@@ -0,0 +1,11 @@
+"""
+Path: benchmarks/checks.py
+Utilidades compartidas por los benchmarks que además verifican su resultado:
+cada comprobación se imprime como OK o FALLA y las fallidas se acumulan para
+que el script termine con código distinto de cero.
+"""
+
+def check(name: str, ok: bool, detail: str, failures: list) -> None:
+    print(f"{'OK   ' if ok else 'FALLA'} {name}: {detail}")
+    if not ok:
+        failures.append(name)
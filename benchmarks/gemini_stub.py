@@ -0,0 +1,144 @@
+"""
+Path: benchmarks/gemini_stub.py
+Servidor HTTP local que imita generateContent y streamGenerateContent (SSE) de
+la API de Gemini, para probar HTTPGeminiTransport y GeminiLLMClient sin red.
+
+Uso como servidor independiente:
+    python -m benchmarks.gemini_stub [--port 8089] [--latency 0.05]
+
+y luego GEMINI_TRANSPORT=http GEMINI_BASE_URL=http://127.0.0.1:8089 GEMINI_API_KEY=stub.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GeminiStubServer:
+    """
+    Servidor en un hilo de fondo. Responde con el eco del último mensaje del
+    usuario tras `latency` segundos; `fail_next(n, status)` hace que las
+    próximas n solicitudes respondan con ese código de error.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, chunk_size: int = 30):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.connections = 0
+        self.requests = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fail_next(self, count: int, status: int = 503) -> None:
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def start(self) -> "GeminiStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="gemini-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_failure(self):
+        with self._lock:
+            self.requests += 1
+            return self._failures.pop(0) if self._failures else None
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sin esto, encabezados y cuerpo en escrituras separadas chocan con el ACK diferido
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                failure = stub._next_failure()
+                if failure is not None:
+                    self._send_json(failure, {"error": {"code": failure, "message": "stub failure"}},
+                                    {"Retry-After": "0"})
+                    return
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                text = self._answer(body)
+                if ":streamGenerateContent" in self.path:
+                    self._send_stream(text)
+                else:
+                    self._send_json(200, self._candidate(text))
+
+            def _answer(self, body: dict) -> str:
+                user_turns = [c for c in body.get("contents", []) if c.get("role") == "user"]
+                message = user_turns[-1]["parts"][0]["text"] if user_turns else ""
+                return f"Respuesta simulada para: {message}"
+
+            @staticmethod
+            def _candidate(text: str) -> dict:
+                return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, text: str):
+                events = b"".join(
+                    b"data: " + json.dumps(self._candidate(text[i:i + stub.chunk_size])).encode("utf-8") + b"\r\n\r\n"
+                    for i in range(0, len(text), stub.chunk_size)
+                )
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(events)))
+                self.end_headers()
+                self.wfile.write(events)
+
+        return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = GeminiStubServer(args.host, args.port, args.latency)
+    print(f"Stub de Gemini escuchando en {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
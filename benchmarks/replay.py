@@ -0,0 +1,191 @@
+"""
+Path: benchmarks/replay.py
+Reproduce un archivo JSONL de payloads contra la aplicación, ya sea en el mismo
+proceso (cliente de pruebas de Flask, con FakeLLMClient) o por HTTP contra un
+servidor en ejecución, y reporta latencias p50/p95/p99, throughput y errores.
+
+Uso:
+    python -m benchmarks.replay payloads.jsonl --concurrency 8 --rate 50
+    python -m benchmarks.replay payloads.jsonl --url http://localhost:5000
+
+Cada línea del archivo es el cuerpo JSON de una solicitud a receive-data/.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from typing import Callable, Iterator, List, Optional, Tuple
+
+_STOP = object()
+
+def read_payloads(path: str, repeat: int = 1) -> Iterator[dict]:
+    """
+    Lee el archivo JSONL de forma incremental, repitiéndolo `repeat` veces.
+    Las líneas vacías o inválidas se ignoran.
+    """
+    for _ in range(repeat):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Línea ignorada (JSON inválido): {line[:80]}", file=sys.stderr)
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def build_in_process_sender(path: str, args) -> Callable[[dict], int]:
+    """
+    Crea la aplicación Flask en este proceso usando FakeLLMClient y retorna
+    una función que envía un payload y devuelve el código de estado.
+    """
+    os.environ['LLM_PROVIDER'] = 'fake'
+    os.environ['FAKE_LLM_FIRST_CHUNK_DELAY'] = str(args.llm_latency)
+    os.environ['FAKE_LLM_TOKENS_PER_SECOND'] = str(args.llm_tokens_per_second)
+    os.environ['FAKE_LLM_RESPONSE_TOKENS'] = str(args.llm_response_tokens)
+
+    from app_flask import create_app
+
+    if not args.verbose:
+        logging.getLogger("app_logger").setLevel(logging.WARNING)
+
+    app = create_app()
+    local = threading.local()
+
+    def send(payload: dict) -> int:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post(path, json=payload)
+        response.get_data()
+        return response.status_code
+
+    return send
+
+def build_http_sender(base_url: str, path: str, timeout: float) -> Callable[[dict], int]:
+    """
+    Retorna una función que envía un payload por HTTP y devuelve el código de estado.
+    """
+    url = base_url.rstrip('/') + path
+
+    def send(payload: dict) -> int:
+        body = json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    return send
+
+def replay(payloads: Iterator[dict], send: Callable[[dict], int], concurrency: int,
+           rate: float) -> Tuple[List[float], Counter, float]:
+    """
+    Envía los payloads con `concurrency` hilos. Si `rate` es mayor a 0, las
+    solicitudes se liberan a esa tasa (por segundo) en lugar de lo más rápido posible.
+    Retorna (latencias, conteo por estado, duración total).
+    """
+    work: "queue.Queue" = queue.Queue(maxsize=concurrency * 2)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            payload = work.get()
+            if payload is _STOP:
+                return
+            start = time.perf_counter()
+            try:
+                status = send(payload)
+            except Exception as e:
+                status = f"error:{e.__class__.__name__}"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    for index, payload in enumerate(payloads):
+        if rate > 0:
+            due = started + index / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        work.put(payload)
+
+    for _ in threads:
+        work.put(_STOP)
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+def summarize(latencies: List[float], statuses: Counter, duration: float) -> dict:
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+    return {
+        "requests": total,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 2) if duration else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1e3, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jsonl", help="Archivo JSONL con un payload por línea.")
+    parser.add_argument("--url", help="URL base del servidor. Si se omite, se usa la app en el mismo proceso.")
+    parser.add_argument("--path", default=os.getenv('ROOT_API', '/') + 'receive-data/')
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="Solicitudes por segundo (0 = sin límite).")
+    parser.add_argument("--repeat", type=int, default=1, help="Cantidad de veces que se recorre el archivo.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latencia simulada del primer token (s).")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--llm-response-tokens", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Imprime el resumen en JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Mantiene los logs de la aplicación.")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        send = build_http_sender(args.url, args.path, args.timeout)
+    else:
+        send = build_in_process_sender(args.path, args)
+
+    latencies, statuses, duration = replay(read_payloads(args.jsonl, args.repeat), send,
+                                           args.concurrency, args.rate)
+    summary = summarize(latencies, statuses, duration)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"solicitudes={summary['requests']} duración={summary['duration_s']}s "
+              f"throughput={summary['throughput_rps']} req/s errores={summary['error_rate']:.2%}")
+        print(f"latencia p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms")
+        print(f"estados={summary['statuses']}")
+    return summary
+
+if __name__ == "__main__":
+    main()
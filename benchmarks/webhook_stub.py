@@ -0,0 +1,114 @@
+"""
+Path: benchmarks/webhook_stub.py
+Servidor HTTP local que imita el endpoint de un servicio de mensajería por
+webhooks, para probar WebhookMessagingChannel y OutboundDispatcher sin red.
+Guarda los mensajes recibidos por chat en el orden de llegada.
+
+Uso como servidor independiente:
+    python -m benchmarks.webhook_stub [--port 8090] [--latency 0.02]
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class WebhookStubServer:
+    """
+    Servidor en un hilo de fondo. Cada POST con {"chat_id", "messages"} se
+    responde tras `latency` segundos; `fail_next(n, status)` hace que las
+    próximas n solicitudes respondan con ese código de error.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.messages = defaultdict(list)
+        self._failures = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/send"
+
+    def fail_next(self, count: int, status: int = 503) -> None:
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def received(self) -> int:
+        with self._lock:
+            return sum(len(messages) for messages in self.messages.values())
+
+    def start(self) -> "WebhookStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    failure = stub._failures.pop(0) if stub._failures else None
+                if failure is not None:
+                    self._send(failure, {"ok": False}, {"Retry-After": "0"})
+                    return
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.messages[str(body.get("chat_id"))].extend(body.get("messages", []))
+                self._send(200, {"ok": True})
+
+            def _send(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = WebhookStubServer(args.host, args.port, args.latency)
+    print(f"Stub de webhook escuchando en {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
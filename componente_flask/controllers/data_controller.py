@@ -4,54 +4,43 @@ Controlador Flask que se encarga de recibir las peticiones HTTP y delegar
 la lógica a DataService.
 """
 
+import hmac
 import os
-from flask import Blueprint, request, redirect
+import logging
+from flask import Blueprint, request, redirect, current_app
 from flask_cors import CORS
-from dotenv import load_dotenv
 from marshmallow import ValidationError
-from componente_flask.views.data_view import render_json_response
-from core.logs.config_logger import LoggerConfigurator
-
-# Services y canales
-from core.services.data_service import DataService
-from core.services.data_validator import DataSchemaValidator
-from core.services.model_config import ModelConfig
-from core.services.response_generator import ResponseGenerator
-from core.channels.imessaging_channel import IMessagingChannel
+from componente_flask.views.data_view import (
+    render_json_response, render_static_json_response, render_stream_response, render_batch_response,
+    render_metrics_response, render_job_response
+)
+from core.logs.payload_logging import log_payload
+from core.observability import metrics
+from core.observability.tracing import span
+from core.channels.outbound_dispatcher import OutboundQueueFullError
+from core.services.admission import RateLimitedError
+from core.services.llm_dispatcher import LLMOverloadedError
 
-logger = LoggerConfigurator().configure()
-load_dotenv()
+logger = logging.getLogger("app_logger")
 
 data_controller = Blueprint('data_controller', __name__)
 CORS(data_controller)
 
-# Implementación simple de canal (web) para mensajes
-class WebMessagingChannel(IMessagingChannel):
-    def send_message(self, msg: str, chat_id: str = None) -> None:
-        logger.info("Mensaje enviado al usuario web: %s", msg)
-
-    def receive_message(self, payload: dict) -> dict:
-        logger.info("Mensaje recibido desde la interfaz web: %s", payload)
-        return {
-            "message": payload.get('prompt_user'),
-            "stream": payload.get('stream', False)
-        }
-
-# Instanciar servicios y canal
-web_channel = WebMessagingChannel()
-data_validator = DataSchemaValidator()
-
-# Crear cliente LLM y ResponseGenerator
-model_config = ModelConfig()
-llm_client = model_config.create_llm_client()
-response_generator = ResponseGenerator(llm_client)
-
-# Crear DataService que unifica validación y respuesta
-data_service = DataService(
-    validator=data_validator,
-    response_generator=response_generator,
-    channel=web_channel
-)
+def get_data_service():
+    """
+    Retorna el DataService del contenedor de servicios de la app actual
+    (registrado por create_app), que se construye en el primer uso.
+    """
+    return current_app.extensions['madybot_services'].data_service
+
+batch_max_items = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+
+# Cuerpos más grandes se rechazan por Content-Length, antes de parsear el JSON
+max_request_bytes = int(os.getenv('MAX_REQUEST_BYTES', '16384'))
+max_batch_request_bytes = max_request_bytes * batch_max_items
+
+def body_too_large(limit: int) -> bool:
+    return request.content_length is not None and request.content_length > limit
 
 root_API = os.getenv('ROOT_API', '/')
 
@@ -69,19 +58,120 @@ def receive_data():
         url_frontend = os.getenv('URL_FRONTEND')
         return redirect(url_frontend)
 
+    if body_too_large(max_request_bytes):
+        logger.warning("Solicitud rechazada por tamaño: %s bytes.", request.content_length)
+        return render_static_json_response(413, "La solicitud es demasiado grande.", stream=False)
+
     try:
-        logger.info("Request JSON: \n| %s \n", request.json)
+        with span("parse"):
+            json_data = request.json
+        log_payload(logger, logging.INFO, "Request JSON: \n| %s \n", json_data)
+        if request.args.get('mode') == 'job':
+            return submit_job(json_data)
         # Procesar la data con nuestro DataService
-        response_message = data_service.process_incoming_data(request.json)
-        return render_json_response(200, response_message, stream=False)
+        response_message = get_data_service().process_incoming_data(json_data)
+        if not isinstance(response_message, str):
+            return render_stream_response(response_message)
+        with span("render"):
+            return render_json_response(200, response_message, stream=False)
 
     except ValidationError:
-        return render_json_response(400, "Datos inválidos en la solicitud.", stream=False)
+        return render_static_json_response(400, "Datos inválidos en la solicitud.", stream=False)
+    except RateLimitedError as e:
+        return render_static_json_response(429, "Demasiadas solicitudes, intente nuevamente más tarde.", stream=False,
+                                           headers={"Retry-After": str(e.retry_after)})
+    except LLMOverloadedError as e:
+        return render_static_json_response(503, "El servidor está ocupado, intente nuevamente.", stream=False,
+                                           headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error("Error procesando la solicitud: %s", e)
-        return render_json_response(500, "Error procesando la solicitud.", stream=False)
+        return render_static_json_response(500, "Error procesando la solicitud.", stream=False)
+
+def submit_job(json_data):
+    """
+    Modo job (receive-data/?mode=job): encola la solicitud y responde 202 con
+    el id del job; el resultado se consulta en jobs/<id>/.
+    """
+    data_service = get_data_service()
+    if data_service.job_runner is None:
+        return render_static_json_response(400, "El modo job no está habilitado.", stream=False)
+    job_id = data_service.submit_job(json_data)
+    with span("render"):
+        return render_job_response(202, {"id": job_id, "status": "queued"},
+                                   headers={"Location": f"{root_API}jobs/{job_id}/"})
+
+@data_controller.route(root_API + 'jobs/<job_id>/', methods=['GET'])
+def job_status(job_id):
+    job = get_data_service().get_job(job_id)
+    if job is None:
+        return render_static_json_response(404, "El job no existe o ya venció.", stream=False)
+    return render_job_response(200, job)
+
+@data_controller.route(root_API + 'receive-data/batch/', methods=['POST'])
+def receive_data_batch():
+    if body_too_large(max_batch_request_bytes):
+        logger.warning("Lote rechazado por tamaño: %s bytes.", request.content_length)
+        return render_static_json_response(413, "La solicitud es demasiado grande.", stream=False)
+
+    with span("parse"):
+        items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        return render_static_json_response(400, "Se esperaba una lista de solicitudes.", stream=False)
+    if len(items) > batch_max_items:
+        return render_static_json_response(413, f"El lote no puede superar las {batch_max_items} solicitudes.", stream=False)
+
+    try:
+        results = get_data_service().process_batch(items)
+        with span("render"):
+            return render_batch_response(200, results)
+    except Exception as e:
+        logger.error("Error procesando el lote: %s", e)
+        return render_static_json_response(500, "Error procesando la solicitud.", stream=False)
+
+@data_controller.route(root_API + 'webhook/', methods=['POST'])
+def receive_webhook():
+    """
+    Recibe las actualizaciones del canal de webhooks (WEBHOOK_URL). La
+    respuesta no va en el cuerpo: se envía a WEBHOOK_URL en segundo plano.
+    Con WEBHOOK_SECRET las solicitudes deben traer la cabecera
+    X-Webhook-Secret con ese valor.
+    """
+    data_service = get_data_service()
+    if data_service.webhook_channel is None:
+        return render_static_json_response(404, "El canal de webhooks no está habilitado.", stream=False)
+    secret = os.getenv('WEBHOOK_SECRET')
+    if secret and not hmac.compare_digest(request.headers.get('X-Webhook-Secret', ''), secret):
+        logger.warning("Actualización del webhook rechazada: secreto inválido.")
+        return render_static_json_response(403, "Secreto del webhook inválido.", stream=False)
+    if body_too_large(max_request_bytes):
+        logger.warning("Actualización del webhook rechazada por tamaño: %s bytes.", request.content_length)
+        return render_static_json_response(413, "La solicitud es demasiado grande.", stream=False)
+
+    with span("parse"):
+        update = request.get_json(silent=True)
+    if not isinstance(update, dict):
+        return render_static_json_response(400, "Datos inválidos en la solicitud.", stream=False)
+    log_payload(logger, logging.INFO, "Actualización del webhook: \n| %s \n", update)
+
+    try:
+        data_service.process_webhook_update(update)
+        return render_static_json_response(200, "Actualización recibida.", stream=False)
+    except RateLimitedError as e:
+        return render_static_json_response(429, "Demasiadas solicitudes, intente nuevamente más tarde.", stream=False,
+                                           headers={"Retry-After": str(e.retry_after)})
+    except (LLMOverloadedError, OutboundQueueFullError) as e:
+        return render_static_json_response(503, "El servidor está ocupado, intente nuevamente.", stream=False,
+                                           headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error("Error procesando la actualización del webhook: %s", e)
+        return render_static_json_response(500, "Error procesando la solicitud.", stream=False)
 
 @data_controller.route(root_API + 'health-check/', methods=['GET'])
 def health_check():
     logger.info("Health check solicitado. El servidor está funcionando correctamente.")
-    return render_json_response(200, "El servidor está operativo.")
+    return render_static_json_response(200, "El servidor está operativo.")
+
+@data_controller.route(root_API + 'metrics/', methods=['GET'])
+def metrics_endpoint():
+    # Con METRICS_DIR incluye las métricas de todos los workers
+    return render_metrics_response(metrics.render_prometheus(metrics.collect()))
@@ -0,0 +1,63 @@
+"""
+Path: componente_flask/request_tracing.py
+Hooks de Flask que abren una traza por solicitud, devuelven el id de solicitud
+y las etapas medidas (cabecera Server-Timing) y registran las métricas de la
+solicitud al terminar.
+"""
+
+import os
+from flask import Flask, g, request
+from core.observability import metrics
+from core.observability.tracing import configure_tracing, finish_trace, start_trace
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_MAX_REQUEST_ID_LENGTH = 64
+
+def init_tracing(app: Flask) -> None:
+    """
+    Registra los hooks de trazas y métricas en `app`. TRACE_SAMPLE_RATE define
+    la fracción de solicitudes cuyas etapas se miden; con TRACING_ENABLED=false
+    no se mide ninguna (los contadores y la duración total se registran igual).
+    """
+    if os.getenv('TRACING_ENABLED', 'true').lower() == 'true':
+        configure_tracing(float(os.getenv('TRACE_SAMPLE_RATE', '1.0')))
+    else:
+        configure_tracing(0.0)
+
+    @app.before_request
+    def _start_request_trace():
+        # Se respeta el id que envía el proxy (nginx) para correlacionar los logs
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")[:_MAX_REQUEST_ID_LENGTH] or None
+        g.madybot_trace = start_trace(request_id)
+
+    @app.after_request
+    def _add_trace_headers(response):
+        route = _route()
+        metrics.registry.increment(
+            "http_requests_total", labels={"route": route, "status": str(response.status_code)}
+        )
+        trace = g.get('madybot_trace')
+        if trace is None:
+            return response
+        response.headers[REQUEST_ID_HEADER] = trace.request_id
+        if response.is_streamed:
+            # Las cabeceras salen antes de que termine la generación: la traza
+            # se cierra cuando el servidor termina de enviar el cuerpo
+            g.pop('madybot_trace')
+            response.call_on_close(lambda: _finish(trace, route))
+        elif trace.sampled:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
+    @app.teardown_request
+    def _finish_request_trace(exc):
+        trace = g.pop('madybot_trace', None)
+        if trace is not None:
+            _finish(trace, _route())
+
+def _route() -> str:
+    return request.endpoint or "unknown"
+
+def _finish(trace, route: str) -> None:
+    finish_trace(trace, route=route)
+    metrics.start_flusher()
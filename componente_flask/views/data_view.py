@@ -2,13 +2,32 @@
 Path: componente_flask/views/data_view.py
 """
 
-from flask import jsonify
-from core.logs.config_logger import LoggerConfigurator
+import logging
+from functools import lru_cache
+from typing import Iterable
+from flask import Response, stream_with_context
+from core.logs.payload_logging import log_payload
+from componente_flask.views.json_encoding import JSON_MIMETYPE, dumps
+from core.observability.metrics import PROMETHEUS_CONTENT_TYPE
 
 
-logger = LoggerConfigurator().configure()
+logger = logging.getLogger("app_logger")
 
-def render_json_response(code, message, stream = False):
+# Partes fijas del sobre JSON de cada evento SSE: solo se serializa el fragmento
+_STREAM_EVENT_PREFIX = b'data: {"response_MadyBot":null,"response_MadyBot_stream":'
+_STREAM_EVENT_SUFFIX = b'}\n\n'
+_STREAM_ERROR_EVENT = (
+    b"event: error\ndata: "
+    + dumps({"response_MadyBot": None, "response_MadyBot_stream": "Error procesando la solicitud."})
+    + b"\n\n"
+)
+
+def _envelope(message, stream: bool) -> dict:
+    if stream:
+        return {"response_MadyBot": None, "response_MadyBot_stream": message}
+    return {"response_MadyBot": message, "response_MadyBot_stream": None}
+
+def render_json_response(code, message, stream = False, headers = None):
     """
     Genera una respuesta JSON estándar con metadatos adicionales.
     
@@ -17,21 +36,87 @@ def render_json_response(code, message, stream = False):
     :param code: Código de estado HTTP (por defecto 200).
     :param message: Mensaje adicional para la respuesta.
     :param detailed: Indica si la respuesta debe ser detallada (por defecto False).
+    :param headers: Cabeceras HTTP adicionales (por ejemplo, Retry-After).
+    :return: Respuesta JSON.
+    """
+    response = _envelope(message, stream)
+    log_payload(logger, logging.INFO, "response: %s", response)
+    return Response(dumps(response), mimetype=JSON_MIMETYPE), code, headers or {}
+
+@lru_cache(maxsize=64)
+def _static_body(message: str, stream: bool) -> bytes:
+    return dumps(_envelope(message, stream))
+
+def render_static_json_response(code, message, stream = False, headers = None):
+    """
+    Igual que render_json_response, para mensajes fijos (health-check, errores
+    de validación, sobrecarga): el cuerpo se serializa una sola vez y no se
+    registra el payload.
+
+    :param code: Código de estado HTTP.
+    :param message: Mensaje fijo de la respuesta.
+    :param stream: Si el mensaje va en 'response_MadyBot_stream'.
+    :param headers: Cabeceras HTTP adicionales (por ejemplo, Retry-After).
     :return: Respuesta JSON.
     """
-    if not stream:
-        response = {
-            "response_MadyBot": message,
-            "response_MadyBot_stream": None
-        }
-
-        logger.info("response: %s", response)
-        return jsonify(response), code
-    else:
-        response = {
-            "response_MadyBot": None,
-            "response_MadyBot_stream": message
-        }
-
-        logger.info("response: %s", response)
-        return jsonify(response), code
+    logger.debug("Respuesta %s: %s", code, message)
+    return Response(_static_body(message, stream), mimetype=JSON_MIMETYPE), code, headers or {}
+
+def render_batch_response(code, results):
+    """
+    Genera la respuesta JSON de un lote: una lista de resultados en el mismo
+    orden que las solicitudes recibidas.
+
+    :param code: Código de estado HTTP.
+    :param results: Lista de diccionarios con 'response_MadyBot' y 'error'.
+    :return: Respuesta JSON.
+    """
+    logger.info("Respuesta de lote con %d resultados.", len(results))
+    return Response(dumps({"results": results}), mimetype=JSON_MIMETYPE), code
+
+def render_job_response(code, job, headers = None):
+    """
+    Genera la respuesta JSON de un job: su id, estado ('queued', 'running',
+    'done' o 'failed'), la salida parcial y el resultado o el error.
+
+    :param code: Código de estado HTTP (202 al encolarlo, 200 al consultarlo).
+    :param job: Diccionario con los datos del job.
+    :param headers: Cabeceras HTTP adicionales (por ejemplo, Location).
+    :return: Respuesta JSON.
+    """
+    logger.debug("Job %s: %s", job.get("id"), job.get("status"))
+    return Response(dumps(job), mimetype=JSON_MIMETYPE), code, headers or {}
+
+def render_metrics_response(body: str):
+    """
+    Genera la respuesta de metrics/ en el formato de texto de Prometheus.
+
+    :param body: Métricas ya formateadas.
+    :return: Respuesta de texto plano.
+    """
+    return Response(body, content_type=PROMETHEUS_CONTENT_TYPE), 200
+
+def render_stream_response(chunks: Iterable[str]):
+    """
+    Genera una respuesta Server-Sent Events que envía cada fragmento del modelo
+    apenas está disponible, usando el mismo sobre JSON que render_json_response.
+
+    :param chunks: Iterable con los fragmentos de texto de la respuesta.
+    :return: Respuesta HTTP en streaming (text/event-stream).
+    """
+    def generate():
+        try:
+            for chunk in chunks:
+                # Cada evento se escribe apenas llega su fragmento
+                yield _STREAM_EVENT_PREFIX + dumps(chunk) + _STREAM_EVENT_SUFFIX
+        except Exception as e:
+            logger.error("Error durante la respuesta en streaming: %s", e)
+            yield _STREAM_ERROR_EVENT
+        logger.info("Respuesta en streaming finalizada.")
+
+    headers = {
+        "Cache-Control": "no-cache",
+        # Evita que nginx acumule la respuesta antes de enviarla al cliente
+        "X-Accel-Buffering": "no"
+    }
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
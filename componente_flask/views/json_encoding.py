@@ -0,0 +1,31 @@
+"""
+Path: componente_flask/views/json_encoding.py
+Serialización JSON de las respuestas: usa orjson si está instalado y, si no,
+la librería estándar con el mismo formato (compacto, claves ordenadas, UTF-8).
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+JSON_MIMETYPE = "application/json"
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+
+    def dumps(obj) -> bytes:
+        """
+        Serializa `obj` a bytes JSON.
+        """
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+else:
+    JSON_BACKEND = "json"
+
+    def dumps(obj) -> bytes:
+        """
+        Serializa `obj` a bytes JSON.
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
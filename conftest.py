@@ -0,0 +1,6 @@
+"""
+Path: conftest.py
+Configuración de pytest: al estar en la raíz del repositorio, pytest agrega
+esta carpeta a sys.path y las pruebas de tests/ pueden importar core,
+componente_flask y app_flask.
+"""
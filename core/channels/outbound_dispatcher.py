@@ -0,0 +1,268 @@
+"""
+Path: core/channels/outbound_dispatcher.py
+Cola de salida para los canales que envían mensajes a un servicio externo
+(webhooks al estilo Telegram): send_message solo encola y hilos en segundo
+plano hacen los envíos, agrupados por destinatario y con reintentos, sin
+bloquear la solicitud que generó la respuesta.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+import zlib
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("app_logger")
+
+# Separadores preferidos al partir un mensaje largo, de mayor a menor
+_SPLIT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+
+class OutboundQueueFullError(Exception):
+    """
+    Se lanza cuando la cola de salida del canal está llena (el servicio
+    externo no da abasto).
+
+    :param retry_after: Segundos sugeridos antes de reintentar.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ChannelSendError(Exception):
+    """
+    Error al enviar un lote al servicio externo. Solo se reintenta si
+    `retryable` es True (por ejemplo, 429 o 5xx).
+
+    :param retry_after: Segundos indicados por el servicio (Retry-After), si los hay.
+    """
+
+    def __init__(self, message: str, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def split_message(text: str, max_chars: int) -> List[str]:
+    """
+    Parte `text` en fragmentos de hasta `max_chars` caracteres, cortando de
+    preferencia en un párrafo, una línea, una oración o un espacio. La
+    concatenación de los fragmentos es el texto original.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+    chunks = []
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = max_chars
+        for separator in _SPLIT_SEPARATORS:
+            index = window.rfind(separator)
+            # Un corte muy temprano dejaría fragmentos diminutos
+            if index >= max_chars // 2:
+                cut = index + len(separator)
+                break
+        chunks.append(text[start:start + cut])
+        start += cut
+    chunks.append(text[start:])
+    return chunks
+
+
+class _Outbound:
+    __slots__ = ("chat_id", "text")
+
+    def __init__(self, chat_id: str, text: str):
+        self.chat_id = chat_id
+        self.text = text
+
+
+_STOP = object()
+
+
+class OutboundDispatcher:
+    """
+    Encola mensajes salientes y los envía con `send_batch(chat_id, textos)`.
+
+    Cada destinatario se asigna siempre al mismo de los `workers` hilos, de modo
+    que sus mensajes salen en orden. Un hilo junta los mensajes que llegan en
+    `batch_window` segundos (hasta `max_batch`) y envía un lote por
+    destinatario. Los errores reintentables se reintentan hasta `max_retries`
+    veces con backoff exponencial y jitter, como HTTPGeminiTransport.
+
+    Los mensajes más largos que `max_chars` se parten con split_message. Si la
+    cola (`max_queue` mensajes en total) está llena, enqueue espera hasta
+    `block_timeout` segundos y luego lanza OutboundQueueFullError.
+    """
+
+    def __init__(self, send_batch: Callable[[str, List[str]], None], workers: int = 2, max_queue: int = 1000,
+                 max_batch: int = 100, batch_window: float = 0.05, max_chars: int = 4096,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 block_timeout: float = 0.0, retry_after: int = 1,
+                 sleep: Callable[[float], None] = time.sleep, rng: Callable[[], float] = random.random):
+        self.send_batch = send_batch
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_chars = max_chars
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.block_timeout = block_timeout
+        self.retry_after = retry_after
+        self._sleep = sleep
+        self._rng = rng
+        self._queues = [queue.Queue(maxsize=max(1, max_queue // workers)) for _ in range(workers)]
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._batches = 0
+        self._retries = 0
+        self._failed = 0
+        self._rejected = 0
+        logger.info("OutboundDispatcher inicializado (workers=%s, max_queue=%s, max_batch=%s).",
+                    workers, max_queue, max_batch)
+
+    def enqueue(self, chat_id: str, text: str) -> int:
+        """
+        Encola el mensaje (partido si es necesario) para `chat_id` y retorna la
+        cantidad de fragmentos encolados.
+        """
+        self._ensure_workers()
+        target = self._queues[zlib.crc32(str(chat_id).encode("utf-8")) % len(self._queues)]
+        chunks = split_message(text, self.max_chars)
+        for index, chunk in enumerate(chunks):
+            try:
+                if self.block_timeout > 0:
+                    target.put(_Outbound(chat_id, chunk), timeout=self.block_timeout)
+                else:
+                    target.put_nowait(_Outbound(chat_id, chunk))
+            except queue.Full:
+                with self._lock:
+                    self._rejected += len(chunks) - index
+                logger.warning("Cola de salida llena: se descartan %d fragmentos para %s.",
+                               len(chunks) - index, chat_id)
+                raise OutboundQueueFullError("La cola de salida del canal está llena.", self.retry_after) from None
+        return len(chunks)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Espera a que se procesen los mensajes encolados hasta ahora. Retorna
+        False si no terminó dentro de `timeout` segundos.
+        """
+        deadline = time.monotonic() + timeout
+        for outbound_queue in self._queues:
+            while outbound_queue.unfinished_tasks:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.005)
+        return True
+
+    def stats(self) -> dict:
+        """
+        Retorna los mensajes en cola, enviados, fallidos y rechazados por cola
+        llena, y los lotes y reintentos realizados.
+        """
+        with self._lock:
+            return {
+                "queued": sum(outbound_queue.qsize() for outbound_queue in self._queues),
+                "sent_total": self._sent,
+                "batches_total": self._batches,
+                "retries_total": self._retries,
+                "failed_total": self._failed,
+                "rejected_total": self._rejected,
+            }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Envía lo pendiente y detiene los hilos, esperando como máximo
+        `timeout` segundos por cada uno.
+        """
+        for outbound_queue in self._queues if self._threads else ():
+            try:
+                outbound_queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.warning("Cola de salida llena al cerrar: quedan %d mensajes sin enviar.", outbound_queue.qsize())
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _ensure_workers(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._work, args=(outbound_queue,), name=f"outbound-{index}", daemon=True)
+                    for index, outbound_queue in enumerate(self._queues)
+                ]
+                for thread in self._threads:
+                    thread.start()
+                # Al terminar el proceso se envían los mensajes pendientes
+                atexit.register(self.close)
+
+    def _work(self, outbound_queue: "queue.Queue") -> None:
+        while True:
+            item = outbound_queue.get()
+            items, stop = [], False
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                items.append(item)
+                remaining = deadline - time.monotonic()
+                if len(items) >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = outbound_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            # Un lote por destinatario, en el orden de llegada
+            batches = {}
+            for outbound in items:
+                batches.setdefault(outbound.chat_id, []).append(outbound.text)
+            for chat_id, texts in batches.items():
+                self._send_with_retries(chat_id, texts)
+            for _ in range(len(items) + stop):
+                outbound_queue.task_done()
+            if stop:
+                return
+
+    def _send_with_retries(self, chat_id: str, texts: List[str]) -> None:
+        attempt = 0
+        while True:
+            try:
+                self.send_batch(chat_id, texts)
+            except ChannelSendError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    self._count_failure(chat_id, texts, e)
+                    return
+                logger.warning("Fallo al enviar a %s (intento %d): %s; se reintenta.", chat_id, attempt + 1, e)
+                self._sleep(self._backoff(attempt, e.retry_after))
+            except Exception as e:
+                self._count_failure(chat_id, texts, e)
+                return
+            else:
+                with self._lock:
+                    self._sent += len(texts)
+                    self._batches += 1
+                return
+            attempt += 1
+            with self._lock:
+                self._retries += 1
+
+    def _count_failure(self, chat_id: str, texts: List[str], error: Exception) -> None:
+        with self._lock:
+            self._failed += len(texts)
+        logger.error("No se pudieron enviar %d mensajes a %s: %s", len(texts), chat_id, error)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # "Full jitter": evita que los reintentos de varios hilos lleguen sincronizados
+        delay = self._rng() * min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
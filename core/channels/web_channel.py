@@ -0,0 +1,29 @@
+"""
+Path: core/channels/web_channel.py
+Implementación simple de IMessagingChannel para la interfaz web.
+"""
+
+import logging
+from core.channels.imessaging_channel import IMessagingChannel
+from core.logs.payload_logging import log_payload
+
+logger = logging.getLogger("app_logger")
+
+class WebMessagingChannel(IMessagingChannel):
+    """
+    Canal web: los mensajes llegan por HTTP y la respuesta viaja en el cuerpo
+    de la misma solicitud, por lo que enviar solo deja registro.
+    """
+
+    def send_message(self, msg: str, chat_id: str = None) -> None:
+        log_payload(logger, logging.INFO, "Mensaje enviado al usuario web: %s", msg)
+
+    def receive_message(self, payload: dict) -> dict:
+        log_payload(logger, logging.INFO, "Mensaje recibido desde la interfaz web: %s", payload)
+        return {
+            "message": payload.get('prompt_user'),
+            "stream": payload.get('stream', False),
+            "stateless": payload.get('stateless', False),
+            "chat_id": payload.get('user_data', {}).get('id'),
+            "instruction": payload.get('instruction')
+        }
@@ -0,0 +1,90 @@
+"""
+Path: core/channels/webhook_channel.py
+Canal de mensajería por webhooks (al estilo de los bots de Telegram): los
+mensajes llegan como actualizaciones JSON y las respuestas se envían con un
+POST al servicio externo a través de OutboundDispatcher.
+"""
+
+import logging
+from typing import List
+from core.channels.imessaging_channel import IMessagingChannel
+from core.channels.outbound_dispatcher import ChannelSendError, OutboundDispatcher
+from core.logs.payload_logging import log_payload
+
+logger = logging.getLogger("app_logger")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class WebhookMessagingChannel(IMessagingChannel):
+    """
+    send_message no bloquea: encola el mensaje y OutboundDispatcher lo envía
+    en segundo plano, partido en fragmentos de hasta `max_chars` caracteres y
+    agrupado con los demás mensajes pendientes del mismo chat en un POST a
+    `url` con el cuerpo {"chat_id": ..., "messages": [...]}.
+
+    Las conexiones se reutilizan con un requests.Session de hasta `pool_size`
+    conexiones. El resto de los parámetros se pasan a OutboundDispatcher.
+    """
+
+    def __init__(self, url: str, token: str = None, pool_size: int = 4, connect_timeout: float = 5.0,
+                 read_timeout: float = 15.0, session=None, **dispatcher_options):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        if session is None:
+            session = requests.Session()
+            # Los reintentos los maneja OutboundDispatcher (con jitter), no urllib3
+            session.mount(url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0))
+        if token:
+            session.headers.update({"Authorization": f"Bearer {token}"})
+        self.session = session
+        self.dispatcher = OutboundDispatcher(self._post_batch, **dispatcher_options)
+        logger.info("WebhookMessagingChannel inicializado (%s).", url)
+
+    def send_message(self, msg: str, chat_id: str = None) -> None:
+        log_payload(logger, logging.INFO, "Mensaje encolado para el webhook: %s", msg)
+        self.dispatcher.enqueue(chat_id, msg)
+
+    def receive_message(self, payload: dict) -> dict:
+        log_payload(logger, logging.INFO, "Actualización recibida desde el webhook: %s", payload)
+        message = payload.get('message') or {}
+        chat_id = (message.get('chat') or {}).get('id')
+        return {
+            "message": message.get('text'),
+            "stream": False,
+            "chat_id": str(chat_id) if chat_id is not None else None,
+            "instruction": None
+        }
+
+    def stats(self) -> dict:
+        return self.dispatcher.stats()
+
+    def close(self, timeout: float = 10.0) -> None:
+        self.dispatcher.close(timeout)
+        self.session.close()
+
+    def _post_batch(self, chat_id: str, texts: List[str]) -> None:
+        try:
+            response = self.session.post(self.url, json={"chat_id": chat_id, "messages": texts}, timeout=self.timeout)
+        except (self._requests.ConnectionError, self._requests.Timeout) as e:
+            raise ChannelSendError(f"Fallo de conexión con el webhook: {e}", retryable=True) from e
+        try:
+            if response.status_code >= 400:
+                raise ChannelSendError(
+                    f"El webhook respondió {response.status_code}.",
+                    retryable=response.status_code in RETRYABLE_STATUS,
+                    retry_after=_parse_retry_after(response.headers.get("Retry-After"))
+                )
+        finally:
+            response.close()
+
+
+def _parse_retry_after(value: str):
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -5,10 +5,23 @@ Clase LoggerConfigurator mejorada para garantizar una única instancia y configu
 
 import os
 import json
+import queue
+import atexit
 import logging.config
+import logging.handlers
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 from pathlib import Path
+from core.logs.payload_logging import configure_payload_logging
+from core.logs.queue_handlers import BoundedQueueHandler
+
+
+# Perfiles de logging: 'production' además resume y muestrea los payloads.
+# En ambos perfiles los handlers se atienden desde un hilo aparte (LOG_ASYNC).
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'development': {'payload_max_chars': 0, 'payload_sample_rate': 1.0, 'async': True},
+    'production': {'payload_max_chars': 200, 'payload_sample_rate': 0.1, 'async': True},
+}
 
 
 class ConfigStrategy(ABC):
@@ -69,6 +82,15 @@ class JSONConfigStrategy(ConfigStrategy):
             file_handlers = [handler for handler in config['handlers'] if 'FileHandler' in config['handlers'][handler]['class']]
             for handler in file_handlers:
                 del config['handlers'][handler]
+            for logger_config in config.get('loggers', {}).values():
+                logger_config['handlers'] = [h for h in logger_config.get('handlers', []) if h not in file_handlers]
+
+        # Las rutas relativas de los archivos de log se resuelven desde la raíz del proyecto
+        project_root = Path(os.path.dirname(__file__)).parent.parent
+        for handler_config in config.get('handlers', {}).values():
+            filename = handler_config.get('filename')
+            if filename and not Path(filename).is_absolute():
+                handler_config['filename'] = str(project_root / filename)
 
         return config
 
@@ -121,8 +143,31 @@ class LoggerConfigurator:
             self.config_strategy = config_strategy or JSONConfigStrategy()
             self.default_level = default_level
             self.filters = {}
+            self.profile = self._load_profile()
             self._logger = None
+            self._listener = None
+            self._queue_handler = None
             self._initialized = True
+
+    @staticmethod
+    def _load_profile() -> Dict[str, Any]:
+        """
+        Determina el perfil de logging. Por defecto es 'production' cuando
+        IS_DEVELOPMENT es false y 'development' en caso contrario; los valores
+        del perfil pueden ajustarse con variables de entorno.
+
+        Returns:
+            Dict[str, Any]: Nombre del perfil y sus parámetros.
+        """
+        is_development = os.getenv('IS_DEVELOPMENT', 'true').lower() == 'true'
+        name = os.getenv('LOG_PROFILE', 'development' if is_development else 'production').lower()
+        profile = dict(PROFILES.get(name, PROFILES['development']), name=name)
+        profile['payload_max_chars'] = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', profile['payload_max_chars']))
+        profile['payload_sample_rate'] = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', profile['payload_sample_rate']))
+        profile['async'] = os.getenv('LOG_ASYNC', str(profile['async'])).lower() == 'true'
+        profile['queue_size'] = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+        profile['queue_policy'] = os.getenv('LOG_QUEUE_POLICY', 'drop').lower()
+        return profile
     
     def register_filter(self, name: str, filter_class: type) -> None:
         """
@@ -160,6 +205,8 @@ class LoggerConfigurator:
             try:
                 logging.config.dictConfig(config)
                 self._logger = logging.getLogger("app_logger")
+                if self.profile['async']:
+                    self._install_queue_listener()
             except ValueError as e:  # Error típico en dictConfig.
                 logging.error(f"Error en la configuración del logger (dictConfig): {e}")
                 self._use_default_config()
@@ -168,8 +215,71 @@ class LoggerConfigurator:
                 self._use_default_config()
         else:
             self._use_default_config()
-            
+
+        configure_payload_logging(self.profile['payload_max_chars'], self.profile['payload_sample_rate'])
         return self._logger
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """
+        Retorna el estado de la cola de logs asíncrona.
+
+        Returns:
+            Dict[str, Any]: Tamaño actual, capacidad y registros descartados.
+        """
+        if self._queue_handler is None:
+            return {"enabled": False, "size": 0, "capacity": 0, "dropped": 0}
+        return {
+            "enabled": True,
+            "size": self._queue_handler.queue.qsize(),
+            "capacity": self._queue_handler.queue.maxsize,
+            "dropped": self._queue_handler.dropped,
+        }
+
+    def _install_queue_listener(self) -> None:
+        """
+        Reemplaza los handlers del logger raíz por un BoundedQueueHandler y los
+        atiende desde un QueueListener en segundo plano, de modo que el formateo,
+        las escrituras a disco y la compresión de archivos rotados no ocurran en
+        el hilo de la solicitud.
+        """
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        if not handlers:
+            return
+
+        log_queue: "queue.Queue" = queue.Queue(self.profile['queue_size'])
+        for handler in handlers:
+            root.removeHandler(handler)
+        self._queue_handler = BoundedQueueHandler(log_queue, policy=self.profile['queue_policy'])
+        root.addHandler(self._queue_handler)
+
+        self._listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self._stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            # Con preload_app el listener arranca en el master y su hilo no existe en los workers
+            os.register_at_fork(after_in_child=self._restart_listener_after_fork)
+
+    def _restart_listener_after_fork(self) -> None:
+        """
+        Crea en el proceso hijo una cola y un QueueListener nuevos con los mismos
+        handlers. La cola del padre puede haber quedado con su lock tomado y
+        ningún hilo la atiende en el hijo.
+        """
+        if self._listener is None:
+            return
+        log_queue: "queue.Queue" = queue.Queue(self.profile['queue_size'])
+        self._queue_handler.queue = log_queue
+        self._queue_handler.dropped = 0
+        self._listener = logging.handlers.QueueListener(
+            log_queue, *self._listener.handlers, respect_handler_level=True
+        )
+        self._listener.start()
+
+    def _stop_listener(self) -> None:
+        # Detiene el listener vigente (el del hijo, si hubo fork), vaciando la cola
+        if self._listener is not None:
+            self._listener.stop()
     
     def _use_default_config(self) -> None:
         """Aplica la configuración por defecto cuando falla la configuración principal."""
@@ -9,5 +9,9 @@ class ExcludeHTTPLogsFilter(logging.Filter):
     """Filtra registros que contienen solicitudes HTTP GET o POST."""
 
     def filter(self, record: logging.LogRecord) -> bool:
+        # Solo werkzeug registra las líneas de acceso HTTP: el resto de los
+        # registros pasa sin formatear el mensaje.
+        if not record.name.startswith('werkzeug'):
+            return True
         message = record.getMessage()
         return not any(keyword in message for keyword in ['GET /', 'POST /'])
@@ -0,0 +1,25 @@
+"""
+Path: core/logs/json_formatter.py
+Formatter que emite cada registro como una línea JSON (JSON Lines).
+"""
+
+import json
+import logging
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """Formatea los registros como objetos JSON de una sola línea, fáciles de procesar luego."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
@@ -0,0 +1,62 @@
+"""
+Path: core/logs/payload_logging.py
+Registro de payloads (solicitudes y respuestas) como resúmenes truncados y
+muestreados, sin costo de formateo cuando el nivel de log está deshabilitado.
+"""
+
+import logging
+import random
+from typing import Any
+
+_settings = {"max_chars": 0, "sample_rate": 1.0}
+
+
+def configure_payload_logging(max_chars: int, sample_rate: float) -> None:
+    """
+    Define cómo se registran los payloads.
+
+    Args:
+        max_chars (int): Largo máximo del texto registrado (0 = sin truncar).
+        sample_rate (float): Fracción de payloads que se registran (1.0 = todos).
+    """
+    _settings["max_chars"] = max_chars
+    _settings["sample_rate"] = sample_rate
+
+
+class PayloadSummary:
+    """Representación diferida de un payload: solo se convierte a texto si el registro se emite."""
+
+    __slots__ = ("payload", "max_chars")
+
+    def __init__(self, payload: Any, max_chars: int):
+        self.payload = payload
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = str(self.payload)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... ({len(text)} caracteres)"
+
+
+def log_payload(logger: logging.Logger, level: int, msg: str, payload: Any) -> None:
+    """
+    Registra `msg` con el payload como único argumento, respetando el nivel
+    habilitado, la tasa de muestreo y el truncado configurados.
+
+    Args:
+        logger (logging.Logger): Logger a utilizar.
+        level (int): Nivel del registro.
+        msg (str): Mensaje con un único marcador %s para el payload.
+        payload (Any): Datos a registrar.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    sample_rate = _settings["sample_rate"]
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    max_chars = _settings["max_chars"]
+    if max_chars:
+        payload = PayloadSummary(payload, max_chars)
+    # stacklevel=2 conserva el archivo y la línea de quien registra el payload
+    logger.log(level, msg, payload, stacklevel=2)
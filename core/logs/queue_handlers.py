@@ -0,0 +1,51 @@
+"""
+Path: core/logs/queue_handlers.py
+Handlers que derivan los registros a una cola atendida por un hilo en segundo
+plano, de modo que los hilos de las solicitudes no esperen por la E/S.
+"""
+
+import logging
+import logging.handlers
+from queue import Full
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el registro sin formatearlo.
+
+    El QueueHandler estándar formatea el mensaje en el hilo que registra; aquí el
+    formateo (incluido el de los payloads diferidos) queda a cargo del hilo del
+    QueueListener. Los argumentos del registro no deben modificarse después de
+    registrarlos.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BoundedQueueHandler(DeferredQueueHandler):
+    """
+    DeferredQueueHandler sobre una cola de tamaño acotado.
+
+    Con la política 'drop' los registros que no entran en la cola se descartan
+    (y se cuentan en `dropped`); con 'block' se espera hasta `block_timeout`
+    segundos por un lugar antes de descartarlos.
+    """
+
+    def __init__(self, queue, policy: str = 'drop', block_timeout: float = 1.0):
+        super().__init__(queue)
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Política de cola de logs desconocida: {policy}")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except Full:
+            # Contador aproximado: no se protege con lock para no penalizar al hilo que registra
+            self.dropped += 1
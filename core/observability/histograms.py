@@ -0,0 +1,169 @@
+"""
+Path: core/observability/histograms.py
+Histogramas y contadores en memoria del proceso, con buckets fijos para que
+registrar una medición cueste una búsqueda binaria y una suma.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Límites superiores (en milisegundos) de los buckets de latencia
+LATENCY_BUCKETS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def series_key(name: str, labels: Optional[Dict[str, str]] = None) -> SeriesKey:
+    """
+    Identifica una serie por su nombre y sus etiquetas (ordenadas).
+    """
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+def series_label(key: SeriesKey) -> str:
+    """
+    Nombre legible de la serie, por ejemplo http_requests_total{route=health}.
+    """
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{label}={value}" for label, value in labels) + "}"
+
+
+class Histogram:
+    """
+    Cuenta las observaciones por bucket (el último es +Inf) y acumula su suma.
+    Los percentiles se estiman con el límite superior del bucket que los contiene.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count", "_lock")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        return {"bounds": list(self.bounds), "counts": counts, "sum": total, "count": count}
+
+
+class HistogramStore:
+    """
+    Histogramas y contadores por nombre y etiquetas. Crear una serie nueva toma
+    un lock global; registrar en un histograma existente solo toma su lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[SeriesKey, Histogram] = {}
+        self._counters: Dict[SeriesKey, float] = {}
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                bounds: Sequence[float] = LATENCY_BUCKETS_MS) -> None:
+        key = series_key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(bounds))
+        histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        key = series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[Histogram]:
+        return self._histograms.get(series_key(name, labels))
+
+    def counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        return self._counters.get(series_key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        """
+        Copia serializable (JSON) de todos los histogramas y contadores.
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                for (name, labels), histogram in histograms
+            ],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+        }
+
+    def summary(self) -> dict:
+        """
+        Cantidad, promedio y percentiles aproximados de cada histograma.
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        result = {}
+        for key, histogram in histograms:
+            result[series_label(key)] = {
+                "count": histogram.count,
+                "avg": round(histogram.total / histogram.count, 3) if histogram.count else 0.0,
+                "p50": histogram.percentile(0.50),
+                "p95": histogram.percentile(0.95),
+                "p99": histogram.percentile(0.99),
+            }
+        return result
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+
+def merge_snapshots(snapshots: List[dict]) -> dict:
+    """
+    Suma varios snapshots de HistogramStore (por ejemplo, uno por worker).
+    Los histogramas de una misma serie deben usar los mismos buckets.
+    """
+    histograms: Dict[SeriesKey, dict] = {}
+    counters: Dict[SeriesKey, float] = {}
+    for snapshot in snapshots:
+        for entry in snapshot.get("histograms", ()):
+            key = series_key(entry["name"], entry["labels"])
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {**entry, "counts": list(entry["counts"])}
+            elif merged["bounds"] == entry["bounds"]:
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], entry["counts"])]
+                merged["sum"] += entry["sum"]
+                merged["count"] += entry["count"]
+        for entry in snapshot.get("counters", ()):
+            key = series_key(entry["name"], entry["labels"])
+            counters[key] = counters.get(key, 0) + entry["value"]
+    return {
+        "histograms": [histograms[key] for key in sorted(histograms)],
+        "counters": [{"name": name, "labels": dict(labels), "value": counters[(name, labels)]}
+                     for name, labels in sorted(counters)],
+    }
@@ -0,0 +1,357 @@
+"""
+Path: core/observability/metrics.py
+Métricas del proceso (contadores, histogramas y gauges) y su exportación en
+formato de texto de Prometheus. Con varios workers (gunicorn), cada proceso
+vuelca sus métricas en un archivo de METRICS_DIR y quien atiende metrics/
+suma los archivos de todos.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from core.observability.histograms import HistogramStore, merge_snapshots, series_key
+
+logger = logging.getLogger("app_logger")
+
+METRIC_PREFIX = "madybot_"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_ARCHIVE_FILE = "metrics-archive.json"
+# Archivos absorbidos que se recuerdan en el archivo histórico (ver archive_worker)
+_ARCHIVE_MAX_ABSORBED = 256
+
+# Contadores e histogramas de este proceso
+registry = HistogramStore()
+
+_gauge_sources: Dict[tuple, Callable[[], dict]] = {}
+
+# Gauges que no se suman entre workers: los promedios y proporciones se
+# promedian y los máximos se combinan con max (ver _aggregate_gauges)
+_MEAN_GAUGE_SUFFIXES = ("_ratio", "_rate", "_avg", "_avg_latency", "_avg_ttft")
+_MAX_GAUGE_SUFFIXES = ("_max", "_max_queue_depth", "_p95_latency", "_p95_ttft")
+
+_HELP = {
+    "http_requests_total": "Solicitudes atendidas por ruta y código de estado.",
+    "http_request_duration_ms": "Duración de las solicitudes por ruta (ms).",
+    "stage_duration_ms": "Duración de cada etapa en las solicitudes muestreadas (ms).",
+    "llm_request_duration_ms": "Duración de las llamadas al LLM (ms).",
+    "llm_ttft_ms": "Tiempo hasta el primer fragmento en streaming (ms).",
+    "llm_tokens_total": "Tokens (aproximados) generados por el LLM.",
+    "llm_errors_total": "Llamadas al LLM que terminaron con error.",
+}
+
+
+def register_gauges(prefix: str, stats: Callable[[], dict], labels: Optional[Dict[str, str]] = None) -> None:
+    """
+    Registra una fuente de gauges: al exportar se llama a `stats()` y cada
+    valor numérico se publica como `<prefix>_<clave>`. Registrar de nuevo el
+    mismo prefijo y etiquetas reemplaza la fuente anterior (por ejemplo, al
+    reconstruir los servicios tras un fork).
+    """
+    _gauge_sources[series_key(prefix, labels)] = stats
+
+
+def collect_gauges() -> List[dict]:
+    gauges = []
+    for (prefix, labels), stats in list(_gauge_sources.items()):
+        try:
+            values = stats()
+        except Exception as e:
+            logger.warning("No se pudieron leer las métricas de %s: %s", prefix, e)
+            continue
+        for key, value in values.items():
+            # Se omiten los valores no numéricos, como el estado de un circuit breaker
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.append({"name": f"{prefix}_{key}", "labels": dict(labels), "value": value})
+    return gauges
+
+
+class MultiprocessMetrics:
+    """
+    Comparte las métricas entre los workers mediante archivos en `directory`:
+    cada proceso escribe su snapshot en metrics-<pid>-<id>.json cada
+    `flush_interval` segundos desde un hilo en segundo plano (y siempre al
+    exportar). Las escrituras son atómicas (archivo temporal + rename), así que
+    nunca se lee un archivo a medias.
+
+    Cuando un worker termina, el master suma sus contadores e histogramas a
+    metrics-archive.json (ver archive_worker) para que los totales no
+    retrocedan; sus gauges dejan de publicarse.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._file_name = f"metrics-{os.getpid()}-{os.urandom(4).hex()}.json"
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self._file_name)
+
+    def start_flusher(self) -> None:
+        """
+        Arranca, una vez por proceso, el hilo que vuelca el snapshot periódicamente.
+        Se llama al terminar cada solicitud, de modo que el master (que no atiende
+        solicitudes) no escribe archivos.
+        """
+        if self._flusher is not None:
+            return
+        with self._flush_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name="metrics-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        snapshot = {**registry.snapshot(), "gauges": collect_gauges()}
+        try:
+            _write_json(self.path, snapshot)
+        except OSError as e:
+            logger.warning("No se pudieron escribir las métricas en %s: %s", self.path, e)
+
+    def collect(self) -> dict:
+        """
+        Suma las métricas de todos los workers, incluidas las del histórico.
+        """
+        self.flush()
+        snapshots, gauges = [], []
+        file_names = []
+        try:
+            file_names = sorted(os.listdir(self.directory))
+        except OSError as e:
+            logger.warning("No se pudo leer el directorio de métricas %s: %s", self.directory, e)
+
+        # Primero los workers y luego el histórico: si el master absorbió un
+        # archivo entre ambas lecturas, el histórico lo indica y no se cuenta dos veces
+        workers = {}
+        for file_name in file_names:
+            if file_name.startswith("metrics-") and file_name.endswith(".json") and file_name != _ARCHIVE_FILE:
+                snapshot = _read_json(os.path.join(self.directory, file_name))
+                if snapshot is not None:
+                    workers[file_name] = snapshot
+        archive = _read_json(os.path.join(self.directory, _ARCHIVE_FILE)) or {}
+        absorbed = set(archive.get("absorbed", ()))
+
+        for file_name, snapshot in workers.items():
+            if file_name in absorbed:
+                continue
+            snapshots.append(snapshot)
+            gauges.extend(snapshot.get("gauges", ()))
+        snapshots.append(archive)
+        return {**merge_snapshots(snapshots), "gauges": _aggregate_gauges(gauges)}
+
+    def reset_after_fork(self) -> None:
+        # El hijo escribe su propio archivo
+        self._reset()
+
+
+def archive_worker(directory: str, pid: int) -> None:
+    """
+    Suma los contadores e histogramas de un worker terminado al histórico y
+    elimina su archivo. Debe llamarlo un único proceso (el master de gunicorn,
+    en child_exit), por lo que no necesita bloquear el directorio.
+    """
+    prefix = f"metrics-{pid}-"
+    try:
+        file_names = [name for name in os.listdir(directory) if name.startswith(prefix) and name.endswith(".json")]
+    except OSError:
+        return
+    if not file_names:
+        return
+
+    archive_path = os.path.join(directory, _ARCHIVE_FILE)
+    archive = _read_json(archive_path) or {}
+    snapshots = [archive] + [_read_json(os.path.join(directory, name)) or {} for name in file_names]
+    merged = merge_snapshots(snapshots)
+    merged["absorbed"] = (list(archive.get("absorbed", ())) + file_names)[-_ARCHIVE_MAX_ABSORBED:]
+    _write_json(archive_path, merged)
+    for name in file_names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def clear_directory(directory: str) -> None:
+    """
+    Elimina los archivos de métricas de una ejecución anterior.
+    """
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics-") and (name.endswith(".json") or name.endswith(".tmp")):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+_settings = {"multiprocess": None}
+
+def configure_metrics(directory: Optional[str], flush_interval: float = 5.0) -> None:
+    """
+    Con `directory` las métricas se comparten entre procesos mediante archivos;
+    con None cada proceso exporta solo las suyas.
+    """
+    _settings["multiprocess"] = MultiprocessMetrics(directory, flush_interval) if directory else None
+
+
+def start_flusher() -> None:
+    multiprocess = _settings["multiprocess"]
+    if multiprocess is not None:
+        multiprocess.start_flusher()
+
+
+def flush() -> None:
+    # Al terminar un worker, para no perder lo registrado desde el último volcado
+    multiprocess = _settings["multiprocess"]
+    if multiprocess is not None:
+        multiprocess.flush()
+
+
+def collect() -> dict:
+    """
+    Retorna las métricas a exportar: las de todos los workers si hay un
+    directorio compartido, o las de este proceso.
+    """
+    multiprocess = _settings["multiprocess"]
+    if multiprocess is not None:
+        return multiprocess.collect()
+    return {**registry.snapshot(), "gauges": collect_gauges()}
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """
+    Formatea un snapshot en el formato de texto de Prometheus (0.0.4). Las
+    series de una misma métrica se agrupan en un solo bloque, después de su
+    # TYPE, aunque lleguen intercaladas (por ejemplo, gauges con etiquetas de
+    varias fuentes).
+    """
+    lines = []
+    typed = set()
+
+    def header(name: str, kind: str) -> None:
+        if name in typed:
+            return
+        typed.add(name)
+        base = name[len(METRIC_PREFIX):]
+        if base in _HELP:
+            lines.append(f"# HELP {name} {_HELP[base]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for entry in _group_by_name(snapshot.get("counters", ())):
+        name = METRIC_PREFIX + entry["name"]
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(entry['labels'])} {_format_value(entry['value'])}")
+
+    for entry in _group_by_name(snapshot.get("gauges", ())):
+        name = METRIC_PREFIX + entry["name"]
+        # Los contadores que ya llevan los servicios (stats()) terminan en _total
+        header(name, "counter" if name.endswith("_total") else "gauge")
+        lines.append(f"{name}{_format_labels(entry['labels'])} {_format_value(entry['value'])}")
+
+    for entry in _group_by_name(snapshot.get("histograms", ())):
+        name = METRIC_PREFIX + entry["name"]
+        header(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(list(entry["bounds"]) + [math.inf], entry["counts"]):
+            cumulative += count
+            labels = {**entry["labels"], "le": _format_value(bound)}
+            lines.append(f"{name}_bucket{_format_labels(labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(entry['labels'])} {_format_value(entry['sum'])}")
+        lines.append(f"{name}_count{_format_labels(entry['labels'])} {entry['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _group_by_name(entries) -> List[dict]:
+    # Conserva el orden de la primera aparición de cada nombre y, dentro de
+    # cada nombre, el de sus series
+    groups: Dict[str, List[dict]] = {}
+    for entry in entries:
+        groups.setdefault(entry["name"], []).append(entry)
+    return [entry for group in groups.values() for entry in group]
+
+
+def _aggregate_gauges(gauges: List[dict]) -> List[dict]:
+    """
+    Combina los gauges de todos los workers por serie: suma los contadores y
+    valores acumulables, promedia las proporciones y promedios
+    (`_MEAN_GAUGE_SUFFIXES`) y toma el mayor de los máximos (`_MAX_GAUGE_SUFFIXES`).
+    """
+    values: Dict[tuple, List[float]] = {}
+    for entry in gauges:
+        values.setdefault(series_key(entry["name"], entry["labels"]), []).append(entry["value"])
+    aggregated = []
+    for name, labels in sorted(values):
+        series = values[(name, labels)]
+        if name.endswith(_MEAN_GAUGE_SUFFIXES):
+            value = sum(series) / len(series)
+        elif name.endswith(_MAX_GAUGE_SUFFIXES):
+            value = max(series)
+        else:
+            value = sum(series)
+        aggregated.append({"name": name, "labels": dict(labels), "value": value})
+    return aggregated
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _write_json(path: str, data: dict) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _reset_after_fork() -> None:
+    registry.reset()
+    multiprocess = _settings["multiprocess"]
+    if multiprocess is not None:
+        multiprocess.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    # Cada worker empieza con sus propias métricas
+    os.register_at_fork(after_in_child=_reset_after_fork)
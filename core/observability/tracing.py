@@ -0,0 +1,150 @@
+"""
+Path: core/observability/tracing.py
+Trazas livianas por solicitud: un id por solicitud y la duración de cada etapa
+(spans), guardadas en un ContextVar. Las etapas de las trazas muestreadas se
+vuelcan en las métricas del proceso y en la cabecera Server-Timing.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from core.observability.metrics import registry
+
+logger = logging.getLogger("app_logger")
+
+_settings = {"sample_rate": 1.0}
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("madybot_trace", default=None)
+
+
+def configure_tracing(sample_rate: float) -> None:
+    """
+    Define la fracción de solicitudes cuyas etapas se miden (1.0 = todas,
+    0 = ninguna). Las no muestreadas solo reciben un id de solicitud.
+    """
+    _settings["sample_rate"] = sample_rate
+
+
+class Trace:
+    """
+    Traza de una solicitud: duración acumulada por etapa (en milisegundos) y
+    valores sueltos como el tiempo hasta el primer token.
+    """
+
+    __slots__ = ("request_id", "sampled", "start", "spans", "values", "_lock")
+
+    def __init__(self, request_id: str, sampled: bool):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, duration_ms: float) -> None:
+        # Las etapas repetidas (por ejemplo, en un lote) se acumulan
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+    def add_value(self, name: str, value: float) -> None:
+        """
+        Acumula un valor de la solicitud que no es una etapa, como el tiempo
+        hasta el primer fragmento. Los nombres terminados en '_ms' se incluyen
+        en Server-Timing.
+        """
+        with self._lock:
+            self.values[name] = self.values.get(name, 0.0) + value
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1e3
+
+    def server_timing(self) -> str:
+        """
+        Valor de la cabecera Server-Timing con las etapas medidas hasta ahora.
+        """
+        entries = [f"{name};dur={duration:.2f}" for name, duration in self.spans.items()]
+        entries.extend(f"{name};dur={value:.2f}" for name, value in self.values.items() if name.endswith("_ms"))
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.trace.add_span(self.name, (time.perf_counter() - self.start) * 1e3)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+
+def start_trace(request_id: str = None) -> Trace:
+    """
+    Crea la traza de la solicitud actual y la deja como traza vigente.
+    """
+    sample_rate = _settings["sample_rate"]
+    sampled = sample_rate >= 1.0 or (sample_rate > 0 and random.random() < sample_rate)
+    trace = Trace(request_id or new_request_id(), sampled)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def finish_trace(trace: Trace, route: str = "unknown") -> None:
+    """
+    Registra la duración de la solicitud y, si la traza está muestreada, la de
+    cada etapa. Luego deja de considerarla vigente.
+    """
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    total_ms = trace.elapsed_ms()
+    registry.observe("http_request_duration_ms", total_ms, {"route": route})
+    if not trace.sampled:
+        return
+    for span_name, duration in trace.spans.items():
+        registry.observe("stage_duration_ms", duration, {"stage": span_name})
+    logger.debug("Traza %s (%.2f ms): %s", trace.request_id, total_ms, trace.spans)
+
+
+def span(name: str):
+    """
+    Mide la duración del bloque como una etapa de la traza vigente. Sin traza
+    o en una traza no muestreada no mide nada.
+
+        with span("validate"):
+            ...
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return _NOOP_SPAN
+    return _Span(trace, name)
@@ -0,0 +1,250 @@
+"""
+Path: core/services/admission.py
+Control de admisión con token buckets: cada usuario (user_data.id) y el
+servidor en conjunto tienen una tasa sostenida y una ráfaga máxima de
+solicitudes al LLM. Las solicitudes que exceden el límite se rechazan antes
+de llamar al modelo, con el tiempo sugerido para reintentar.
+"""
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger("app_logger")
+
+GLOBAL_KEY = "global"
+
+
+class RateLimitedError(Exception):
+    """
+    Se lanza cuando el usuario o el servidor superan su tasa de solicitudes.
+
+    :param retry_after: Segundos sugeridos al cliente antes de reintentar.
+    :param scope: 'user' o 'global', según el límite alcanzado.
+    """
+
+    def __init__(self, message: str, retry_after: int, scope: str):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+
+class IBucketBackend(ABC):
+    """Interfaz para los almacenes de token buckets."""
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Consume un token del bucket `key`. Retorna 0 si se consumió o, si el
+        bucket está vacío, los segundos que faltan para el siguiente token.
+        """
+        pass
+
+    @abstractmethod
+    def refund(self, key: str, rate: float, burst: float) -> None:
+        """Devuelve un token consumido (sin superar la ráfaga)."""
+        pass
+
+
+class MemoryBucketBackend(IBucketBackend):
+    """
+    Buckets en memoria del proceso repartidos en `shards` diccionarios, cada
+    uno con su lock, para que los hilos de usuarios distintos no compitan por
+    el mismo. Al superar `max_entries` por shard se descartan los buckets que
+    ya se llenaron según su propia tasa y ráfaga (un bucket lleno equivale a
+    uno nuevo). Los que no están llenos nunca se descartan, porque eso daría
+    una ráfaga nueva a un usuario limitado: si ninguno está lleno, el shard
+    crece y el siguiente descarte se hace al duplicar su tamaño. El tamaño
+    queda acotado por los usuarios nuevos que llegan mientras se llena un bucket.
+    """
+
+    def __init__(self, shards: int = 16, max_entries: int = 10000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        # Cada bucket es [tokens, updated_at, rate, burst]
+        self._shards: List[Tuple[threading.Lock, Dict[str, list]]] = [
+            (threading.Lock(), {}) for _ in range(shards)
+        ]
+        self._prune_at = [max_entries] * shards
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        index = self._shard_index(key)
+        lock, buckets = self._shards[index]
+        now = self._clock()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self._prune_at[index]:
+                    self._prune(buckets, now)
+                    self._prune_at[index] = max(self.max_entries, 2 * len(buckets))
+                bucket = buckets[key] = [burst, now, rate, burst]
+            bucket[2], bucket[3] = rate, burst
+            tokens = _refill(bucket[0], bucket[1], now, rate, burst)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+        return (1 - tokens) / rate if rate > 0 else math.inf
+
+    def refund(self, key: str, rate: float, burst: float) -> None:
+        lock, buckets = self._shards[self._shard_index(key)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(burst, bucket[0] + 1)
+
+    def _shard_index(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % len(self._shards)
+
+    @staticmethod
+    def _prune(buckets: Dict[str, list], now: float) -> None:
+        full = [key for key, (tokens, updated_at, rate, burst) in buckets.items()
+                if _refill(tokens, updated_at, now, rate, burst) >= burst]
+        for key in full:
+            del buckets[key]
+
+
+class SQLiteBucketBackend(IBucketBackend):
+    """
+    Buckets en un archivo SQLite local compartido por todos los workers, de
+    modo que los límites valen para el servidor completo y no por proceso.
+    Cada consumo es una transacción BEGIN IMMEDIATE (serializada entre
+    procesos por el lock de escritura de SQLite). Cada fila guarda la tasa y
+    la ráfaga de su bucket, de modo que la limpieza periódica solo borra los
+    buckets que ya se llenaron según sus propios parámetros.
+    """
+
+    PRUNE_EVERY = 1024
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(token_buckets)")}
+        if columns and "rate" not in columns:
+            # Formato anterior sin tasa ni ráfaga: los buckets son transitorios y se descartan
+            logger.info("Se recrea la tabla de token buckets de %s con tasa y ráfaga por fila.", path)
+            self._conn.execute("DROP TABLE token_buckets")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+            "rate REAL NOT NULL, burst REAL NOT NULL)"
+        )
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._clock()
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+                admitted = tokens >= 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at, rate, burst) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, tokens - 1 if admitted else tokens, now, rate, burst)
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    # Un bucket que ya se habría llenado (con su tasa y ráfaga) equivale a uno nuevo
+                    self._conn.execute(
+                        "DELETE FROM token_buckets WHERE rate > 0 AND updated_at < ? - (burst - tokens) / rate",
+                        (now,)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if admitted:
+            return 0.0
+        return (1 - tokens) / rate if rate > 0 else math.inf
+
+    def refund(self, key: str, rate: float, burst: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE token_buckets SET tokens = MIN(?, tokens + 1) WHERE key = ?", (burst, key)
+            )
+
+
+class AdmissionController:
+    """
+    Aplica un bucket por usuario (`user_rate` solicitudes por segundo con
+    ráfagas de hasta `user_burst`) y uno global (`global_rate`/`global_burst`).
+    Una tasa 0 desactiva el límite correspondiente.
+
+    El bucket del usuario se consulta primero, de modo que un usuario que
+    excede su límite no consume la cuota global; si el global rechaza, el
+    token del usuario se devuelve.
+    """
+
+    def __init__(self, backend: IBucketBackend, user_rate: float = 1.0, user_burst: float = 10.0,
+                 global_rate: float = 0.0, global_burst: float = 100.0):
+        self.backend = backend
+        self.user_rate = user_rate
+        self.user_burst = max(1.0, user_burst)
+        self.global_rate = global_rate
+        self.global_burst = max(1.0, global_burst)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._rejected_user = 0
+        self._rejected_global = 0
+        logger.info("AdmissionController inicializado (usuario %s/s ráfaga %s, global %s/s ráfaga %s).",
+                    user_rate, user_burst, global_rate, global_burst)
+
+    def admit(self, user_id: str) -> None:
+        """
+        Consume un token del usuario y uno global, o lanza RateLimitedError.
+        """
+        user_key = "user:" + user_id if user_id is not None else None
+        if user_key is not None and self.user_rate > 0:
+            wait = self.backend.take(user_key, self.user_rate, self.user_burst)
+            if wait > 0:
+                self._reject("user", wait)
+        if self.global_rate > 0:
+            wait = self.backend.take(GLOBAL_KEY, self.global_rate, self.global_burst)
+            if wait > 0:
+                if user_key is not None and self.user_rate > 0:
+                    self.backend.refund(user_key, self.user_rate, self.user_burst)
+                self._reject("global", wait)
+        with self._lock:
+            self._admitted += 1
+
+    def stats(self) -> dict:
+        """
+        Retorna las solicitudes admitidas y las rechazadas por límite de usuario o global.
+        """
+        with self._lock:
+            return {
+                "admitted_total": self._admitted,
+                "rejected_user_total": self._rejected_user,
+                "rejected_global_total": self._rejected_global,
+            }
+
+    def _reject(self, scope: str, wait: float) -> None:
+        with self._lock:
+            if scope == "user":
+                self._rejected_user += 1
+            else:
+                self._rejected_global += 1
+        retry_after = max(1, math.ceil(wait)) if math.isfinite(wait) else 60
+        logger.debug("Solicitud rechazada por límite %s (reintentar en %ss).", scope, retry_after)
+        raise RateLimitedError("Demasiadas solicitudes, intente nuevamente más tarde.", retry_after, scope)
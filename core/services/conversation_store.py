@@ -0,0 +1,229 @@
+"""
+Path: core/services/conversation_store.py
+Repositorio persistente de conversaciones: guarda cada turno (prompt y
+respuesta) con el id del usuario y los datos de su navegador usando un engine
+de SQLAlchemy con pool de conexiones. Las escrituras se encolan y un hilo en
+segundo plano las inserta por lotes, fuera del hilo de la solicitud.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, create_engine, select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger("app_logger")
+
+metadata = MetaData()
+
+conversation_turns = Table(
+    "conversation_turns", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), nullable=False, index=True),
+    Column("prompt", Text, nullable=False),
+    Column("response", Text, nullable=False),
+    Column("instruction", String(64)),
+    Column("user_agent", String(512)),
+    Column("screen_resolution", String(32)),
+    Column("language", String(32)),
+    Column("platform", String(64)),
+    Column("created_at", Float, nullable=False),
+)
+
+# Columna de conversation_turns para cada campo de browserData
+_BROWSER_COLUMNS = {
+    "userAgent": "user_agent",
+    "screenResolution": "screen_resolution",
+    "language": "language",
+    "platform": "platform",
+}
+
+
+class IConversationRepository(ABC):
+    """Interfaz para los almacenes persistentes de conversaciones."""
+
+    @abstractmethod
+    def record_turn(self, user_id: str, prompt: str, response: str, browser_data: Optional[dict] = None,
+                    instruction: Optional[str] = None) -> None:
+        """Registra un turno de la conversación del usuario."""
+        pass
+
+    @abstractmethod
+    def load_history(self, user_id: str, limit: int) -> List[Tuple[str, str]]:
+        """Retorna los últimos `limit` turnos (prompt, respuesta) del usuario, del más antiguo al más nuevo."""
+        pass
+
+    def close(self) -> None:
+        """Libera los recursos del repositorio."""
+        pass
+
+
+class _FlushRequest:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class SQLConversationRepository(IConversationRepository):
+    """
+    Repositorio sobre cualquier base soportada por SQLAlchemy (MySQL en
+    producción, SQLite para pruebas locales). Crea la tabla si no existe.
+
+    `record_turn` solo encola la fila: un hilo escritor junta hasta `batch_size`
+    filas (o las que lleguen en `flush_interval` segundos) y las inserta en una
+    sola transacción. Si la cola (`max_queue` filas) está llena, la fila se
+    descarta y se cuenta en `dropped_total`, igual que la cola de logs.
+    """
+
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10, pool_recycle: int = 3600,
+                 batch_size: int = 100, flush_interval: float = 0.5, max_queue: int = 10000):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = self._create_engine(url, pool_size, max_overflow, pool_recycle)
+        metadata.create_all(self.engine)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._failed = 0
+        logger.info("Repositorio de conversaciones inicializado (%s).", self.engine.url.render_as_string(hide_password=True))
+
+    @staticmethod
+    def _create_engine(url: str, pool_size: int, max_overflow: int, pool_recycle: int):
+        if url.startswith("sqlite"):
+            # El hilo escritor y los de las solicitudes comparten el pool
+            return create_engine(url, connect_args={"check_same_thread": False})
+        return create_engine(url, pool_size=pool_size, max_overflow=max_overflow,
+                             pool_recycle=pool_recycle, pool_pre_ping=True)
+
+    def record_turn(self, user_id: str, prompt: str, response: str, browser_data: Optional[dict] = None,
+                    instruction: Optional[str] = None) -> None:
+        row = {
+            "user_id": _clip(user_id, conversation_turns.c.user_id),
+            "prompt": prompt or "",
+            "response": response or "",
+            "instruction": _clip(instruction, conversation_turns.c.instruction),
+            "created_at": time.time(),
+        }
+        for field, column in _BROWSER_COLUMNS.items():
+            row[column] = _clip((browser_data or {}).get(field), conversation_turns.c[column])
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            logger.warning("Cola de conversaciones llena: se descarta un turno de %s.", row["user_id"])
+
+    def load_history(self, user_id: str, limit: int) -> List[Tuple[str, str]]:
+        query = (
+            select(conversation_turns.c.prompt, conversation_turns.c.response)
+            .where(conversation_turns.c.user_id == _clip(user_id, conversation_turns.c.user_id))
+            .order_by(conversation_turns.c.id.desc())
+            .limit(limit)
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).fetchall()
+        return [(row[0], row[1]) for row in reversed(rows)]
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Espera a que se escriban las filas encoladas hasta ahora. Retorna False
+        si no terminó dentro de `timeout` segundos.
+        """
+        if self._writer is None:
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def stats(self) -> dict:
+        """
+        Retorna las filas en cola, escritas, descartadas y fallidas y los lotes insertados.
+        """
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written_total": self._written,
+                "batches_total": self._batches,
+                "dropped_total": self._dropped,
+                "failed_total": self._failed,
+            }
+
+    def close(self) -> None:
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._queue.put(_STOP)
+            writer.join(timeout=10)
+        self.engine.dispose()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="conversation-writer", daemon=True)
+                self._writer.start()
+                # Al terminar el proceso se escriben las filas pendientes
+                atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, pending_flushes, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _FlushRequest):
+                    pending_flushes.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for request in pending_flushes:
+                request.done.set()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(conversation_turns.insert(), batch)
+        except SQLAlchemyError as e:
+            with self._lock:
+                self._failed += len(batch)
+            logger.error("No se pudieron guardar %d turnos de conversación: %s", len(batch), e)
+            return
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
+
+
+def _clip(value: Optional[str], column) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value)
+    length = getattr(column.type, "length", None)
+    return value[:length] if length else value
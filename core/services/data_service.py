@@ -3,13 +3,20 @@ Path: core/services/data_service.py
 Servicio para manejar la lógica principal de recepción y procesamiento de datos.
 """
 
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
 from marshmallow import ValidationError
-from core.logs.config_logger import LoggerConfigurator
+from core.logs.payload_logging import log_payload
+from core.observability.tracing import span
+from core.services.admission import RateLimitedError
 from core.services.data_validator import DataSchemaValidator
 from core.services.response_generator import ResponseGenerator
+from core.services.system_instructions import UnknownInstructionError
 from core.channels.imessaging_channel import IMessagingChannel
 
-logger = LoggerConfigurator().configure()
+logger = logging.getLogger("app_logger")
 
 class DataService:
     """
@@ -17,40 +24,242 @@ class DataService:
     desacoplándola del framework Flask.
     """
 
-    def __init__(self, validator: DataSchemaValidator, response_generator: ResponseGenerator, channel: IMessagingChannel):
+    def __init__(self, validator: DataSchemaValidator, response_generator: ResponseGenerator, channel: IMessagingChannel,
+                 batch_max_workers: int = 4, instruction_store=None, conversation_repository=None,
+                 job_runner=None, admission=None, chat_sessions_enabled: bool = True, webhook_channel=None):
         self.validator = validator
         self.response_generator = response_generator
         self.channel = channel
+        self.batch_max_workers = batch_max_workers
+        # Si es None (por ejemplo, con FakeLLMClient) el campo 'instruction' se ignora
+        self.instruction_store = instruction_store
+        # Si es None las conversaciones no se persisten
+        self.conversation_repository = conversation_repository
+        # Si es None el modo job de receive-data/ no está disponible
+        self.job_runner = job_runner
+        # Si es None no se aplican límites de solicitudes por usuario ni globales
+        self.admission = admission
+        # Con False todas las solicitudes son sin historial (como 'stateless': true)
+        self.chat_sessions_enabled = chat_sessions_enabled
+        # Si es None la ruta webhook/ no está disponible
+        self.webhook_channel = webhook_channel
+        self._batch_executor = None
 
-    def process_incoming_data(self, json_data: dict) -> str:
+    def process_incoming_data(self, json_data: dict) -> Union[str, Iterator[str]]:
         """
         Valida los datos entrantes, obtiene el mensaje y decide si la respuesta
         se genera en streaming o de forma normal.
-        Retorna el mensaje de respuesta final para ser renderizado.
+        Retorna el mensaje de respuesta final para ser renderizado o, en modo
+        streaming, un iterador con los fragmentos a medida que el modelo los genera.
+        Si el usuario o el servidor superan su tasa de solicitudes lanza
+        RateLimitedError, antes de llamar al modelo.
+        """
+        valid_data, processed_data, instruction = self._prepare(json_data)
+        self._admit(processed_data)
+        return self._generate(valid_data, processed_data, instruction)
+
+    def _prepare(self, json_data: dict):
+        """
+        Valida los datos, los pasa por el canal y comprueba la variante de
+        instrucciones. Retorna (datos válidos, datos del canal, instrucción).
         """
 
         # Validar
-        logger.info("Validando datos: %s", json_data)
+        log_payload(logger, logging.INFO, "Validando datos: %s", json_data)
         try:
-            valid_data = self.validator.validate(json_data)
+            with span("validate"):
+                valid_data = self.validator.validate(json_data)
         except ValidationError as err:
             logger.warning("Error de validación: %s", err.messages)
             raise
 
         # Recibir mensaje desde el canal
-        processed_data = self.channel.receive_message(valid_data)
-        logger.info("Datos procesados desde el canal: %s", processed_data)
+        with span("channel"):
+            processed_data = self.channel.receive_message(valid_data)
+        log_payload(logger, logging.INFO, "Datos procesados desde el canal: %s", processed_data)
+        return valid_data, processed_data, self._check_instruction(processed_data.get('instruction'))
 
+    def _generate(self, valid_data: dict, processed_data: dict, instruction) -> Union[str, Iterator[str]]:
         message_text = processed_data.get('message')
         is_stream = processed_data.get('stream', False)
+        session_id = self._session_id(processed_data)
 
         try:
             if is_stream:
                 logger.info("Generando respuesta en modo streaming.")
-                return self.response_generator.generate_response_streaming(message_text)
+                chunks = self.response_generator.generate_response_stream(
+                    message_text, session_id=session_id, instruction=instruction
+                )
+                if self.conversation_repository is None or session_id is None:
+                    return chunks
+                return self._record_when_complete(chunks, valid_data, processed_data)
             else:
                 logger.info("Generando respuesta en modo normal.")
-                return self.response_generator.generate_response(message_text)
+                response_text = self.response_generator.generate_response(
+                    message_text, session_id=session_id, instruction=instruction
+                )
+                self._record_turn(valid_data, processed_data, response_text)
+                return response_text
         except Exception as e:
             logger.error("Error procesando la solicitud: %s", e)
             raise
+
+    def process_webhook_update(self, update: dict) -> bool:
+        """
+        Procesa una actualización del canal de webhooks: genera la respuesta en
+        modo normal y la encola en el canal, que la envía en segundo plano.
+        Retorna False si la actualización no trae un mensaje de texto con chat
+        (se ignora). Si la cola de salida está llena lanza
+        OutboundQueueFullError.
+        """
+        if self.webhook_channel is None:
+            raise RuntimeError("El canal de webhooks no está habilitado.")
+        with span("channel"):
+            processed_data = self.webhook_channel.receive_message(update)
+        if not processed_data.get('message') or processed_data.get('chat_id') is None:
+            logger.info("Actualización del webhook sin mensaje de texto: se ignora.")
+            return False
+        self._admit(processed_data)
+
+        response_text = self._generate(update, processed_data, None)
+        with span("send"):
+            self.webhook_channel.send_message(response_text, chat_id=processed_data['chat_id'])
+        return True
+
+    def submit_job(self, json_data: dict) -> str:
+        """
+        Valida la solicitud y la encola como un job que genera la respuesta en
+        segundo plano. Los errores de validación y los límites de solicitudes
+        se aplican de inmediato. El job usa siempre el modo streaming para que
+        la salida parcial pueda consultarse mientras el modelo genera.
+        Retorna el id del job.
+        """
+        if self.job_runner is None:
+            raise RuntimeError("El modo job no está habilitado.")
+        valid_data, processed_data, instruction = self._prepare(json_data)
+        self._admit(processed_data)
+
+        job_data = dict(processed_data, stream=True)
+        return self.job_runner.submit(lambda: self._generate(valid_data, job_data, instruction))
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        Retorna el estado del job o None si no existe, venció o no hay modo job.
+        """
+        if self.job_runner is None:
+            return None
+        return self.job_runner.get(job_id)
+
+    def process_batch(self, items: List[dict]) -> List[dict]:
+        """
+        Valida una lista de solicitudes en una sola pasada y genera las respuestas
+        de las válidas con paralelismo acotado (`batch_max_workers`).
+        Las respuestas se generan siempre en modo normal (sin streaming).
+        Retorna un resultado por solicitud, en el mismo orden de entrada, con la
+        respuesta o el error correspondiente.
+        """
+        logger.info("Procesando lote de %d solicitudes.", len(items))
+        with span("validate"):
+            valid_items, errors = self.validator.validate_many(items)
+        if errors:
+            logger.warning("Errores de validación en el lote: %s", errors)
+
+        results = [None] * len(items)
+        pending = []
+        for index, valid_data in enumerate(valid_items):
+            if valid_data is None:
+                results[index] = {"response_MadyBot": None, "error": errors.get(index, "Datos inválidos en la solicitud.")}
+            else:
+                pending.append((index, valid_data))
+
+        if pending:
+            executor = self._get_batch_executor()
+            # Cada elemento corre en una copia del contexto para conservar la traza de la solicitud
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._process_batch_item, data)
+                for _, data in pending
+            ]
+            for (index, _), future in zip(pending, futures):
+                results[index] = future.result()
+        return results
+
+    def _process_batch_item(self, valid_data: dict) -> dict:
+        with span("channel"):
+            processed_data = self.channel.receive_message(valid_data)
+        try:
+            instruction = self._check_instruction(processed_data.get('instruction'))
+        except ValidationError as err:
+            return {"response_MadyBot": None, "error": err.messages}
+        try:
+            self._admit(processed_data)
+        except RateLimitedError as e:
+            return {"response_MadyBot": None, "error": str(e)}
+        try:
+            response_text = self.response_generator.generate_response(
+                processed_data.get('message'), session_id=self._session_id(processed_data), instruction=instruction
+            )
+            self._record_turn(valid_data, processed_data, response_text)
+            return {"response_MadyBot": response_text, "error": None}
+        except Exception as e:
+            logger.error("Error procesando un elemento del lote: %s", e)
+            return {"response_MadyBot": None, "error": "Error procesando la solicitud."}
+
+    def _session_id(self, processed_data: dict):
+        """
+        Retorna el id de la conversación del usuario, o None si la solicitud es
+        sin historial ('stateless': true o CHAT_SESSIONS_ENABLED=false). Sin
+        sesión el modelo no recibe el historial y las capas de caché y de
+        agrupación pueden compartir la respuesta entre usuarios.
+        """
+        if not self.chat_sessions_enabled or processed_data.get('stateless'):
+            return None
+        return processed_data.get('chat_id')
+
+    def _admit(self, processed_data: dict) -> None:
+        if self.admission is not None:
+            with span("admission"):
+                self.admission.admit(processed_data.get('chat_id'))
+
+    def _record_turn(self, valid_data: dict, processed_data: dict, response_text: str) -> None:
+        """
+        Encola el turno en el repositorio de conversaciones (si hay uno) con el
+        id del usuario y los datos de su navegador. Las solicitudes sin
+        historial no se registran.
+        """
+        if self.conversation_repository is None or self._session_id(processed_data) is None:
+            return
+        user_data = valid_data.get('user_data') or {}
+        self.conversation_repository.record_turn(
+            processed_data['chat_id'], processed_data.get('message'), response_text,
+            browser_data=user_data.get('browserData'), instruction=processed_data.get('instruction')
+        )
+
+    def _record_when_complete(self, chunks: Iterator[str], valid_data: dict, processed_data: dict) -> Iterator[str]:
+        collected = []
+        for chunk in chunks:
+            collected.append(chunk)
+            yield chunk
+        # Solo se registra si el stream se consumió completo
+        self._record_turn(valid_data, processed_data, "".join(collected))
+
+    def _check_instruction(self, instruction):
+        """
+        Retorna la variante de instrucciones pedida (None si no se pidió o si no
+        hay almacén de instrucciones). Una variante inexistente es un error de
+        validación.
+        """
+        if instruction is None or self.instruction_store is None:
+            return None
+        try:
+            self.instruction_store.get(instruction)
+        except UnknownInstructionError as e:
+            logger.warning("Variante de instrucciones desconocida: %s", instruction)
+            raise ValidationError({"instruction": [str(e)]}) from None
+        return instruction
+
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        if self._batch_executor is None:
+            self._batch_executor = ThreadPoolExecutor(
+                max_workers=self.batch_max_workers, thread_name_prefix="batch"
+            )
+        return self._batch_executor
@@ -4,7 +4,7 @@ Este módulo contiene un esquema de validación de datos
 y un validador para los datos recibidos en el controlador.
 """
 
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, ValidationError, missing, RAISE
 
 class BrowserDataSchema(Schema):
     """
@@ -31,11 +31,20 @@ class DataSchema(Schema):
         missing=False,
         error_messages={"invalid": "El campo 'stream' debe ser un valor booleano."}
     )
+    stateless = fields.Boolean(
+        missing=False,
+        error_messages={"invalid": "El campo 'stateless' debe ser un valor booleano."}
+    )
     user_data = fields.Nested(UserDataSchema, required=True, error_messages={"required": "El campo 'user_data' es obligatorio."})
     datetime = fields.Integer(
         missing=False,
         error_messages={"invalid": "El campo 'datetime' debe ser un valor entero."}
     )
+    instruction = fields.String(
+        required=False,
+        validate=lambda v: len(v) <= 64,
+        error_messages={"validator_failed": "El campo 'instruction' no debe exceder los 64 caracteres."}
+    )
 
 class DataSchemaValidator:
     """
@@ -60,3 +69,121 @@ class DataSchemaValidator:
     def validate(self, data):
         "Valida los datos usando el esquema."
         return self.schema.load(data)
+
+    def validate_many(self, items):
+        """
+        Valida una lista de datos en una sola pasada del esquema.
+        Retorna una tupla (datos válidos, errores): la primera lista tiene el
+        mismo largo que `items` con None en las posiciones inválidas, y el
+        diccionario de errores está indexado por posición.
+        """
+        try:
+            return self.schema.load(items, many=True), {}
+        except ValidationError as err:
+            errors = err.messages if isinstance(err.messages, dict) else {}
+            valid_data = err.valid_data if isinstance(err.valid_data, list) else []
+            results = [
+                valid_data[index] if index not in errors and index < len(valid_data) else None
+                for index in range(len(items))
+            ]
+            return results, errors
+
+
+_FALLBACK = object()
+
+def _compile_schema(schema: Schema):
+    """
+    Traduce un esquema a una función que valida el caso habitual (tipos JSON
+    exactos, sin campos desconocidos) y retorna el mismo resultado que
+    `schema.load`, o _FALLBACK si el dato requiere la validación completa.
+    Retorna None si el esquema usa algo que no sabe compilar.
+    """
+    # Los hooks (pre_load, post_load, validates_schema, ...) no se compilan
+    if schema.unknown != RAISE or any(schema._hooks.values()):
+        return None
+
+    checks = []
+    for name, field in schema.load_fields.items():
+        key = field.data_key or name
+        if isinstance(field, fields.Nested):
+            nested = field.schema
+            if field.many or nested.only or nested.exclude:
+                return None
+            convert = _compile_schema(nested)
+            if convert is None:
+                return None
+        elif type(field) is fields.String:
+            convert = _exact_type(str)
+        elif type(field) is fields.Boolean:
+            convert = _exact_type(bool)
+        elif type(field) is fields.Integer:
+            convert = _exact_type(int)
+        else:
+            return None
+        checks.append((name, key, field.required, field.load_default, convert, tuple(field.validators)))
+
+    allowed_keys = frozenset(key for _, key, *_ in checks)
+
+    def convert_schema(data):
+        if type(data) is not dict or not allowed_keys.issuperset(data):
+            return _FALLBACK
+        result = {}
+        for name, key, required, load_default, convert, validators in checks:
+            value = data.get(key, missing)
+            if value is missing:
+                if required:
+                    return _FALLBACK
+                if load_default is not missing:
+                    result[name] = load_default() if callable(load_default) else load_default
+                continue
+            value = convert(value)
+            if value is _FALLBACK:
+                return _FALLBACK
+            for validator in validators:
+                if validator(value) is False:
+                    return _FALLBACK
+            result[name] = value
+        return result
+
+    return convert_schema
+
+def _exact_type(expected: type):
+    def convert(value):
+        # type() y no isinstance(): True no debe aceptarse como entero
+        return value if type(value) is expected else _FALLBACK
+    return convert
+
+
+class CompiledDataValidator(DataSchemaValidator):
+    """
+    Validador con el mismo resultado que DataSchemaValidator pero más rápido
+    para las solicitudes válidas habituales: las comprobaciones de cada campo
+    se precalculan a partir del esquema al crear el validador.
+
+    Todo lo que no encaja en el caso habitual (datos inválidos, conversiones
+    como "true" -> True o "5" -> 5) se delega en marshmallow, por lo que los
+    mensajes de error son exactamente los del esquema.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._convert = _compile_schema(self.schema)
+
+    def validate(self, data):
+        "Valida los datos usando las comprobaciones precalculadas."
+        if self._convert is not None:
+            result = self._convert(data)
+            if result is not _FALLBACK:
+                return result
+        return super().validate(data)
+
+    def validate_many(self, items):
+        """
+        Igual que DataSchemaValidator.validate_many; si algún elemento no pasa
+        las comprobaciones rápidas se valida el lote completo con marshmallow.
+        """
+        if self._convert is not None and type(items) is list:
+            results = [self._convert(item) for item in items]
+            if not any(result is _FALLBACK for result in results):
+                return results, {}
+        return super().validate_many(items)
@@ -0,0 +1,240 @@
+"""
+Path: core/services/job_store.py
+Modo asíncrono de receive-data/: la solicitud se encola como un job que un
+pool de hilos procesa en segundo plano, y el cliente consulta su estado, la
+salida parcial y el resultado en jobs/<id>/. Así una respuesta larga no
+retiene al worker HTTP ni supera los timeouts del proxy.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Union
+from core.services.llm_dispatcher import LLMOverloadedError
+
+logger = logging.getLogger("app_logger")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class IJobBackend(ABC):
+    """Interfaz para los almacenes de jobs (diccionarios serializables a JSON)."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Retorna el job o None si no existe o venció."""
+        pass
+
+    @abstractmethod
+    def save(self, job: dict) -> None:
+        """Guarda (o reemplaza) el job."""
+        pass
+
+
+class MemoryJobBackend(IJobBackend):
+    """
+    Jobs en memoria del proceso, acotados a `max_entries` (se descartan los
+    más antiguos) y con expiración por TTL desde su última actualización.
+    Con varios workers el job solo es visible en el que lo recibió.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            item = self._entries.get(job_id)
+            if item is None:
+                return None
+            job, stored_at = item
+            if self._clock() - stored_at > self.ttl:
+                del self._entries[job_id]
+                return None
+            return dict(job)
+
+    def save(self, job: dict) -> None:
+        with self._lock:
+            # Se conserva el orden de creación: una actualización no rejuvenece el job
+            self._entries[job["id"]] = (dict(job), self._clock())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteJobBackend(IJobBackend):
+    """
+    Jobs en un archivo SQLite local, compartido por todos los workers del
+    servidor: el job puede consultarse desde cualquiera de ellos. El límite de
+    entradas y el TTL se aplican cada `PRUNE_EVERY` escrituras.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 3600.0, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or self._clock() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def save(self, job: dict) -> None:
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, data, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (job["id"], json.dumps(job), now, now)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - self.ttl,))
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE id NOT IN (SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+
+class JobRunner:
+    """
+    Ejecuta jobs en un pool de `max_workers` hilos y guarda su estado en el
+    backend. Un job es una función que retorna el texto de la respuesta o un
+    iterador de fragmentos; en el segundo caso la salida parcial se guarda
+    como máximo cada `progress_interval` segundos.
+
+    Si ya hay `max_pending` jobs sin terminar, submit lanza LLMOverloadedError.
+    """
+
+    def __init__(self, backend: IJobBackend, max_workers: int = 4, max_pending: int = 64,
+                 progress_interval: float = 0.25, retry_after: int = 1):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.progress_interval = progress_interval
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        logger.info("JobRunner inicializado (max_workers=%s, max_pending=%s).", max_workers, max_pending)
+
+    def submit(self, work: Callable[[], Union[str, Iterator[str]]]) -> str:
+        """
+        Encola `work` y retorna el id del job.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise LLMOverloadedError("Demasiados jobs pendientes.", self.retry_after)
+            self._pending += 1
+            self._submitted += 1
+
+        now = time.time()
+        job = {"id": uuid.uuid4().hex, "status": JOB_QUEUED, "partial": "", "result": None, "error": None,
+               "created_at": now, "updated_at": now}
+        try:
+            self.backend.save(job)
+            self._executor.submit(self._run, job, work)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        logger.info("Job %s encolado.", job["id"])
+        return job["id"]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.backend.get(job_id)
+
+    def stats(self) -> dict:
+        """
+        Retorna los jobs pendientes (en cola o en ejecución), los que están
+        corriendo y los totales de enviados, completados, fallidos y rechazados.
+        """
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "running": self._running,
+                "submitted_total": self._submitted,
+                "completed_total": self._completed,
+                "failed_total": self._failed,
+                "rejected_total": self._rejected,
+            }
+
+    def _run(self, job: dict, work: Callable[[], Union[str, Iterator[str]]]) -> None:
+        with self._lock:
+            self._running += 1
+        try:
+            self._update(job, status=JOB_RUNNING)
+            result = work()
+            if not isinstance(result, str):
+                result = self._consume(job, result)
+            self._update(job, status=JOB_DONE, partial=result, result=result)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            logger.error("Error procesando el job %s: %s", job["id"], e)
+            message = ("El servidor está ocupado, intente nuevamente." if isinstance(e, LLMOverloadedError)
+                       else "Error procesando la solicitud.")
+            try:
+                self._update(job, status=JOB_FAILED, error=message)
+            except Exception as save_error:
+                logger.error("No se pudo guardar el estado del job %s: %s", job["id"], save_error)
+            with self._lock:
+                self._failed += 1
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+
+    def _consume(self, job: dict, chunks: Iterator[str]) -> str:
+        collected = []
+        last_save = time.monotonic()
+        for chunk in chunks:
+            collected.append(chunk)
+            now = time.monotonic()
+            if now - last_save >= self.progress_interval:
+                self._update(job, partial="".join(collected))
+                last_save = now
+        return "".join(collected)
+
+    def _update(self, job: dict, **changes) -> None:
+        job.update(changes, updated_at=time.time())
+        self.backend.save(job)
@@ -4,19 +4,31 @@ Interfaz ILLMClient para clientes LLM.
 """
 
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class ILLMClient(ABC):
     @abstractmethod
-    def send_message(self, message: str) -> str:
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
         """
         Envía un mensaje al modelo LLM y retorna la respuesta completa en texto.
+        Si se indica `session_id`, el mensaje se agrega a la conversación de ese usuario.
+        `instruction` elige la variante de instrucciones del sistema (None usa la
+        predeterminada).
         """
         pass
 
     @abstractmethod
-    def send_message_streaming(self, message: str, chunk_size: int = 30) -> str:
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        """
+        Envía un mensaje al modelo LLM y produce los fragmentos de la respuesta
+        a medida que el modelo los genera.
+        """
+        pass
+
+    def send_message_streaming(self, message: str, chunk_size: int = 30, session_id: str = None,
+                               instruction: str = None) -> str:
         """
         Envía un mensaje al modelo LLM y retorna la respuesta
         en modo streaming (concatenada finalmente).
         """
-        pass
+        return "".join(self.stream_message(message, session_id=session_id, instruction=instruction))
@@ -0,0 +1,317 @@
+"""
+Path: core/services/llm_coalescing.py
+Capa de ILLMClient que agrupa llamadas idénticas simultáneas (single-flight):
+mientras una llamada sin sesión está en curso, las que piden el mismo prompt
+normalizado con las mismas instrucciones esperan su resultado en lugar de
+llamar de nuevo al modelo.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Iterator, List, Optional
+from core.observability.tracing import span
+from core.services.llm_client import ILLMClient
+from core.services.llm_dispatcher import LLMOverloadedError
+from core.services.response_cache import normalize_prompt
+
+logger = logging.getLogger("app_logger")
+
+class _WaitTimeout(Exception):
+    """
+    Venció la espera de un seguidor (distinto de un TimeoutError del modelo,
+    que se propaga tal cual).
+    """
+
+
+class _Flight:
+    """
+    Una llamada en curso compartida por el líder y sus seguidores.
+
+    En modo normal el líder publica el resultado (o el error) con resolve/fail.
+    En streaming los fragmentos se guardan en orden y cualquier lector que
+    necesite el siguiente lo pide a la fuente, de modo que el stream avanza
+    aunque el líder deje de leer. Si todos los lectores abandonan antes del
+    final, la fuente se cierra.
+    """
+
+    def __init__(self, on_done: Callable[["_Flight"], None]):
+        self._cond = threading.Condition()
+        self._on_done = on_done
+        self._done = False
+        self._abandoned = False
+        self._result: Optional[str] = None
+        self._error: Optional[BaseException] = None
+        self._chunks: List[str] = []
+        self._source: Optional[Iterator[str]] = None
+        self._pulling = False
+        self._readers = 0
+
+    def resolve(self, result: str) -> None:
+        with self._cond:
+            self._result = result
+            self._finish()
+        self._on_done(self)
+
+    def fail(self, error: BaseException) -> None:
+        with self._cond:
+            self._error = error
+            self._finish()
+        self._on_done(self)
+
+    def wait(self, timeout: float) -> str:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._done, timeout):
+                raise _WaitTimeout
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+    def attach(self, source: Iterator[str]) -> None:
+        with self._cond:
+            self._source = source
+            self._cond.notify_all()
+
+    def add_reader(self) -> bool:
+        """
+        Suma un lector. Retorna False si la llamada fue abandonada y ya no
+        puede completarse.
+        """
+        with self._cond:
+            if self._abandoned:
+                return False
+            self._readers += 1
+            return True
+
+    def remove_reader(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            abandon = self._readers == 0 and not self._done
+            if abandon:
+                self._abandoned = True
+                self._finish()
+            source = self._source
+        if abandon:
+            self._close_source(source)
+            self._on_done(self)
+
+    def chunk_at(self, index: int, timeout: float) -> Optional[str]:
+        """
+        Retorna el fragmento `index` (None al final del stream), esperando como
+        máximo `timeout` segundos a que esté disponible.
+        """
+        while True:
+            with self._cond:
+                ready = self._cond.wait_for(
+                    lambda: index < len(self._chunks) or self._done or (not self._pulling and self._source is not None),
+                    timeout
+                )
+                if not ready:
+                    raise _WaitTimeout
+                if index < len(self._chunks):
+                    return self._chunks[index]
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return None
+                # Nadie está leyendo de la fuente: este lector pide el siguiente fragmento
+                self._pulling = True
+            self._pull()
+
+    def _pull(self) -> None:
+        finished = False
+        try:
+            chunk = next(self._source)
+        except StopIteration:
+            with self._cond:
+                finished = self._finish()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+                finished = self._finish()
+        else:
+            with self._cond:
+                self._chunks.append(chunk)
+        finally:
+            with self._cond:
+                self._pulling = False
+                self._cond.notify_all()
+        if finished:
+            self._on_done(self)
+
+    def _finish(self) -> bool:
+        # Se llama con el lock tomado; _on_done se llama después, sin el lock
+        if self._done:
+            return False
+        self._done = True
+        self._cond.notify_all()
+        return True
+
+    @staticmethod
+    def _close_source(source: Optional[Iterator[str]]) -> None:
+        close = getattr(source, 'close', None)
+        if close:
+            close()
+
+
+class _FlightReader:
+    """
+    Iterador de un lector sobre los fragmentos de un _Flight. Al cerrarse (o
+    ser recolectado sin consumirse) deja de contar como lector.
+    """
+
+    def __init__(self, flight: _Flight, timeout: float, on_timeout: Callable[[], Exception]):
+        self._flight = flight
+        self._timeout = timeout
+        self._on_timeout = on_timeout
+        self._index = 0
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._closed:
+            raise StopIteration
+        try:
+            chunk = self._flight.chunk_at(self._index, self._timeout)
+        except _WaitTimeout:
+            self.close()
+            raise self._on_timeout() from None
+        except BaseException:
+            self.close()
+            raise
+        if chunk is None:
+            self.close()
+            raise StopIteration
+        self._index += 1
+        return chunk
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._flight.remove_reader()
+
+    def __del__(self):
+        self.close()
+
+
+class CoalescingLLMClient(ILLMClient):
+    """
+    Envuelve otro ILLMClient y comparte una sola llamada entre las solicitudes
+    idénticas que llegan mientras está en curso. Las conversaciones con
+    historial (session_id) nunca se agrupan porque su respuesta depende del
+    contexto previo.
+
+    Los seguidores reciben el mismo resultado o el mismo error que el líder; en
+    streaming reciben todos los fragmentos desde el primero. Si un seguidor
+    espera más de `follower_timeout` segundos sin novedades se lanza
+    LLMOverloadedError.
+    """
+
+    def __init__(self, llm_client: ILLMClient, instruction_store=None, follower_timeout: float = 60.0,
+                 retry_after: int = 1):
+        self.llm_client = llm_client
+        self.instruction_store = instruction_store
+        self.follower_timeout = follower_timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._flights: Dict[tuple, _Flight] = {}
+        self._issued = 0
+        self._coalesced = 0
+        self._bypassed = 0
+        self._timeouts = 0
+        logger.info("CoalescingLLMClient inicializado (follower_timeout=%ss).", follower_timeout)
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        if session_id is not None:
+            return self._bypass().send_message(message, session_id=session_id, instruction=instruction)
+
+        key = self._key("send", message, instruction)
+        flight, leader = self._join(key, reader=False)
+        if not leader:
+            with span("llm_coalesced"):
+                try:
+                    return flight.wait(self.follower_timeout)
+                except _WaitTimeout:
+                    raise self._timeout_error() from None
+
+        try:
+            response_text = self.llm_client.send_message(message, instruction=instruction)
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        flight.resolve(response_text)
+        return response_text
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        if session_id is not None:
+            return self._bypass().stream_message(message, session_id=session_id, instruction=instruction)
+
+        key = self._key("stream", message, instruction)
+        flight, leader = self._join(key, reader=True)
+        reader = _FlightReader(flight, self.follower_timeout, self._timeout_error)
+        if not leader:
+            return reader
+
+        try:
+            flight.attach(self.llm_client.stream_message(message, instruction=instruction))
+        except BaseException as e:
+            flight.fail(e)
+            reader.close()
+            raise
+        return reader
+
+    def stats(self) -> dict:
+        """
+        Retorna las llamadas emitidas al modelo, las agrupadas (que esperaron a
+        otra), las que no se agrupan por tener sesión y las esperas vencidas.
+        """
+        with self._lock:
+            return {
+                "issued_total": self._issued,
+                "coalesced_total": self._coalesced,
+                "bypassed_total": self._bypassed,
+                "timeouts_total": self._timeouts,
+                "in_flight": len(self._flights),
+            }
+
+    def _join(self, key: tuple, reader: bool):
+        """
+        Retorna la llamada en curso para `key` y si quien llama es el líder
+        (debe emitirla) o un seguidor.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and (not reader or flight.add_reader()):
+                self._coalesced += 1
+                return flight, False
+            # No hay llamada en curso (o fue abandonada): se emite una nueva
+            flight = _Flight(lambda done, key=key: self._forget(key, done))
+            if reader:
+                flight.add_reader()
+            self._flights[key] = flight
+            self._issued += 1
+            return flight, True
+
+    def _forget(self, key: tuple, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _bypass(self) -> ILLMClient:
+        with self._lock:
+            self._bypassed += 1
+        return self.llm_client
+
+    def _key(self, mode: str, message: str, instruction: Optional[str]) -> tuple:
+        if self.instruction_store is not None:
+            instruction_key = self.instruction_store.get(instruction).digest
+        else:
+            instruction_key = instruction
+        return mode, instruction_key, normalize_prompt(message)
+
+    def _timeout_error(self) -> LLMOverloadedError:
+        with self._lock:
+            self._timeouts += 1
+        logger.warning("Tiempo de espera agotado esperando una llamada agrupada (%.1fs).", self.follower_timeout)
+        return LLMOverloadedError("Tiempo de espera agotado esperando la respuesta del LLM.", self.retry_after)
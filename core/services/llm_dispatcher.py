@@ -0,0 +1,160 @@
+"""
+Path: core/services/llm_dispatcher.py
+Capa de despacho para ILLMClient que limita la cantidad de llamadas simultáneas
+al modelo y rechaza rápidamente cuando la cola de espera está llena.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Iterator
+from core.observability.tracing import current_trace
+from core.services.llm_client import ILLMClient
+
+logger = logging.getLogger("app_logger")
+
+class LLMOverloadedError(Exception):
+    """
+    Se lanza cuando no hay capacidad para atender una llamada al modelo.
+
+    :param retry_after: Segundos sugeridos al cliente antes de reintentar.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _ReleasingIterator:
+    """
+    Itera los fragmentos de una respuesta en streaming y libera el lugar
+    ocupado en el despachador al terminar, fallar o cerrarse el iterador.
+    """
+
+    def __init__(self, iterator: Iterator[str], release: Callable[[], None]):
+        self._iterator = iterator
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        try:
+            close = getattr(self._iterator, 'close', None)
+            if close:
+                close()
+        finally:
+            self._release()
+
+    __del__ = close
+
+
+class DispatchingLLMClient(ILLMClient):
+    """
+    Envuelve otro ILLMClient permitiendo como máximo `max_in_flight` llamadas
+    en curso. Las demás esperan en una cola de hasta `max_queue` lugares durante
+    `queue_timeout` segundos; si la cola está llena o la espera vence se lanza
+    LLMOverloadedError sin bloquear al worker.
+    """
+
+    def __init__(self, llm_client: ILLMClient, max_in_flight: int = 8, max_queue: int = 16,
+                 queue_timeout: float = 30.0, retry_after: int = 1):
+        self.llm_client = llm_client
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._max_queue_depth = 0
+        self._rejected = 0
+        self._dispatched = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        logger.info("DispatchingLLMClient inicializado (max_in_flight=%s, max_queue=%s).",
+                    max_in_flight, max_queue)
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        self._acquire()
+        try:
+            return self.llm_client.send_message(message, session_id=session_id, instruction=instruction)
+        finally:
+            self._release()
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        # El lugar se reserva antes de devolver el iterador para poder responder
+        # 503 antes de comenzar la respuesta en streaming.
+        self._acquire()
+        try:
+            chunks = iter(self.llm_client.stream_message(message, session_id=session_id, instruction=instruction))
+        except BaseException:
+            self._release()
+            raise
+        return _ReleasingIterator(chunks, self._release)
+
+    def stats(self) -> dict:
+        """
+        Retorna las métricas de la cola y del tiempo de espera por un lugar.
+        """
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "max_queue_depth": self._max_queue_depth,
+                "dispatched_total": self._dispatched,
+                "rejected_total": self._rejected,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+                "wait_time_avg": self._wait_time_total / self._dispatched if self._dispatched else 0.0,
+            }
+
+    def _acquire(self) -> None:
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._queued >= self.max_queue:
+                    self._rejected += 1
+                    logger.warning("Cola de llamadas al LLM llena (%s en espera).", self._queued)
+                    raise LLMOverloadedError("La cola de llamadas al LLM está llena.", self.retry_after)
+                self._queued += 1
+                self._max_queue_depth = max(self._max_queue_depth, self._queued)
+
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self._queued -= 1
+                if not acquired:
+                    self._rejected += 1
+            if not acquired:
+                logger.warning("Tiempo de espera agotado para llamar al LLM (%.1fs).", self.queue_timeout)
+                raise LLMOverloadedError("Tiempo de espera agotado en la cola del LLM.", self.retry_after)
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_flight += 1
+            self._dispatched += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+        trace = current_trace()
+        if trace is not None and trace.sampled:
+            trace.add_span("llm_queue", waited * 1e3)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
@@ -0,0 +1,90 @@
+"""
+Path: core/services/llm_impl/fake_llm.py
+Implementación de ILLMClient sin red, pensada para pruebas y mediciones offline.
+"""
+
+import itertools
+import logging
+import time
+from typing import Iterator, List
+from core.services.llm_client import ILLMClient
+
+logger = logging.getLogger("app_logger")
+
+class FakeLLMClient(ILLMClient):
+    """
+    Cliente LLM determinista que responde con un texto fijo (o un eco del mensaje)
+    simulando la latencia del primer fragmento y el tiempo entre fragmentos.
+    Los tokens se aproximan como 4 caracteres, igual que en el conteo offline.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, response_text: str = None, chunk_size: int = 30,
+                 first_chunk_delay: float = 0.0, chunk_delay: float = 0.0,
+                 tokens_per_second: float = 0.0, response_tokens: int = 0,
+                 scripted_delays: List[float] = None, scripted_failures: List[bool] = None):
+        """
+        :param response_text: Texto a responder. Si es None se responde con un eco del mensaje.
+        :param chunk_size: Tamaño de cada fragmento producido en modo streaming.
+        :param first_chunk_delay: Segundos de espera antes del primer fragmento.
+        :param chunk_delay: Segundos de espera entre fragmentos sucesivos.
+        :param tokens_per_second: Si es mayor a 0, agrega a cada fragmento el tiempo
+                                  que tardaría en generarse a esa velocidad.
+        :param response_tokens: Si es mayor a 0, completa el eco hasta ese largo
+                                aproximado en tokens.
+        :param scripted_delays: Latencias del primer fragmento para llamadas sucesivas
+                                (se recorren en ciclo); reemplazan a `first_chunk_delay`.
+        :param scripted_failures: Para llamadas sucesivas (en ciclo), True indica que
+                                  la llamada debe fallar con RuntimeError.
+        """
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.scripted_delays = scripted_delays
+        self.scripted_failures = scripted_failures
+        self._calls = itertools.count()
+        logger.info("FakeLLMClient inicializado correctamente.")
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        """
+        Retorna la respuesta completa luego de simular la generación de todos los fragmentos.
+        """
+        return "".join(self.stream_message(message))
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        """
+        Produce la respuesta en fragmentos de `chunk_size` caracteres.
+        El cliente no guarda historial ni usa instrucciones del sistema, por lo
+        que `session_id` e `instruction` se ignoran.
+        """
+        text = self._build_response(message)
+        call = next(self._calls)
+        first_chunk_delay = self.first_chunk_delay
+        if self.scripted_delays:
+            first_chunk_delay = self.scripted_delays[call % len(self.scripted_delays)]
+        if first_chunk_delay:
+            time.sleep(first_chunk_delay)
+        if self.scripted_failures and self.scripted_failures[call % len(self.scripted_failures)]:
+            raise RuntimeError("Falla simulada de FakeLLMClient.")
+        for offset in range(0, len(text), self.chunk_size):
+            chunk = text[offset:offset + self.chunk_size]
+            delay = self.chunk_delay if offset else 0.0
+            if self.tokens_per_second > 0:
+                delay += len(chunk) / self.CHARS_PER_TOKEN / self.tokens_per_second
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    def _build_response(self, message: str) -> str:
+        if self.response_text is not None:
+            return self.response_text
+        text = f"Respuesta simulada para: {message}"
+        target_chars = self.response_tokens * self.CHARS_PER_TOKEN
+        if len(text) < target_chars:
+            filler = " lorem ipsum dolor sit amet"
+            text += (filler * (target_chars // len(filler) + 1))[:target_chars - len(text)]
+        return text
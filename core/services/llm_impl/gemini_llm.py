@@ -3,71 +3,172 @@ Path: core/services/llm_impl/gemini_llm.py
 Implementación de ILLMClient utilizando la API de Gemini.
 """
 
-import google.generativeai as genai
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Union
 from core.services.llm_client import ILLMClient
-from core.logs.config_logger import LoggerConfigurator
+from core.services.session_store import ChatSessionStore
+from core.services.system_instructions import SystemInstruction, SystemInstructionStore
+from core.services.token_budget import approximate_tokens
+from core.services.llm_impl.gemini_transport import IGeminiTransport
 
-logger = LoggerConfigurator().configure()
+logger = logging.getLogger("app_logger")
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "response_mime_type": "text/plain",
+}
 
 class GeminiLLMClient(ILLMClient):
-    def __init__(self, api_key: str, system_instruction: str):
+    # Versiones de instrucciones con modelo (o cuerpo de solicitud) ya armado
+    MAX_COMPILED_INSTRUCTIONS = 16
+
+    def __init__(self, api_key: str, system_instruction: Union[str, SystemInstructionStore],
+                 session_store: ChatSessionStore = None, model_name: str = DEFAULT_MODEL_NAME,
+                 generation_config: dict = None, transport: IGeminiTransport = None):
         """
         Inicializa el cliente para Gemini, configurando la API key y el modelo.
+
+        :param system_instruction: Texto fijo o SystemInstructionStore con variantes
+                                   y recarga en caliente.
+        :param transport: Transporte HTTP propio (ver gemini_transport). Si es None
+                          se usa el SDK google-generativeai con su transporte por defecto.
         """
         self.api_key = api_key
-        genai.configure(api_key=self.api_key)
-
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config={
-                "temperature": 1,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-                "response_mime_type": "text/plain",
-            },
-            system_instruction=system_instruction
-        )
-
-        # Sesión de chat (se inicia en "lazy mode")
-        self.chat_session = None
+        self.model_name = model_name
+        self.generation_config = generation_config or DEFAULT_GENERATION_CONFIG
+        if not isinstance(system_instruction, SystemInstructionStore):
+            system_instruction = SystemInstructionStore.static(system_instruction)
+        self.instructions = system_instruction
+        self.transport = transport
+
+        if transport is None:
+            # El SDK tarda en importarse: se carga al crear el cliente y no al importar el módulo
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+
+        # Modelo del SDK (o parte fija del cuerpo JSON) por hash de instrucciones
+        self._compiled = OrderedDict()
+        self._compiled_lock = threading.Lock()
+        self._compiled_for(self.instructions.get())
+
+        # Sesiones de chat por usuario (se crean en "lazy mode")
+        self.sessions = session_store if session_store is not None else ChatSessionStore()
         logger.info("GeminiLLMClient inicializado correctamente.")
 
-    def send_message(self, message: str) -> str:
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
         """
         Envía un mensaje al modelo y retorna la respuesta en texto.
         """
-        self._start_chat_session()
-        try:
-            response = self.chat_session.send_message(message)
-            return response.text
-        except Exception as e:
-            logger.error("Error al enviar mensaje a Gemini: %s", e)
-            raise
-
-    def send_message_streaming(self, message: str, chunk_size: int = 30) -> str:
+        system_instruction = self.instructions.get(instruction)
+        compiled = self._compiled_for(system_instruction)
+        # El presupuesto de contexto descuenta la instrucción de esta solicitud (variante y versión vigentes)
+        reserved_tokens = approximate_tokens(system_instruction.text)
+        with self.sessions.session(session_id) as session:
+            try:
+                contents = session.contents_for(message, reserved_tokens)
+                if self.transport is None:
+                    response_text = compiled.generate_content(contents).text
+                else:
+                    response = self.transport.generate_content(self.model_name, self._build_request(compiled, contents))
+                    response_text = self._response_text(response)
+                session.append_turn(message, response_text)
+                return response_text
+            except Exception as e:
+                logger.error("Error al enviar mensaje a Gemini: %s", e)
+                raise
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
         """
-        Envía un mensaje al modelo y retorna la respuesta en modo streaming.
-        Se va acumulando en un string final.
+        Envía un mensaje al modelo en modo streaming y produce cada fragmento
+        de texto apenas Gemini lo entrega.
         """
-        self._start_chat_session()
-        try:
-            response = self.chat_session.send_message(message)
-            full_response = ""
-            offset = 0
-            while offset < len(response.text):
-                chunk = response.text[offset:offset + chunk_size]
-                full_response += chunk
-                offset += chunk_size
-            return full_response
-        except Exception as e:
-            logger.error("Error durante la respuesta streaming en Gemini: %s", e)
-            raise
-
-    def _start_chat_session(self):
+        system_instruction = self.instructions.get(instruction)
+        compiled = self._compiled_for(system_instruction)
+        reserved_tokens = approximate_tokens(system_instruction.text)
+        with self.sessions.session(session_id) as session:
+            try:
+                chunks = []
+                for text in self._stream_texts(compiled, session.contents_for(message, reserved_tokens)):
+                    if text:
+                        chunks.append(text)
+                        yield text
+                session.append_turn(message, "".join(chunks))
+            except Exception as e:
+                logger.error("Error durante la respuesta streaming en Gemini: %s", e)
+                raise
+
+    def _stream_texts(self, compiled, contents: List[dict]) -> Iterator[str]:
+        if self.transport is None:
+            for chunk in compiled.generate_content(contents, stream=True):
+                yield chunk.text
+            return
+        for response in self.transport.stream_generate_content(self.model_name, self._build_request(compiled, contents)):
+            yield self._response_text(response, allow_empty=True)
+
+    def _compiled_for(self, instruction: SystemInstruction):
+        """
+        Retorna el GenerativeModel (SDK) o la parte fija del cuerpo JSON
+        (transporte HTTP) para esa versión de instrucciones, creándolo una sola
+        vez. Volver a una versión anterior reutiliza lo ya creado.
         """
-        Inicia la sesión de chat si no existe.
+        with self._compiled_lock:
+            compiled = self._compiled.get(instruction.digest)
+            if compiled is not None:
+                self._compiled.move_to_end(instruction.digest)
+                return compiled
+
+        if self.transport is None:
+            compiled = self._genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                system_instruction=instruction.text or None
+            )
+        else:
+            compiled = {"generationConfig": {_camel_case(key): value for key, value in self.generation_config.items()}}
+            if instruction.text:
+                compiled["systemInstruction"] = {"parts": [{"text": instruction.text}]}
+
+        with self._compiled_lock:
+            compiled = self._compiled.setdefault(instruction.digest, compiled)
+            while len(self._compiled) > self.MAX_COMPILED_INSTRUCTIONS:
+                self._compiled.popitem(last=False)
+        logger.debug("Modelo preparado para las instrucciones %s.", instruction.digest)
+        return compiled
+
+    @staticmethod
+    def _build_request(compiled: dict, contents: List[dict]) -> dict:
         """
-        if not self.chat_session:
-            self.chat_session = self.model.start_chat()
-            logger.info("Sesión de chat iniciada con el modelo Gemini.")
+        Arma el cuerpo JSON de generateContent a partir del historial (formato
+        del SDK) y de la parte fija precalculada.
+        """
+        return {
+            **compiled,
+            "contents": [
+                {"role": content["role"], "parts": [{"text": part} for part in content["parts"]]}
+                for content in contents
+            ],
+        }
+
+    @staticmethod
+    def _response_text(response: dict, allow_empty: bool = False) -> str:
+        candidates = response.get("candidates") or []
+        if not candidates:
+            if allow_empty:
+                return ""
+            raise ValueError(f"Gemini no retornó candidatos: {response.get('promptFeedback')}")
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+
+def _camel_case(key: str) -> str:
+    head, *tail = key.split('_')
+    return head + "".join(word.capitalize() for word in tail)
@@ -0,0 +1,200 @@
+"""
+Path: core/services/llm_impl/gemini_transport.py
+Transporte HTTP para la API REST de Gemini con un pool de conexiones persistente,
+timeouts por llamada, reintentos con backoff exponencial y jitter ante 429/5xx, y
+métricas de reutilización de conexiones.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator
+
+logger = logging.getLogger("app_logger")
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+class GeminiHTTPError(Exception):
+    """
+    Respuesta de error de la API de Gemini que no se reintenta (o que agotó
+    los reintentos).
+    """
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"Gemini respondió {status_code}: {body[:500]}")
+        self.status_code = status_code
+        self.body = body
+
+
+class IGeminiTransport(ABC):
+    """
+    Envía solicitudes generateContent ya armadas (formato JSON de la API REST)
+    y retorna las respuestas decodificadas.
+    """
+
+    @abstractmethod
+    def generate_content(self, model_name: str, request: dict) -> dict:
+        """
+        Retorna la respuesta completa de generateContent.
+        """
+
+    @abstractmethod
+    def stream_generate_content(self, model_name: str, request: dict) -> Iterator[dict]:
+        """
+        Produce cada respuesta parcial de streamGenerateContent.
+        """
+
+    def stats(self) -> dict:
+        return {}
+
+
+class HTTPGeminiTransport(IGeminiTransport):
+    """
+    Transporte sobre requests.Session: las conexiones TLS se mantienen abiertas
+    (keep-alive) en un pool de hasta `pool_size` conexiones y se reutilizan
+    entre llamadas y entre hilos.
+
+    Los errores 429/5xx y los fallos de conexión se reintentan hasta `max_retries`
+    veces esperando un tiempo aleatorio entre 0 y min(backoff_max, backoff_base * 2^intento)
+    (o lo indicado por Retry-After, si es mayor). En streaming solo se reintenta
+    antes de recibir el primer fragmento.
+
+    `base_url` permite apuntar a un servidor local que imite la API.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, api_version: str = "v1beta",
+                 pool_size: int = 16, connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 session=None, sleep: Callable[[float], None] = time.sleep,
+                 rng: Callable[[], float] = random.random):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.api_version = api_version
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._rng = rng
+
+        if session is None:
+            session = requests.Session()
+            # Los reintentos los maneja este transporte (con jitter), no urllib3
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=False)
+            session.mount(self.base_url, adapter)
+        session.headers.update({"x-goog-api-key": api_key, "Content-Type": "application/json"})
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._requests_total = 0
+        self._retries_total = 0
+        self._errors_total = 0
+        logger.info("HTTPGeminiTransport inicializado (%s, pool de %d conexiones).", self.base_url, pool_size)
+
+    def generate_content(self, model_name: str, request: dict) -> dict:
+        response = self._post(f"{self._model_url(model_name)}:generateContent", request, stream=False)
+        try:
+            return response.json()
+        finally:
+            response.close()
+
+    def stream_generate_content(self, model_name: str, request: dict) -> Iterator[dict]:
+        response = self._post(f"{self._model_url(model_name)}:streamGenerateContent?alt=sse", request, stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    yield json.loads(line[5:])
+        finally:
+            response.close()
+
+    def stats(self) -> dict:
+        """
+        Contadores del transporte y del pool: `connections_opened` es la cantidad
+        de conexiones nuevas y `reuse_ratio` la fracción de solicitudes que
+        reutilizaron una conexión abierta.
+        """
+        connections_opened = 0
+        pool_requests = 0
+        for adapter in self.session.adapters.values():
+            pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+                    pool_requests += pool.num_requests
+        with self._lock:
+            stats = {
+                "requests_total": self._requests_total,
+                "retries_total": self._retries_total,
+                "errors_total": self._errors_total,
+            }
+        stats.update({
+            "connections_opened": connections_opened,
+            "reuse_ratio": round(1 - connections_opened / pool_requests, 4) if pool_requests else 0.0,
+        })
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _model_url(self, model_name: str) -> str:
+        return f"{self.base_url}/{self.api_version}/models/{model_name}"
+
+    def _post(self, url: str, request: dict, stream: bool):
+        body = json.dumps(request)
+        attempt = 0
+        while True:
+            with self._lock:
+                self._requests_total += 1
+            retry_after = None
+            try:
+                response = self.session.post(url, data=body, timeout=self.timeout, stream=stream)
+            except (self._requests.ConnectionError, self._requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._count_error()
+                    raise
+                logger.warning("Fallo de conexión con Gemini (intento %d): %s", attempt + 1, e)
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    self._count_error()
+                    error = GeminiHTTPError(response.status_code, response.text)
+                    response.close()
+                    raise error
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                logger.warning("Gemini respondió %d (intento %d); se reintenta.", response.status_code, attempt + 1)
+                response.close()
+
+            self._sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+            with self._lock:
+                self._retries_total += 1
+
+    def _backoff(self, attempt: int, retry_after: float = None) -> float:
+        # "Full jitter": evita que los reintentos de varios hilos lleguen sincronizados
+        delay = self._rng() * min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _count_error(self) -> None:
+        with self._lock:
+            self._errors_total += 1
+
+    @staticmethod
+    def _parse_retry_after(value: str):
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
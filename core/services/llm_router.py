@@ -0,0 +1,399 @@
+"""
+Path: core/services/llm_router.py
+Enrutador de ILLMClient que reparte las llamadas entre varios backends (modelos
+de Gemini u otros clientes) según su latencia y tasa de errores recientes, con
+failover, solicitudes de cobertura (hedging) y circuit breakers.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, Tuple
+from core.services.llm_client import ILLMClient
+from core.services.llm_dispatcher import LLMOverloadedError
+
+logger = logging.getLogger("app_logger")
+
+class CircuitBreaker:
+    """
+    Corta un backend luego de `failure_threshold` fallas consecutivas.
+
+    Estados: 'closed' (acepta llamadas), 'open' (las rechaza durante
+    `reset_timeout` segundos) y 'half_open' (admite una sola llamada de prueba a
+    la vez; su éxito lo cierra y su falla lo abre otra vez).
+
+    allow() solo consulta el estado; quien va a llamar al backend reserva el
+    lugar con try_acquire(), que en 'half_open' lo concede a una sola llamada
+    hasta que se registre su resultado.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """
+        Indica si el backend puede recibir una llamada, sin reservarla.
+        """
+        with self._lock:
+            state = self._state()
+            return state == 'closed' or (state == 'half_open' and not self._trial_in_flight)
+
+    def try_acquire(self) -> bool:
+        """
+        Reserva una llamada al backend. En 'half_open' solo la primera obtiene
+        el lugar; las demás reciben False hasta que se registre su resultado.
+        """
+        with self._lock:
+            state = self._state()
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return state == 'closed'
+
+    def retry_after(self) -> float:
+        """
+        Segundos que faltan para que el breaker admita una llamada de prueba.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit breaker abierto tras %d fallas consecutivas.", self._failures)
+                self._opened_at = self._clock()
+
+
+class BackendStats:
+    """
+    Latencias y resultados de las últimas `window` llamadas de un backend.
+    Las latencias se guardan en dos ventanas: la de la respuesta completa
+    (send_message) y la del primer fragmento (stream_message), porque el
+    tiempo hasta el primer fragmento es mucho menor y mezclarlas distorsiona
+    el orden de los backends y el umbral de hedging.
+    """
+
+    def __init__(self, window: int = 100):
+        self._lock = threading.Lock()
+        self._latencies = {False: deque(maxlen=window), True: deque(maxlen=window)}
+        self._outcomes = deque(maxlen=window)
+        self.calls_total = 0
+        self.errors_total = 0
+        self.hedges_total = 0
+
+    def record(self, latency: float, ok: bool, streaming: bool = False) -> None:
+        with self._lock:
+            self.calls_total += 1
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies[streaming].append(latency)
+            else:
+                self.errors_total += 1
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges_total += 1
+
+    def average_latency(self, streaming: bool = False) -> float:
+        """
+        Latencia media reciente (del primer fragmento si `streaming`); 0 si
+        todavía no hay mediciones, de modo que un backend sin historial se
+        pruebe antes que uno conocido.
+        """
+        with self._lock:
+            latencies = self._latencies[streaming]
+            return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def percentile(self, q: float, streaming: bool = False) -> float:
+        with self._lock:
+            if not self._latencies[streaming]:
+                return 0.0
+            ordered = sorted(self._latencies[streaming])
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+
+class _Backend:
+    def __init__(self, name: str, client: ILLMClient, breaker: CircuitBreaker, stats: BackendStats):
+        self.name = name
+        self.client = client
+        self.breaker = breaker
+        self.stats = stats
+
+    def score(self, streaming: bool = False) -> float:
+        # Un error reciente pesa como varias veces la latencia media
+        return self.stats.average_latency(streaming) * (1.0 + 4.0 * self.stats.error_rate())
+
+
+class RoutingLLMClient(ILLMClient):
+    """
+    Envía cada llamada al backend sano con menor latencia reciente y, si falla,
+    reintenta con el siguiente (failover).
+
+    Con `hedge=True` las llamadas sin sesión (las solicitudes "stateless" de la
+    ruta web) que no responden dentro del p95 del backend elegido (como mínimo
+    `hedge_min_delay` segundos) se duplican en el segundo mejor backend y se usa
+    la primera respuesta exitosa; en streaming se compara el primer fragmento y
+    el stream perdedor se cierra. Las llamadas con sesión no se duplican para no
+    registrar dos veces el mismo turno; para que el failover conserve el
+    historial, los backends deben compartir el ChatSessionStore.
+    """
+
+    def __init__(self, backends: List[Tuple[str, ILLMClient]], hedge: bool = True,
+                 hedge_min_delay: float = 0.5, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, stats_window: int = 100, hedge_max_workers: int = 32,
+                 clock: Callable[[], float] = time.monotonic):
+        if not backends:
+            raise ValueError("RoutingLLMClient requiere al menos un backend.")
+        self.backends = [
+            _Backend(name, client, CircuitBreaker(failure_threshold, reset_timeout, clock), BackendStats(stats_window))
+            for name, client in backends
+        ]
+        self.hedge = hedge and len(self.backends) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_workers = hedge_max_workers
+        self._clock = clock
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        logger.info("RoutingLLMClient inicializado con backends: %s", [b.name for b in self.backends])
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        candidates = self._candidates()
+        if self.hedge and session_id is None and len(candidates) > 1:
+            return self._send_hedged(message, candidates, instruction)
+
+        last_error = None
+        for backend in candidates:
+            try:
+                return self._call(backend, message, session_id, instruction)
+            except Exception as e:
+                logger.warning("Falla en el backend LLM '%s': %s", backend.name, e)
+                last_error = e
+        raise last_error
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        """
+        Elige el backend igual que send_message, según la latencia del primer
+        fragmento. El failover solo es posible hasta recibir el primer
+        fragmento, y el hedging también se decide sobre él.
+        """
+        candidates = self._candidates(streaming=True)
+        if self.hedge and session_id is None and len(candidates) > 1:
+            return self._continue_stream(*self._open_stream_hedged(message, candidates, instruction))
+
+        last_error = None
+        for backend in candidates:
+            try:
+                return self._continue_stream(*self._open_stream(backend, message, session_id, instruction))
+            except Exception as e:
+                logger.warning("Falla en el backend LLM '%s': %s", backend.name, e)
+                last_error = e
+        raise last_error
+
+    def stats(self) -> dict:
+        """
+        Estado de cada backend: breaker, latencias recientes y contadores.
+        """
+        return {
+            backend.name: {
+                "state": backend.breaker.state,
+                "avg_latency": round(backend.stats.average_latency(), 4),
+                "p95_latency": round(backend.stats.percentile(0.95), 4),
+                "avg_ttft": round(backend.stats.average_latency(streaming=True), 4),
+                "p95_ttft": round(backend.stats.percentile(0.95, streaming=True), 4),
+                "error_rate": round(backend.stats.error_rate(), 4),
+                "calls_total": backend.stats.calls_total,
+                "errors_total": backend.stats.errors_total,
+                "hedges_total": backend.stats.hedges_total,
+            }
+            for backend in self.backends
+        }
+
+    def _candidates(self, streaming: bool = False) -> List[_Backend]:
+        """
+        Backends cuyo breaker admite llamadas, del más rápido al más lento.
+        """
+        candidates = sorted((b for b in self.backends if b.breaker.allow()), key=lambda b: b.score(streaming))
+        if not candidates:
+            retry_after = min(b.breaker.retry_after() for b in self.backends)
+            raise LLMOverloadedError("No hay backends LLM disponibles.", retry_after=max(1, round(retry_after)))
+        return candidates
+
+    def _call(self, backend: _Backend, message: str, session_id: str = None, instruction: str = None) -> str:
+        self._acquire(backend)
+        start = self._clock()
+        try:
+            response = backend.client.send_message(message, session_id=session_id, instruction=instruction)
+        except Exception:
+            self._record(backend, start, ok=False)
+            raise
+        self._record(backend, start, ok=True)
+        return response
+
+    def _open_stream(self, backend: _Backend, message: str, session_id: str = None,
+                     instruction: str = None) -> Tuple[str, Iterator[str]]:
+        """
+        Inicia el stream en `backend` y espera el primer fragmento; la latencia
+        registrada es la del primer fragmento.
+        """
+        self._acquire(backend)
+        start = self._clock()
+        try:
+            stream = backend.client.stream_message(message, session_id=session_id, instruction=instruction)
+            first_chunk = next(stream, None)
+        except Exception:
+            self._record(backend, start, ok=False, streaming=True)
+            raise
+        self._record(backend, start, ok=True, streaming=True)
+        return first_chunk, stream
+
+    @staticmethod
+    def _acquire(backend: _Backend) -> None:
+        # Entre _candidates() y la llamada otra solicitud pudo tomar la única prueba de un breaker en 'half_open'
+        if not backend.breaker.try_acquire():
+            raise LLMOverloadedError(f"El backend '{backend.name}' no admite llamadas por ahora.",
+                                     retry_after=max(1, round(backend.breaker.retry_after())))
+
+    def _record(self, backend: _Backend, start: float, ok: bool, streaming: bool = False) -> None:
+        backend.stats.record(self._clock() - start, ok, streaming)
+        if ok:
+            backend.breaker.record_success()
+        else:
+            backend.breaker.record_failure()
+
+    def _send_hedged(self, message: str, candidates: List[_Backend], instruction: str = None) -> str:
+        executor = self._get_executor()
+        primary, secondary = candidates[0], candidates[1]
+        hedge_delay = max(self.hedge_min_delay, primary.stats.percentile(0.95))
+
+        futures = {executor.submit(self._call, primary, message, None, instruction): primary}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            secondary.stats.record_hedge()
+            logger.debug("Hedging: '%s' no respondió en %.3fs, se consulta '%s'.",
+                         primary.name, hedge_delay, secondary.name)
+            futures[executor.submit(self._call, secondary, message, None, instruction)] = secondary
+
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    logger.warning("Falla en el backend LLM '%s': %s", futures[future].name, e)
+                    last_error = e
+
+        # Ambos fallaron (o falló el único consultado): failover por el resto
+        for backend in candidates:
+            if backend in futures.values() or not backend.breaker.allow():
+                continue
+            try:
+                return self._call(backend, message, None, instruction)
+            except Exception as e:
+                logger.warning("Falla en el backend LLM '%s': %s", backend.name, e)
+                last_error = e
+        raise last_error
+
+    def _open_stream_hedged(self, message: str, candidates: List[_Backend],
+                            instruction: str = None) -> Tuple[str, Iterator[str]]:
+        executor = self._get_executor()
+        primary, secondary = candidates[0], candidates[1]
+        hedge_delay = max(self.hedge_min_delay, primary.stats.percentile(0.95, streaming=True))
+
+        futures = {executor.submit(self._open_stream, primary, message, None, instruction): primary}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            secondary.stats.record_hedge()
+            logger.debug("Hedging: '%s' no entregó el primer fragmento en %.3fs, se consulta '%s'.",
+                         primary.name, hedge_delay, secondary.name)
+            futures[executor.submit(self._open_stream, secondary, message, None, instruction)] = secondary
+
+        winner, last_error = None, None
+        pending = set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    opened = future.result()
+                except Exception as e:
+                    logger.warning("Falla en el backend LLM '%s': %s", futures[future].name, e)
+                    last_error = e
+                    continue
+                if winner is None:
+                    winner = opened
+                else:
+                    opened[1].close()
+        # El stream perdedor se cierra en cuanto entregue su primer fragmento
+        for future in pending:
+            future.add_done_callback(_close_opened_stream)
+        if winner is not None:
+            return winner
+
+        # Ambos fallaron (o falló el único consultado): failover por el resto
+        for backend in candidates:
+            if backend in futures.values() or not backend.breaker.allow():
+                continue
+            try:
+                return self._open_stream(backend, message, None, instruction)
+            except Exception as e:
+                logger.warning("Falla en el backend LLM '%s': %s", backend.name, e)
+                last_error = e
+        raise last_error
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.hedge_max_workers,
+                                                        thread_name_prefix="llm-hedge")
+        return self._executor
+
+    @staticmethod
+    def _continue_stream(first_chunk, stream: Iterator[str]) -> Iterator[str]:
+        if first_chunk is not None:
+            yield first_chunk
+        yield from stream
+
+
+def _close_opened_stream(future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result()[1].close()
@@ -0,0 +1,82 @@
+"""
+Path: core/services/llm_tracing.py
+Capa de ILLMClient que mide cada llamada al modelo: duración, tiempo hasta el
+primer fragmento, tokens (aproximados) de la respuesta y errores. Los valores
+se registran en las métricas del proceso y en la traza de la solicitud.
+"""
+
+import time
+from typing import Iterator, Optional
+from core.observability.metrics import registry
+from core.observability.tracing import Trace, current_trace
+from core.services.llm_client import ILLMClient
+from core.services.token_budget import approximate_tokens
+
+class TracingLLMClient(ILLMClient):
+    """
+    Envuelve otro ILLMClient. Las métricas se registran en todas las llamadas;
+    la etapa 'llm' y el valor 'llm_ttft_ms' (solo en streaming), únicamente
+    en las trazas muestreadas.
+    """
+
+    def __init__(self, llm_client: ILLMClient):
+        self.llm_client = llm_client
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        trace = self._sampled_trace()
+        start = time.perf_counter()
+        try:
+            response_text = self.llm_client.send_message(message, session_id=session_id, instruction=instruction)
+        except Exception:
+            registry.increment("llm_errors_total")
+            raise
+        finally:
+            self._record_duration(trace, start)
+        registry.increment("llm_tokens_total", approximate_tokens(response_text))
+        return response_text
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        trace = self._sampled_trace()
+        start = time.perf_counter()
+        try:
+            chunks = self.llm_client.stream_message(message, session_id=session_id, instruction=instruction)
+        except Exception:
+            registry.increment("llm_errors_total")
+            self._record_duration(trace, start)
+            raise
+        return self._measured_chunks(chunks, trace, start)
+
+    def _measured_chunks(self, chunks: Iterator[str], trace: Optional[Trace], start: float) -> Iterator[str]:
+        tokens = 0
+        first_chunk = True
+        try:
+            for chunk in chunks:
+                if first_chunk:
+                    ttft_ms = (time.perf_counter() - start) * 1e3
+                    registry.observe("llm_ttft_ms", ttft_ms)
+                    if trace is not None:
+                        trace.add_value("llm_ttft_ms", ttft_ms)
+                    first_chunk = False
+                tokens += approximate_tokens(chunk)
+                yield chunk
+        except Exception:
+            registry.increment("llm_errors_total")
+            raise
+        finally:
+            self._record_duration(trace, start)
+            registry.increment("llm_tokens_total", tokens)
+            close = getattr(chunks, 'close', None)
+            if close:
+                close()
+
+    @staticmethod
+    def _sampled_trace() -> Optional[Trace]:
+        trace = current_trace()
+        return trace if trace is not None and trace.sampled else None
+
+    @staticmethod
+    def _record_duration(trace: Optional[Trace], start: float) -> None:
+        duration_ms = (time.perf_counter() - start) * 1e3
+        registry.observe("llm_request_duration_ms", duration_ms)
+        if trace is not None:
+            trace.add_span("llm", duration_ms)
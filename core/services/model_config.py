@@ -3,11 +3,22 @@ Path: core/services/model_config.py
 Factory o configuración para crear instancias de clientes LLM (Gemini u otros).
 """
 
+import logging
 import os
-from core.logs.config_logger import LoggerConfigurator
-from core.services.llm_impl.gemini_llm import GeminiLLMClient
+from core.observability.metrics import register_gauges
+from core.services.llm_impl.gemini_llm import GeminiLLMClient, DEFAULT_MODEL_NAME, DEFAULT_GENERATION_CONFIG
+from core.services.llm_impl.fake_llm import FakeLLMClient
+from core.services.session_store import ChatSessionStore
+from core.services.system_instructions import SystemInstructionStore
+from core.services.llm_coalescing import CoalescingLLMClient
+from core.services.llm_dispatcher import DispatchingLLMClient
+from core.services.llm_tracing import TracingLLMClient
+from core.services.llm_router import RoutingLLMClient
+from core.services.response_cache import (
+    CachingLLMClient, MemoryCacheBackend, SQLiteCacheBackend, build_cache_namespace
+)
 
-logger = LoggerConfigurator().configure()
+logger = logging.getLogger("app_logger")
 
 class ModelConfig:
     """
@@ -16,35 +27,238 @@ class ModelConfig:
     """
 
     def __init__(self):
+        self.provider = os.getenv('LLM_PROVIDER', 'gemini').lower()
+        self.model_name = os.getenv('GEMINI_MODEL', DEFAULT_MODEL_NAME)
+        # Con más de un modelo en GEMINI_MODELS se usa RoutingLLMClient
+        self.model_names = [
+            name.strip() for name in os.getenv('GEMINI_MODELS', self.model_name).split(',') if name.strip()
+        ]
+        self.generation_config = DEFAULT_GENERATION_CONFIG
+        self.conversation_repository = self._create_conversation_repository()
+        # Lo crea _create_base_client; FakeLLMClient no guarda historial
+        self.session_store = None
+        if self.provider == 'fake':
+            logger.info("Usando FakeLLMClient: no se realizarán llamadas a Gemini.")
+            self.api_key = None
+            self.system_instruction = None
+            self.instruction_store = None
+            return
+
         self.api_key = os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("La API Key de Gemini no está configurada en las variables de entorno.")
 
         logger.info("API Key de Gemini obtenida correctamente.")
-        self.system_instruction = self._load_system_instruction()
+        self.instruction_store = self._load_instruction_store()
+        # Versión inicial de la variante predeterminada (las recargas las resuelve el almacén)
+        self.system_instruction = self.instruction_store.get().text
 
     def create_llm_client(self):
         """
-        Crea y retorna una instancia de GeminiLLMClient utilizando
-        la configuración actual.
+        Crea y retorna el cliente LLM a utilizar: el cliente concreto
+        envuelto por el despachador que limita las llamadas simultáneas
+        (salvo que LLM_MAX_IN_FLIGHT sea 0) y por la capa que agrupa prompts
+        idénticos simultáneos (salvo que LLM_COALESCE_ENABLED sea false).
         """
-        return GeminiLLMClient(self.api_key, self.system_instruction)
+        # Dentro del despachador, para medir solo el tiempo del modelo y no la espera en cola
+        llm_client = TracingLLMClient(self._create_base_client())
+
+        max_in_flight = int(os.getenv('LLM_MAX_IN_FLIGHT', '8'))
+        if max_in_flight > 0:
+            llm_client = DispatchingLLMClient(
+                llm_client,
+                max_in_flight=max_in_flight,
+                max_queue=int(os.getenv('LLM_MAX_QUEUE', '16')),
+                queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', '30')),
+                retry_after=int(os.getenv('LLM_RETRY_AFTER', '1'))
+            )
+            register_gauges("llm_dispatcher", llm_client.stats)
+
+        if os.getenv('LLM_COALESCE_ENABLED', 'true').lower() == 'true':
+            # Fuera del despachador: las solicitudes agrupadas ocupan un solo lugar
+            llm_client = CoalescingLLMClient(
+                llm_client,
+                instruction_store=self.instruction_store,
+                follower_timeout=float(os.getenv('LLM_COALESCE_TIMEOUT', '60')),
+                retry_after=int(os.getenv('LLM_RETRY_AFTER', '1'))
+            )
+            register_gauges("llm_coalescing", llm_client.stats)
+
+        if os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true':
+            llm_client = CachingLLMClient(
+                llm_client,
+                backend=self._create_cache_backend(),
+                # El hash de las instrucciones vigentes lo agrega instruction_store en cada clave
+                namespace=build_cache_namespace(None, ','.join(self.model_names), self.generation_config),
+                skip_sessions=os.getenv('LLM_CACHE_SKIP_SESSIONS', 'true').lower() == 'true',
+                instruction_store=self.instruction_store,
+                # Los aciertos no llegan al cliente de Gemini: el turno se agrega aquí al historial
+                session_store=self.session_store
+            )
+            register_gauges("llm_cache", llm_client.stats)
+        return llm_client
 
-    def _load_system_instruction(self):
+    def create_semantic_cache(self):
         """
-        Carga las instrucciones del sistema desde el archivo system_instruction.txt.
+        Crea la caché semántica si SEMANTIC_CACHE_ENABLED=true; de lo contrario
+        retorna None. NumPy solo se importa cuando la caché está habilitada.
         """
-        import os
-        instruction_file_path = os.path.join(
-            os.path.dirname(__file__),
-            '..', '..', 'config', 'system_instruction.txt'
+        if os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() != 'true':
+            return None
+
+        from core.services.semantic_cache import HashingEmbedder, SemanticCache
+        logger.info("Caché semántica habilitada.")
+        semantic_cache = SemanticCache(
+            HashingEmbedder(dim=int(os.getenv('SEMANTIC_CACHE_DIM', '256'))),
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9')),
+            max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '10000')),
+            skip_sessions=os.getenv('LLM_CACHE_SKIP_SESSIONS', 'true').lower() == 'true'
         )
-        instruction_file_path = os.path.abspath(instruction_file_path)
-        logger.info("Buscando instrucciones del sistema en: %s", instruction_file_path)
+        register_gauges("semantic_cache", semantic_cache.stats)
+        return semantic_cache
+
+    def _create_cache_backend(self):
+        """
+        Crea el backend de la caché de respuestas: en memoria (por defecto)
+        o SQLite si LLM_CACHE_BACKEND=sqlite.
+        """
+        max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))
+        ttl = float(os.getenv('LLM_CACHE_TTL', '3600'))
+        if os.getenv('LLM_CACHE_BACKEND', 'memory').lower() == 'sqlite':
+            path = os.getenv('LLM_CACHE_PATH', 'response_cache.sqlite3')
+            logger.info("Usando caché de respuestas SQLite en: %s", path)
+            return SQLiteCacheBackend(path, max_entries=max_entries, ttl=ttl)
+        return MemoryCacheBackend(max_entries=max_entries, ttl=ttl)
+
+    def _create_conversation_repository(self):
+        """
+        Crea el repositorio persistente de conversaciones según CONVERSATION_STORE:
+        'mysql' (con los datos DB_*), 'sqlite' (CONVERSATION_DB_PATH) o 'none'
+        (por defecto, no se persiste). CONVERSATION_DB_URL reemplaza la URL armada.
+        SQLAlchemy solo se importa cuando el repositorio está habilitado.
+        """
+        backend = os.getenv('CONVERSATION_STORE', 'none').lower()
+        if backend == 'none':
+            return None
+
+        from sqlalchemy.engine import URL
+        from core.services.conversation_store import SQLConversationRepository
+        url = os.getenv('CONVERSATION_DB_URL')
+        if not url and backend == 'sqlite':
+            url = "sqlite:///" + os.getenv('CONVERSATION_DB_PATH', 'conversations.sqlite3')
+        elif not url and backend == 'mysql':
+            url = URL.create(
+                "mysql+mysqlconnector",
+                username=os.getenv('DB_USER'),
+                password=os.getenv('DB_PASSWORD'),
+                host=os.getenv('DB_HOST', 'localhost'),
+                port=int(os.getenv('DB_PORT', '3306')),
+                database=os.getenv('DB_NAME')
+            ).render_as_string(hide_password=False)
+        elif not url:
+            raise ValueError(f"CONVERSATION_STORE no válido: {backend} (use none, sqlite o mysql).")
+
+        repository = SQLConversationRepository(
+            url,
+            pool_size=int(os.getenv('CONVERSATION_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('CONVERSATION_POOL_MAX_OVERFLOW', '10')),
+            pool_recycle=int(os.getenv('CONVERSATION_POOL_RECYCLE', '3600')),
+            batch_size=int(os.getenv('CONVERSATION_BATCH_SIZE', '100')),
+            flush_interval=float(os.getenv('CONVERSATION_FLUSH_INTERVAL', '0.5')),
+            max_queue=int(os.getenv('CONVERSATION_MAX_QUEUE', '10000'))
+        )
+        register_gauges("conversation_store", repository.stats)
+        return repository
+
+    def _create_base_client(self):
+        """
+        Crea una instancia de GeminiLLMClient utilizando la configuración
+        actual (o FakeLLMClient si LLM_PROVIDER=fake). Si GEMINI_MODELS lista
+        varios modelos, retorna un RoutingLLMClient con un cliente por modelo
+        que comparten el mismo ChatSessionStore.
+        """
+        if self.provider == 'fake':
+            return FakeLLMClient(
+                first_chunk_delay=float(os.getenv('FAKE_LLM_FIRST_CHUNK_DELAY', '0')),
+                chunk_delay=float(os.getenv('FAKE_LLM_CHUNK_DELAY', '0')),
+                tokens_per_second=float(os.getenv('FAKE_LLM_TOKENS_PER_SECOND', '0')),
+                response_tokens=int(os.getenv('FAKE_LLM_RESPONSE_TOKENS', '0'))
+            )
+        session_store = ChatSessionStore(
+            max_sessions=int(os.getenv('CHAT_SESSION_MAX', '1000')),
+            idle_ttl=float(os.getenv('CHAT_SESSION_TTL', '1800')),
+            max_history_turns=int(os.getenv('CHAT_HISTORY_MAX_TURNS', '20')),
+            max_context_tokens=int(os.getenv('CHAT_CONTEXT_MAX_TOKENS', '8000')),
+            summary_max_tokens=int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', '400')),
+            # Las sesiones que no están en memoria se recuperan de la base de conversaciones
+            history_loader=self.conversation_repository.load_history if self.conversation_repository else None
+        )
+        self.session_store = session_store
+        register_gauges("chat_sessions", lambda: {"active": len(session_store)})
+        transport = self._create_transport()
+        if transport is not None:
+            register_gauges("gemini_transport", transport.stats)
+        clients = [
+            (model_name, GeminiLLMClient(self.api_key, self.instruction_store, session_store,
+                                         model_name=model_name, generation_config=self.generation_config,
+                                         transport=transport))
+            for model_name in self.model_names
+        ]
+        if len(clients) == 1:
+            return clients[0][1]
+        router = RoutingLLMClient(
+            clients,
+            hedge=os.getenv('LLM_HEDGE_ENABLED', 'true').lower() == 'true',
+            hedge_min_delay=float(os.getenv('LLM_HEDGE_MIN_DELAY', '0.5')),
+            failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30'))
+        )
+        for model_name, _ in clients:
+            register_gauges("llm_backend", lambda name=model_name: _backend_gauges(router, name), {"backend": model_name})
+        return router
+
+    def _create_transport(self):
+        """
+        Crea el transporte HTTP con pool de conexiones si GEMINI_TRANSPORT=http;
+        con 'sdk' (por defecto) retorna None y se usa el transporte del SDK.
+        El transporte se comparte entre todos los modelos configurados.
+        """
+        if os.getenv('GEMINI_TRANSPORT', 'sdk').lower() != 'http':
+            return None
+
+        from core.services.llm_impl.gemini_transport import HTTPGeminiTransport, DEFAULT_BASE_URL
+        return HTTPGeminiTransport(
+            self.api_key,
+            base_url=os.getenv('GEMINI_BASE_URL', DEFAULT_BASE_URL),
+            pool_size=int(os.getenv('GEMINI_POOL_SIZE', '16')),
+            connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '60')),
+            max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '3')),
+            backoff_base=float(os.getenv('GEMINI_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.getenv('GEMINI_BACKOFF_MAX', '8'))
+        )
+
+    def _load_instruction_store(self):
+        """
+        Carga las instrucciones del sistema desde config/system_instruction.txt
+        y sus variantes (system_instruction.txt.<nombre>), que se recargan al
+        cambiar cada SYSTEM_INSTRUCTION_POLL_INTERVAL segundos (0 desactiva la recarga).
+        """
+        config_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'config'))
+        logger.info("Buscando instrucciones del sistema en: %s", config_dir)
 
         try:
-            with open(instruction_file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            store = SystemInstructionStore(
+                config_dir, poll_interval=float(os.getenv('SYSTEM_INSTRUCTION_POLL_INTERVAL', '2'))
+            )
         except FileNotFoundError:
             logger.error("Error: El archivo system_instruction.txt no se encontró.")
             raise FileNotFoundError("El archivo system_instruction.txt no se encuentra en la ruta especificada.")
+        logger.info("Variantes de instrucciones disponibles: %s", store.variants())
+        return store
+
+
+def _backend_gauges(router: RoutingLLMClient, name: str) -> dict:
+    stats = router.stats()[name]
+    # El estado del breaker se publica como número para poder graficarlo
+    return {**stats, "breaker_open": int(stats["state"] != "closed")}
@@ -0,0 +1,257 @@
+"""
+Path: core/services/response_cache.py
+Caché de respuestas del LLM para prompts repetidos, con claves normalizadas
+y backends en memoria (LRU con TTL) o SQLite persistente.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterator, Optional
+from core.services.llm_client import ILLMClient
+
+logger = logging.getLogger("app_logger")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normaliza un prompt para usarlo como clave: sin acentos, en minúsculas
+    y con los espacios colapsados.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE_RE.sub(" ", without_accents.casefold()).strip()
+
+def build_cache_namespace(system_instruction: Optional[str], model_name: str, generation_config: dict) -> str:
+    """
+    Construye el prefijo de las claves a partir del hash de las instrucciones
+    del sistema y de los parámetros del modelo, de modo que un cambio en
+    cualquiera de ellos invalide las respuestas guardadas.
+    """
+    instruction_hash = hashlib.sha256((system_instruction or "").encode("utf-8")).hexdigest()
+    params = json.dumps({"model": model_name, **generation_config}, sort_keys=True)
+    return f"{instruction_hash}:{params}"
+
+
+class ICacheBackend(ABC):
+    """Interfaz para los almacenes de respuestas cacheadas."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Retorna la respuesta guardada o None si no existe o venció."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Guarda una respuesta."""
+        pass
+
+
+class MemoryCacheBackend(ICacheBackend):
+    """
+    Caché en memoria con desalojo LRU y expiración por TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self._clock() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCacheBackend(ICacheBackend):
+    """
+    Caché persistente en un archivo SQLite, de modo que las respuestas
+    sobrevivan a los reinicios del servidor. El límite de entradas se aplica
+    cada `PRUNE_EVERY` escrituras para no recorrer la tabla en cada una.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 86400.0, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_stored_at ON response_cache (stored_at)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._clock() - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, self._clock())
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                # Conserva solo las entradas más recientes
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key NOT IN ("
+                    "SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+
+class CachingLLMClient(ILLMClient):
+    """
+    Envuelve otro ILLMClient y reutiliza las respuestas de prompts equivalentes.
+    Con `skip_sessions` activado, las conversaciones con historial (session_id)
+    no se cachean porque su respuesta depende del contexto previo: solo se
+    cachean las solicitudes sin historial ("stateless"). Si se desactiva, un
+    acierto con session_id no llega al cliente envuelto, por lo que el turno se
+    agrega aquí a la sesión de `session_store` (si se indica) para que el
+    historial siga completo.
+    Si se indica `instruction_store`, la clave incluye el hash de la versión
+    vigente de la variante de instrucciones, de modo que una recarga invalida
+    las respuestas guardadas.
+    """
+
+    def __init__(self, llm_client: ILLMClient, backend: ICacheBackend, namespace: str = "",
+                 skip_sessions: bool = True, instruction_store=None, session_store=None):
+        self.llm_client = llm_client
+        self.backend = backend
+        self.namespace = namespace
+        self.skip_sessions = skip_sessions
+        self.instruction_store = instruction_store
+        self.session_store = session_store
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        logger.info("CachingLLMClient inicializado con backend %s.", backend.__class__.__name__)
+
+    def send_message(self, message: str, session_id: str = None, instruction: str = None) -> str:
+        if self._bypass(session_id):
+            return self.llm_client.send_message(message, session_id=session_id, instruction=instruction)
+
+        key = self._key(message, instruction)
+        cached = self._lookup(key)
+        if cached is not None:
+            self._append_to_session(session_id, message, cached)
+            return cached
+
+        response_text = self.llm_client.send_message(message, session_id=session_id, instruction=instruction)
+        self.backend.set(key, response_text)
+        return response_text
+
+    def stream_message(self, message: str, session_id: str = None, instruction: str = None) -> Iterator[str]:
+        if self._bypass(session_id):
+            return self.llm_client.stream_message(message, session_id=session_id, instruction=instruction)
+
+        key = self._key(message, instruction)
+        cached = self._lookup(key)
+        if cached is not None:
+            self._append_to_session(session_id, message, cached)
+            return iter([cached])
+        return self._store_when_complete(
+            key, self.llm_client.stream_message(message, session_id=session_id, instruction=instruction)
+        )
+
+    def stats(self) -> dict:
+        """
+        Retorna los contadores de aciertos, fallos y llamadas no cacheadas.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    def _bypass(self, session_id: Optional[str]) -> bool:
+        if self.skip_sessions and session_id is not None:
+            with self._lock:
+                self._bypassed += 1
+            return True
+        return False
+
+    def _append_to_session(self, session_id: Optional[str], message: str, response_text: str) -> None:
+        if session_id is None or self.session_store is None:
+            return
+        with self.session_store.session(session_id) as session:
+            session.append_turn(message, response_text)
+
+    def _key(self, message: str, instruction: str = None) -> str:
+        namespace = self.namespace
+        if self.instruction_store is not None:
+            namespace += "\x00" + self.instruction_store.get(instruction).digest
+        raw = f"{namespace}\x00{normalize_prompt(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        cached = self.backend.get(key)
+        with self._lock:
+            if cached is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if cached is not None:
+            logger.debug("Respuesta obtenida desde la caché (%s).", key[:12])
+        return cached
+
+    def _store_when_complete(self, key: str, chunks: Iterator[str]) -> Iterator[str]:
+        collected = []
+        for chunk in chunks:
+            collected.append(chunk)
+            yield chunk
+        # Solo se guarda si el stream se consumió completo
+        self.backend.set(key, "".join(collected))
@@ -4,75 +4,115 @@ Este módulo contiene una clase que genera respuestas utilizando un modelo de le
 manteniendo la lógica independiente de cualquier canal específico (web, Telegram, etc.).
 """
 
-from core.logs.config_logger import LoggerConfigurator
-from core.services.model_config import ModelConfig
+import logging
+from typing import Iterator
+from core.logs.payload_logging import log_payload
+from core.services.llm_client import ILLMClient
 
 # Configuración del logger
-logger = LoggerConfigurator().configure()
+logger = logging.getLogger("app_logger")
 
 class ResponseGenerator:
     """
     Clase que genera respuestas utilizando un modelo de lenguaje generativo.
     """
 
-    def __init__(self, model_config: ModelConfig):
+    def __init__(self, llm_client: ILLMClient, semantic_cache=None, instruction_store=None, session_store=None):
         """
-        Constructor que recibe una instancia de ModelConfig.
+        Constructor que recibe el cliente LLM a utilizar.
         
-        :param model_config: Instancia de la clase ModelConfig que contiene
-                             la configuración del modelo generativo.
+        :param llm_client: Instancia de ILLMClient que encapsula el modelo
+                           generativo y su sesión de chat.
+        :param semantic_cache: Instancia opcional de SemanticCache para reutilizar
+                               respuestas de prompts parecidos.
+        :param instruction_store: Almacén de instrucciones del sistema; el hash de
+                                  la versión vigente separa las entradas de la caché
+                                  semántica por variante y versión.
+        :param session_store: ChatSessionStore al que se agregan los turnos
+                              respondidos desde la caché semántica.
         """
-        self.model_config = model_config
-        self.model = self.model_config.model
+        self.llm_client = llm_client
+        self.semantic_cache = semantic_cache
+        self.instruction_store = instruction_store
+        self.session_store = session_store
         logger.info("ResponseGenerator inicializado con el modelo configurado.")
 
-    def generate_response(self, message_input: str) -> str:
+    def generate_response(self, message_input: str, session_id: str = None, instruction: str = None) -> str:
         """
         Genera una respuesta en base al mensaje de entrada, sin preocuparse
         por el canal desde el que proviene.
 
         :param message_input: El texto del mensaje de entrada.
+        :param session_id: Identificador de la conversación del usuario (opcional).
+        :param instruction: Variante de instrucciones del sistema (opcional).
         :return: El texto de la respuesta generada por el modelo.
         """
-        logger.info("Generando respuesta para el mensaje: %s", message_input)
-        self._start_chat_session()
+        log_payload(logger, logging.INFO, "Generando respuesta para el mensaje: %s", message_input)
+        use_semantic_cache = self.semantic_cache is not None and (
+            session_id is None or not self.semantic_cache.skip_sessions
+        )
+        if use_semantic_cache:
+            namespace = self._cache_namespace(instruction)
+            cached = self.semantic_cache.lookup(message_input, namespace)
+            if cached is not None:
+                logger.info("Respuesta obtenida desde la caché semántica.")
+                # El modelo no recibe este turno: se agrega aquí al historial de la sesión
+                if session_id is not None and self.session_store is not None:
+                    with self.session_store.session(session_id) as session:
+                        session.append_turn(message_input, cached)
+                return cached
         try:
-            response = self.chat_session.send_message(message_input)
-            logger.info("Respuesta generada: %s", response.text)
-            return response.text
+            response_text = self.llm_client.send_message(message_input, session_id=session_id, instruction=instruction)
+            log_payload(logger, logging.INFO, "Respuesta generada: %s", response_text)
+            if use_semantic_cache:
+                self.semantic_cache.add(message_input, response_text, namespace)
+            return response_text
         except Exception as e:
             logger.error("Error durante la generación de la respuesta: %s", e)
             raise
 
-    def generate_response_streaming(self, message_input: str, chunk_size: int = 30) -> str:
+    def _cache_namespace(self, instruction: str = None) -> str:
+        # Igual que las claves de CoalescingLLMClient: hash de la versión vigente de la variante
+        if self.instruction_store is not None:
+            return self.instruction_store.get(instruction).digest
+        return instruction or ""
+
+    def generate_response_stream(self, message_input: str, session_id: str = None,
+                                 instruction: str = None) -> Iterator[str]:
         """
-        Genera una respuesta en bloques de texto (streaming). La función retorna todo el texto al final,
-        pero internamente se divide en pequeños trozos para simular una lógica de streaming.
-        
+        Genera una respuesta en streaming, produciendo cada fragmento en cuanto
+        el modelo lo entrega.
+
         :param message_input: El texto del mensaje de entrada.
-        :param chunk_size: Tamaño de cada bloque que se lee del texto.
-        :return: Todo el texto de la respuesta generada, concatenado.
+        :param session_id: Identificador de la conversación del usuario (opcional).
+        :param instruction: Variante de instrucciones del sistema (opcional).
+        :return: Iterador de fragmentos de texto de la respuesta.
         """
-        logger.info("Generando respuesta en modo streaming para el mensaje: %s", message_input)
-        self._start_chat_session()
-        response = self.chat_session.send_message(message_input)
+        log_payload(logger, logging.INFO, "Generando respuesta en modo streaming para el mensaje: %s", message_input)
+        # La llamada al cliente se hace antes de iterar para que los rechazos
+        # (por ejemplo, por sobrecarga) ocurran antes de comenzar a responder.
+        chunks = self.llm_client.stream_message(message_input, session_id=session_id, instruction=instruction)
+        return self._log_chunks(chunks)
 
-        offset = 0
-        full_response = ""
-        while offset < len(response.text):
-            chunk = response.text[offset:offset + chunk_size]
-            full_response += chunk
-            # Loguea cada chunk para fines de debug, sin limpiar consola
+    def _log_chunks(self, chunks: Iterator[str]) -> Iterator[str]:
+        for chunk in chunks:
             logger.debug("Chunk generado: %s", chunk)
-            offset += chunk_size
-
-        logger.info("Respuesta completa (streaming simulada): %s", full_response)
-        return full_response
+            yield chunk
 
-    def _start_chat_session(self) -> None:
+    def generate_response_streaming(self, message_input: str, chunk_size: int = 30, session_id: str = None,
+                                    instruction: str = None) -> str:
         """
-        Inicia una nueva sesión de chat si no existe una.
+        Genera una respuesta en streaming y retorna todo el texto concatenado.
+        
+        :param message_input: El texto del mensaje de entrada.
+        :param chunk_size: Se conserva por compatibilidad; el tamaño de los
+                           fragmentos lo define el modelo.
+        :param session_id: Identificador de la conversación del usuario (opcional).
+        :param instruction: Variante de instrucciones del sistema (opcional).
+        :return: Todo el texto de la respuesta generada, concatenado.
         """
-        if not hasattr(self, 'chat_session'):
-            self.chat_session = self.model.start_chat()
-            logger.info("Sesión de chat iniciada con el modelo generativo.")
+        full_response = "".join(
+            self.generate_response_stream(message_input, session_id=session_id, instruction=instruction)
+        )
+        log_payload(logger, logging.INFO, "Respuesta completa (streaming): %s", full_response)
+        return full_response
@@ -0,0 +1,182 @@
+"""
+Path: core/services/semantic_cache.py
+Caché semántica de respuestas: reutiliza la respuesta de un prompt ya contestado
+cuando un prompt nuevo es lo bastante parecido (similitud coseno sobre embeddings
+locales guardados en una matriz de NumPy).
+"""
+
+import logging
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+import numpy as np
+from core.services.response_cache import normalize_prompt
+
+logger = logging.getLogger("app_logger")
+
+class IEmbedder(ABC):
+    """Interfaz para los generadores de embeddings de prompts."""
+
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Retorna una matriz (len(texts), dim) de vectores con norma L2 igual a 1.
+        """
+        pass
+
+
+class HashingEmbedder(IEmbedder):
+    """
+    Embedder offline basado en el "hashing trick": cuenta los n-gramas de
+    caracteres (y las palabras) del prompt normalizado en `dim` posiciones.
+    """
+
+    def __init__(self, dim: int = 256, ngram_sizes: Tuple[int, ...] = (3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(normalize_prompt(text)):
+                vectors[row, zlib.crc32(feature.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _features(self, text: str) -> List[str]:
+        padded = f" {text} "
+        features = text.split()
+        for size in self.ngram_sizes:
+            features.extend(padded[i:i + size] for i in range(len(padded) - size + 1))
+        return features
+
+
+class SemanticCache:
+    """
+    Guarda pares (prompt, respuesta) junto con el embedding del prompt en una
+    matriz preasignada. La búsqueda calcula la similitud coseno contra todas
+    las entradas con un único producto matriz-vector. Al alcanzar
+    `max_entries` se reemplazan las entradas más antiguas.
+
+    Cada entrada pertenece a un `namespace` (el hash de la versión de las
+    instrucciones del sistema con que se generó la respuesta) y solo se
+    compara con búsquedas del mismo namespace: tras recargar las
+    instrucciones, las respuestas anteriores dejan de coincidir.
+    """
+
+    def __init__(self, embedder: IEmbedder, threshold: float = 0.9, max_entries: int = 10000,
+                 skip_sessions: bool = True):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.skip_sessions = skip_sessions
+        self._matrix = np.zeros((min(max_entries, 1024), embedder.dim), dtype=np.float32)
+        self._answers: List[Optional[str]] = []
+        self._namespaces = np.zeros(self._matrix.shape[0], dtype=np.int32)
+        self._namespace_ids = {}
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def lookup(self, prompt: str, namespace: str = "") -> Optional[str]:
+        """
+        Retorna la respuesta guardada más parecida del `namespace` si supera el umbral.
+        """
+        matches = self.top_k(prompt, k=1, namespace=namespace)
+        if matches and matches[0][1] >= self.threshold:
+            with self._lock:
+                self._hits += 1
+            logger.debug("Acierto en la caché semántica (similitud %.3f).", matches[0][1])
+            return matches[0][0]
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def top_k(self, prompt: str, k: int = 5, namespace: str = "") -> List[Tuple[str, float]]:
+        """
+        Retorna hasta `k` pares (respuesta, similitud) del `namespace`
+        ordenados de mayor a menor.
+        """
+        query = self.embedder.embed([prompt])[0]
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if self._size == 0 or namespace_id is None:
+                return []
+            scores = self._matrix[:self._size] @ query
+            in_namespace = self._namespaces[:self._size] == namespace_id
+            if not in_namespace.all():
+                scores = np.where(in_namespace, scores, -np.inf)
+            k = min(k, int(np.count_nonzero(in_namespace)))
+            if k == 0:
+                return []
+            if k == 1:
+                best = [int(np.argmax(scores))]
+            else:
+                candidates = np.argpartition(-scores, k - 1)[:k]
+                best = candidates[np.argsort(-scores[candidates])]
+            return [(self._answers[i], float(scores[i])) for i in best]
+
+    def add(self, prompt: str, answer: str, namespace: str = "") -> None:
+        """
+        Agrega un prompt y su respuesta a la caché.
+        """
+        self.add_many([prompt], [answer], namespace)
+
+    def add_many(self, prompts: List[str], answers: List[str], namespace: str = "") -> None:
+        """
+        Agrega varios prompts del mismo `namespace` calculando sus embeddings
+        en un solo paso.
+        """
+        vectors = self.embedder.embed(prompts)
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None:
+                namespace_id = self._new_namespace_id(namespace)
+            for vector, answer in zip(vectors, answers):
+                self._ensure_capacity()
+                self._matrix[self._next] = vector
+                self._namespaces[self._next] = namespace_id
+                if self._next < len(self._answers):
+                    self._answers[self._next] = answer
+                else:
+                    self._answers.append(answer)
+                self._size = max(self._size, self._next + 1)
+                self._next = (self._next + 1) % self.max_entries
+
+    def stats(self) -> dict:
+        """
+        Retorna los contadores de aciertos y fallos y la cantidad de entradas.
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": self._size}
+
+    def _new_namespace_id(self, namespace: str) -> int:
+        # Los namespaces sin entradas (por ejemplo, de instrucciones ya
+        # recargadas cuyas filas fueron reemplazadas) se descartan y sus ids se
+        # reutilizan, así el mapa no crece con cada recarga
+        live = set(np.unique(self._namespaces[:self._size]).tolist())
+        self._namespace_ids = {name: namespace_id for name, namespace_id in self._namespace_ids.items()
+                               if namespace_id in live}
+        namespace_id = next(candidate for candidate in range(len(live) + 1) if candidate not in live)
+        self._namespace_ids[namespace] = namespace_id
+        return namespace_id
+
+    def _ensure_capacity(self) -> None:
+        if self._next < self._matrix.shape[0]:
+            return
+        new_rows = min(self._matrix.shape[0] * 2, self.max_entries)
+        grown = np.zeros((new_rows, self._matrix.shape[1]), dtype=np.float32)
+        grown[:self._matrix.shape[0]] = self._matrix
+        self._matrix = grown
+        self._namespaces = np.concatenate(
+            [self._namespaces, np.zeros(new_rows - self._namespaces.shape[0], dtype=np.int32)]
+        )
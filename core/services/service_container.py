@@ -0,0 +1,178 @@
+"""
+Path: core/services/service_container.py
+Contenedor que construye los servicios de la aplicación de forma diferida: nada
+se crea al importar ni al crear la app, sino en la primera solicitud de cada
+proceso. Tras un fork (por ejemplo, gunicorn con preload_app) el proceso hijo
+descarta lo construido por el padre y crea sus propios clientes.
+"""
+
+import logging
+import os
+import threading
+from core.channels.web_channel import WebMessagingChannel
+from core.channels.webhook_channel import WebhookMessagingChannel
+from core.observability.metrics import register_gauges
+from core.services.admission import AdmissionController, MemoryBucketBackend, SQLiteBucketBackend
+from core.services.data_service import DataService
+from core.services.data_validator import CompiledDataValidator, DataSchemaValidator
+from core.services.job_store import JobRunner, MemoryJobBackend, SQLiteJobBackend
+
+logger = logging.getLogger("app_logger")
+
+class ServiceContainer:
+    """
+    Crea y mantiene las instancias de ModelConfig, el cliente LLM,
+    ResponseGenerator y DataService.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data_service = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    @property
+    def data_service(self) -> DataService:
+        """
+        Retorna el DataService, construyéndolo en el primer acceso.
+        """
+        if self._data_service is None:
+            with self._lock:
+                if self._data_service is None:
+                    self._data_service = self._build_data_service()
+        return self._data_service
+
+    def _build_data_service(self) -> DataService:
+        # ModelConfig importa el SDK del LLM: se difiere hasta el primer uso
+        from core.services.model_config import ModelConfig
+        from core.services.response_generator import ResponseGenerator
+
+        logger.info("Construyendo servicios (pid %s).", os.getpid())
+        model_config = ModelConfig()
+        llm_client = model_config.create_llm_client()
+        response_generator = ResponseGenerator(llm_client, semantic_cache=model_config.create_semantic_cache(),
+                                               instruction_store=model_config.instruction_store,
+                                               session_store=model_config.session_store)
+
+        # DataService unifica validación y respuesta
+        return DataService(
+            validator=self._build_validator(),
+            response_generator=response_generator,
+            channel=WebMessagingChannel(),
+            batch_max_workers=int(os.getenv('BATCH_MAX_WORKERS', '4')),
+            instruction_store=model_config.instruction_store,
+            conversation_repository=model_config.conversation_repository,
+            job_runner=self._build_job_runner(),
+            admission=self._build_admission(),
+            chat_sessions_enabled=os.getenv('CHAT_SESSIONS_ENABLED', 'true').lower() == 'true',
+            webhook_channel=self._build_webhook_channel()
+        )
+
+    @staticmethod
+    def _build_validator() -> DataSchemaValidator:
+        # VALIDATION_MODE=marshmallow usa el esquema completo en cada solicitud
+        if os.getenv('VALIDATION_MODE', 'compiled').lower() == 'marshmallow':
+            return DataSchemaValidator()
+        return CompiledDataValidator()
+
+    @staticmethod
+    def _build_job_runner():
+        """
+        Crea el JobRunner del modo job de receive-data/ (salvo que JOBS_ENABLED
+        sea false). Con JOBS_BACKEND=sqlite los jobs se guardan en un archivo
+        local compartido por los workers, de modo que jobs/<id>/ responde desde
+        cualquiera; con 'memory' solo desde el que lo recibió, por lo que con
+        varios workers (SERVER_WORKERS, que fija gunicorn.conf.py) el modo job
+        se deshabilita. gunicorn.conf.py usa 'sqlite' por defecto con más de un
+        worker.
+        """
+        if os.getenv('JOBS_ENABLED', 'true').lower() != 'true':
+            return None
+
+        max_entries = int(os.getenv('JOBS_MAX_ENTRIES', '1000'))
+        ttl = float(os.getenv('JOBS_TTL', '3600'))
+        backend_name = os.getenv('JOBS_BACKEND', 'memory').lower()
+        server_workers = int(os.getenv('SERVER_WORKERS', '1'))
+        if backend_name != 'sqlite' and server_workers > 1:
+            logger.warning("Modo job deshabilitado: JOBS_BACKEND=%s guarda los jobs en cada worker y con %d workers "
+                           "jobs/<id>/ respondería 404 desde los demás. Use JOBS_BACKEND=sqlite.",
+                           backend_name, server_workers)
+            return None
+        if backend_name == 'sqlite':
+            path = os.getenv('JOBS_PATH', 'jobs.sqlite3')
+            logger.info("Usando almacén de jobs SQLite en: %s", path)
+            backend = SQLiteJobBackend(path, max_entries=max_entries, ttl=ttl)
+        else:
+            backend = MemoryJobBackend(max_entries=max_entries, ttl=ttl)
+        job_runner = JobRunner(
+            backend,
+            max_workers=int(os.getenv('JOBS_MAX_WORKERS', '4')),
+            max_pending=int(os.getenv('JOBS_MAX_PENDING', '64')),
+            progress_interval=float(os.getenv('JOBS_PROGRESS_INTERVAL', '0.25')),
+            retry_after=int(os.getenv('LLM_RETRY_AFTER', '1'))
+        )
+        register_gauges("jobs", job_runner.stats)
+        return job_runner
+
+    @staticmethod
+    def _build_admission():
+        """
+        Crea el control de admisión si ADMISSION_ENABLED=true. Con
+        ADMISSION_BACKEND=sqlite los buckets se comparten entre los workers;
+        con 'memory' (por defecto) cada worker aplica los límites por separado.
+        """
+        if os.getenv('ADMISSION_ENABLED', 'false').lower() != 'true':
+            return None
+
+        if os.getenv('ADMISSION_BACKEND', 'memory').lower() == 'sqlite':
+            path = os.getenv('ADMISSION_PATH', 'admission.sqlite3')
+            logger.info("Usando buckets de admisión SQLite en: %s", path)
+            backend = SQLiteBucketBackend(path)
+        else:
+            backend = MemoryBucketBackend(max_entries=int(os.getenv('ADMISSION_MAX_USERS', '10000')))
+        admission = AdmissionController(
+            backend,
+            user_rate=float(os.getenv('ADMISSION_USER_RATE', '1')),
+            user_burst=float(os.getenv('ADMISSION_USER_BURST', '10')),
+            global_rate=float(os.getenv('ADMISSION_GLOBAL_RATE', '0')),
+            global_burst=float(os.getenv('ADMISSION_GLOBAL_BURST', '100'))
+        )
+        register_gauges("admission", admission.stats)
+        return admission
+
+    @staticmethod
+    def _build_webhook_channel():
+        """
+        Crea el canal de webhooks si WEBHOOK_URL está definida: las
+        actualizaciones llegan a la ruta webhook/ y las respuestas se envían a
+        WEBHOOK_URL en segundo plano, repartidas por chat entre WEBHOOK_WORKERS
+        hilos y con hasta WEBHOOK_MAX_RETRIES reintentos.
+        """
+        url = os.getenv('WEBHOOK_URL')
+        if not url:
+            return None
+
+        channel = WebhookMessagingChannel(
+            url,
+            token=os.getenv('WEBHOOK_TOKEN') or None,
+            pool_size=int(os.getenv('WEBHOOK_POOL_SIZE', '4')),
+            connect_timeout=float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.getenv('WEBHOOK_READ_TIMEOUT', '15')),
+            workers=int(os.getenv('WEBHOOK_WORKERS', '2')),
+            max_queue=int(os.getenv('WEBHOOK_MAX_QUEUE', '1000')),
+            max_batch=int(os.getenv('WEBHOOK_MAX_BATCH', '100')),
+            batch_window=float(os.getenv('WEBHOOK_BATCH_WINDOW', '0.05')),
+            max_chars=int(os.getenv('WEBHOOK_MAX_CHARS', '4096')),
+            max_retries=int(os.getenv('WEBHOOK_MAX_RETRIES', '3')),
+            backoff_base=float(os.getenv('WEBHOOK_BACKOFF_BASE', '0.5')),
+            backoff_max=float(os.getenv('WEBHOOK_BACKOFF_MAX', '8')),
+            block_timeout=float(os.getenv('WEBHOOK_BLOCK_TIMEOUT', '0')),
+            retry_after=int(os.getenv('LLM_RETRY_AFTER', '1'))
+        )
+        register_gauges("outbound", channel.stats)
+        return channel
+
+    def _reset_after_fork(self) -> None:
+        # Los hilos, conexiones y locks del padre no son válidos en el hijo
+        self._lock = threading.Lock()
+        self._data_service = None
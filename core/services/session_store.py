@@ -0,0 +1,194 @@
+"""
+Path: core/services/session_store.py
+Almacén de sesiones de chat por usuario con tamaño acotado, desalojo LRU,
+expiración por inactividad y límite de turnos de historial.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+from core.services.token_budget import TurnSummary, approximate_tokens, content_tokens
+
+logger = logging.getLogger("app_logger")
+
+class ChatSessionEntry:
+    """
+    Historial de una conversación en el formato de contenidos de Gemini
+    (lista de diccionarios con 'role' y 'parts').
+
+    Si `max_context_tokens` es mayor a 0, el historial más el mensaje nuevo se
+    mantienen dentro de ese presupuesto de tokens de entrada, descontando
+    `reserved_tokens` (la system instruction, que contents_for actualiza con
+    la de cada solicitud). Los turnos que no entran se
+    descartan de a uno desde el más antiguo y se agregan a un resumen de hasta
+    `summary_max_tokens` tokens (0 los descarta sin resumir). El conteo de
+    tokens de cada turno se guarda para no recalcular el historial completo.
+    """
+
+    def __init__(self, max_history_turns: int, max_context_tokens: int = 0,
+                 reserved_tokens: int = 0, summary_max_tokens: int = 0):
+        self.max_history_turns = max_history_turns
+        self.max_context_tokens = max_context_tokens
+        self.reserved_tokens = reserved_tokens
+        self.history: List[dict] = []
+        self.history_tokens = 0
+        self.summary = TurnSummary(summary_max_tokens)
+        self.last_access = 0.0
+        self.lock = threading.Lock()
+        # False mientras falte cargar el historial persistido (ver ChatSessionStore.history_loader)
+        self.hydrated = True
+        self._turn_tokens: List[int] = []
+
+    def contents_for(self, message: str, reserved_tokens: Optional[int] = None) -> List[dict]:
+        """
+        Retorna el resumen (si lo hay) y el historial acotado seguidos del
+        nuevo mensaje del usuario. `reserved_tokens` son los tokens de la
+        system instruction con que se envía esta solicitud; si se omite se
+        mantiene el valor anterior.
+        """
+        if reserved_tokens is not None:
+            self.reserved_tokens = reserved_tokens
+        if self.max_context_tokens > 0:
+            self._trim_to_budget(approximate_tokens(message))
+        return self.summary.contents() + self.history + [{"role": "user", "parts": [message]}]
+
+    def append_turn(self, message: str, response_text: str) -> None:
+        """
+        Agrega un turno (mensaje del usuario + respuesta del modelo) y descarta
+        los turnos más antiguos que excedan el límite configurado.
+        """
+        user_content = {"role": "user", "parts": [message]}
+        model_content = {"role": "model", "parts": [response_text]}
+        self.history.append(user_content)
+        self.history.append(model_content)
+        self._turn_tokens.append(content_tokens(user_content) + content_tokens(model_content))
+        self.history_tokens += self._turn_tokens[-1]
+
+        while len(self._turn_tokens) > self.max_history_turns:
+            self._drop_oldest_turn()
+        if self.max_context_tokens > 0:
+            self._trim_to_budget(0)
+
+    def context_tokens(self, extra_tokens: int = 0) -> int:
+        """
+        Tokens de entrada estimados: system instruction, resumen, historial y
+        `extra_tokens` (el mensaje nuevo).
+        """
+        return self.reserved_tokens + self.summary.context_tokens + self.history_tokens + extra_tokens
+
+    def _trim_to_budget(self, extra_tokens: int) -> None:
+        while self._turn_tokens and self.context_tokens(extra_tokens) > self.max_context_tokens:
+            self._drop_oldest_turn()
+        if self.context_tokens(extra_tokens) > self.max_context_tokens and self.summary:
+            logger.debug("El resumen no entra en el presupuesto de contexto; se descarta.")
+            self.summary = TurnSummary(self.summary.max_tokens)
+
+    def _drop_oldest_turn(self) -> None:
+        user_content, model_content = self.history[0], self.history[1]
+        del self.history[:2]
+        self.history_tokens -= self._turn_tokens.pop(0)
+        self.summary.add_turn("".join(user_content["parts"]), "".join(model_content["parts"]))
+
+
+class ChatSessionStore:
+    """
+    Sesiones de chat indexadas por el id de usuario (`user_data.id`).
+    Mantiene como máximo `max_sessions` entradas, desaloja la menos usada
+    recientemente y descarta las que superan `idle_ttl` segundos sin uso.
+    Los parámetros de presupuesto de tokens se aplican a cada sesión
+    (ver ChatSessionEntry).
+
+    Si se indica `history_loader(session_id, limit)`, la primera vez que el
+    proceso ve a un usuario (o tras desalojar su sesión) se cargan sus últimos
+    turnos persistidos antes de usar la sesión.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 1800.0,
+                 max_history_turns: int = 20, clock=time.monotonic,
+                 max_context_tokens: int = 0, reserved_tokens: int = 0, summary_max_tokens: int = 0,
+                 history_loader: Optional[Callable[[str, int], List[Tuple[str, str]]]] = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history_turns = max_history_turns
+        self.max_context_tokens = max_context_tokens
+        self.reserved_tokens = reserved_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.history_loader = history_loader
+        self._clock = clock
+        self._sessions: "OrderedDict[str, ChatSessionEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @contextmanager
+    def session(self, session_id: Optional[str]) -> Iterator[ChatSessionEntry]:
+        """
+        Entrega la sesión del usuario bloqueada durante el uso, de modo que los
+        turnos concurrentes de un mismo usuario se apliquen en orden.
+        Si `session_id` es None se entrega una sesión efímera sin historial.
+        """
+        if session_id is None:
+            yield self._new_entry()
+            return
+
+        entry = self._get_or_create(session_id)
+        with entry.lock:
+            if not entry.hydrated:
+                self._hydrate(session_id, entry)
+            yield entry
+            entry.last_access = self._clock()
+
+    def discard(self, session_id: str) -> None:
+        """
+        Elimina la sesión indicada, si existe.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _get_or_create(self, session_id: str) -> ChatSessionEntry:
+        now = self._clock()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._new_entry()
+                entry.hydrated = self.history_loader is None
+                self._sessions[session_id] = entry
+                logger.debug("Sesión de chat creada para el usuario %s.", session_id)
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, _ = self._sessions.popitem(last=False)
+                    logger.debug("Sesión de chat desalojada (LRU): %s", evicted_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            entry.last_access = now
+            return entry
+
+    def _hydrate(self, session_id: str, entry: ChatSessionEntry) -> None:
+        # Se ejecuta con el lock de la sesión: otras solicitudes del mismo usuario esperan la carga
+        try:
+            turns = self.history_loader(session_id, self.max_history_turns)
+        except Exception as e:
+            logger.warning("No se pudo cargar el historial del usuario %s: %s", session_id, e)
+            turns = []
+        for message, response_text in turns:
+            entry.append_turn(message, response_text)
+        entry.hydrated = True
+        if turns:
+            logger.debug("Sesión del usuario %s recuperada con %d turnos.", session_id, len(turns))
+
+    def _new_entry(self) -> ChatSessionEntry:
+        return ChatSessionEntry(self.max_history_turns, self.max_context_tokens,
+                                self.reserved_tokens, self.summary_max_tokens)
+
+    def _evict_expired(self, now: float) -> None:
+        # Las sesiones están ordenadas por último uso: basta con revisar el inicio.
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_access <= self.idle_ttl:
+                break
+            del self._sessions[oldest_id]
+            logger.debug("Sesión de chat expirada por inactividad: %s", oldest_id)
@@ -0,0 +1,153 @@
+"""
+Path: core/services/system_instructions.py
+Almacén en memoria de las instrucciones del sistema, indexadas por el hash de
+su contenido, con variantes por nombre y recarga en caliente por mtime.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("app_logger")
+
+DEFAULT_VARIANT = "default"
+
+# Nombres de variante válidos: descarta las copias de respaldo de los editores
+# (por ejemplo, system_instruction.txt.example1~ o system_instruction.txt.example1.bak)
+_VARIANT_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+class UnknownInstructionError(ValueError):
+    """
+    Se lanza al pedir una variante de instrucciones que no existe.
+    """
+
+
+class SystemInstruction:
+    """
+    Versión inmutable de una instrucción del sistema. `digest` identifica el
+    contenido, de modo que dos variantes con el mismo texto comparten versión.
+    """
+
+    __slots__ = ("text", "digest")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class SystemInstructionStore:
+    """
+    Carga `base_name` (variante 'default') y los archivos `base_name.<variante>`
+    de `directory`, por ejemplo system_instruction.txt.example1.
+
+    Cada `poll_interval` segundos, la primera solicitud que llega revisa el mtime
+    de los archivos y recarga los que cambiaron. La tabla de variantes se
+    reemplaza de una sola vez, por lo que las solicitudes en curso siguen usando
+    la versión que ya obtuvieron. Con `poll_interval` 0 no se recarga.
+    """
+
+    def __init__(self, directory: Optional[str], base_name: str = "system_instruction.txt",
+                 poll_interval: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.directory = directory
+        self.base_name = base_name
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._reload_lock = threading.Lock()
+        self._variants: Dict[str, SystemInstruction] = {}
+        self._by_digest: Dict[str, SystemInstruction] = {}
+        self._file_stamps: Dict[str, tuple] = {}
+        self._last_check = clock()
+        if directory is not None:
+            self._scan()
+            if DEFAULT_VARIANT not in self._variants:
+                raise FileNotFoundError(f"No se encontró {base_name} en {directory}.")
+
+    @classmethod
+    def static(cls, text: Optional[str]) -> "SystemInstructionStore":
+        """
+        Crea un almacén con una única instrucción fija, sin archivos ni recarga.
+        """
+        store = cls(None, poll_interval=0)
+        store._variants = {DEFAULT_VARIANT: store._intern(text or "")}
+        return store
+
+    def get(self, variant: Optional[str] = None) -> SystemInstruction:
+        """
+        Retorna la versión vigente de la variante (la 'default' si es None).
+        """
+        self._maybe_reload()
+        try:
+            return self._variants[variant or DEFAULT_VARIANT]
+        except KeyError:
+            raise UnknownInstructionError(f"La variante de instrucciones '{variant}' no existe.") from None
+
+    def variants(self) -> List[str]:
+        return sorted(self._variants)
+
+    def _maybe_reload(self) -> None:
+        if self.directory is None or self.poll_interval <= 0:
+            return
+        if self._clock() - self._last_check < self.poll_interval:
+            return
+        # Un solo hilo revisa los archivos; los demás siguen con la versión actual
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = self._clock()
+            self._scan()
+        finally:
+            self._reload_lock.release()
+
+    def _scan(self) -> None:
+        variants = {}
+        stamps = {}
+        try:
+            file_names = os.listdir(self.directory)
+        except OSError as e:
+            logger.error("No se pudo leer el directorio de instrucciones %s: %s", self.directory, e)
+            return
+
+        for file_name in file_names:
+            variant = self._variant_name(file_name)
+            if variant is None:
+                continue
+            path = os.path.join(self.directory, file_name)
+            try:
+                stat = os.stat(path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                current = self._variants.get(variant)
+                if current is not None and self._file_stamps.get(path) == stamp:
+                    variants[variant] = current
+                else:
+                    with open(path, 'r', encoding='utf-8') as file:
+                        variants[variant] = self._intern(file.read())
+                    if current is not None and current.digest != variants[variant].digest:
+                        logger.info("Instrucciones '%s' recargadas (versión %s).", variant, variants[variant].digest)
+                stamps[path] = stamp
+            except OSError as e:
+                logger.error("No se pudo leer %s: %s", path, e)
+                if variant in self._variants:
+                    variants[variant] = self._variants[variant]
+
+        if DEFAULT_VARIANT not in variants and DEFAULT_VARIANT in self._variants:
+            logger.warning("%s no está disponible; se mantiene la versión anterior.", self.base_name)
+            variants[DEFAULT_VARIANT] = self._variants[DEFAULT_VARIANT]
+        self._file_stamps = stamps
+        self._variants = variants
+        self._by_digest = {instruction.digest: instruction for instruction in variants.values()}
+
+    def _variant_name(self, file_name: str) -> Optional[str]:
+        if file_name == self.base_name:
+            return DEFAULT_VARIANT
+        prefix = self.base_name + "."
+        if file_name.startswith(prefix) and _VARIANT_NAME.fullmatch(file_name[len(prefix):]):
+            return file_name[len(prefix):]
+        return None
+
+    def _intern(self, text: str) -> SystemInstruction:
+        instruction = SystemInstruction(text)
+        return self._by_digest.setdefault(instruction.digest, instruction)
@@ -0,0 +1,83 @@
+"""
+Path: core/services/token_budget.py
+Conteo aproximado de tokens (sin red) y resumen incremental de los turnos que
+se descartan del historial al superar el presupuesto de contexto.
+"""
+
+from collections import deque
+from typing import List
+
+CHARS_PER_TOKEN = 4
+
+def approximate_tokens(text: str) -> int:
+    """
+    Aproxima la cantidad de tokens de un texto como un token cada 4 caracteres
+    (redondeando hacia arriba), la misma proporción que usa FakeLLMClient.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+def content_tokens(content: dict) -> int:
+    """
+    Tokens de un contenido en formato Gemini ({'role', 'parts'}).
+    """
+    return sum(approximate_tokens(part) for part in content["parts"])
+
+
+class TurnSummary:
+    """
+    Resumen extractivo de los turnos descartados: una línea por turno con el
+    comienzo del mensaje del usuario y de la respuesta. Se actualiza de a un
+    turno, sin recorrer el historial completo; si supera `max_tokens` se
+    eliminan las líneas más antiguas.
+    """
+
+    HEADER = "Resumen de la conversación anterior:"
+    ACKNOWLEDGEMENT = "Entendido, tengo en cuenta ese contexto."
+    SNIPPET_CHARS = 160
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self._lines = deque()
+        self.tokens = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    @property
+    def context_tokens(self) -> int:
+        """
+        Tokens que ocupa el resumen en el contexto, incluidos el encabezado y
+        la respuesta fija del modelo.
+        """
+        if not self._lines:
+            return 0
+        return self.tokens + approximate_tokens(self.HEADER) + approximate_tokens(self.ACKNOWLEDGEMENT)
+
+    def add_turn(self, user_text: str, model_text: str) -> None:
+        if self.max_tokens <= 0:
+            return
+        line = f"- Usuario: {self._snippet(user_text)} / Asistente: {self._snippet(model_text)}"
+        self._lines.append((line, approximate_tokens(line) + 1))
+        self.tokens += self._lines[-1][1]
+        while self._lines and self.tokens > self.max_tokens:
+            _, tokens = self._lines.popleft()
+            self.tokens -= tokens
+
+    def contents(self) -> List[dict]:
+        """
+        Retorna el resumen como un intercambio inicial usuario/modelo, de modo
+        que el historial siga alternando roles.
+        """
+        if not self._lines:
+            return []
+        text = "\n".join([self.HEADER] + [line for line, _ in self._lines])
+        return [
+            {"role": "user", "parts": [text]},
+            {"role": "model", "parts": [self.ACKNOWLEDGEMENT]},
+        ]
+
+    def _snippet(self, text: str) -> str:
+        text = " ".join(text.split())
+        if len(text) <= self.SNIPPET_CHARS:
+            return text
+        return text[:self.SNIPPET_CHARS].rstrip() + "…"
@@ -0,0 +1,66 @@
+"""
+Path: gunicorn.conf.py
+Configuración de gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+
+Procesos e hilos se calculan con serve.autotune(). Los workers gthread (por
+defecto) o gevent permiten atender muchas solicitudes que esperan al LLM.
+Recarga sin cortar conexiones: kill -HUP <pid del master>.
+"""
+
+import os
+import shutil
+import tempfile
+from serve import autotune
+from core.observability import metrics
+
+_tuning = autotune()
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = _tuning["workers"]
+threads = _tuning["threads"]
+timeout = _tuning["timeout"]
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# La app se importa una vez en el master; los servicios (cliente LLM, sesiones)
+# se construyen en cada worker después del fork, en su primera solicitud.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Reinicia cada worker tras N solicitudes (con dispersión) para acotar la memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = '-'
+
+# Con varios workers, metrics/ suma los archivos que cada uno escribe en METRICS_DIR
+_temporary_metrics_dir = None
+if workers > 1 and not os.getenv('METRICS_DIR'):
+    _temporary_metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='madybot-metrics-')
+
+# Con varios workers, jobs/<id>/ puede llegar a cualquiera: los jobs van al
+# almacén SQLite compartido salvo que JOBS_BACKEND se fije a mano
+os.environ['SERVER_WORKERS'] = str(workers)
+if workers > 1:
+    os.environ.setdefault('JOBS_BACKEND', 'sqlite')
+
+
+def on_starting(server):
+    if os.getenv('METRICS_DIR'):
+        metrics.clear_directory(os.environ['METRICS_DIR'])
+
+
+def worker_exit(server, worker):
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    # El master suma los contadores del worker terminado al histórico
+    if os.getenv('METRICS_DIR'):
+        metrics.archive_worker(os.environ['METRICS_DIR'], worker.pid)
+
+
+def on_exit(server):
+    if _temporary_metrics_dir:
+        shutil.rmtree(_temporary_metrics_dir, ignore_errors=True)
@@ -1,2 +1,2 @@
 @echo off
-pipenv run python C:\AppServ\www\madybotpy_v2\main.py
+pipenv run python C:\AppServ\www\madybotpy_v2\serve.py --server waitress
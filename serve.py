@@ -0,0 +1,79 @@
+"""
+Path: serve.py
+Punto de entrada de producción. Calcula la cantidad de procesos e hilos a partir
+de los núcleos disponibles y de la latencia esperada del LLM, y levanta la
+aplicación con waitress (Windows / un solo proceso) o gunicorn (Linux).
+
+Uso:
+    python serve.py                      # waitress en 0.0.0.0:5000
+    python serve.py --server gunicorn    # gunicorn -c gunicorn.conf.py wsgi:app
+    python serve.py --print-config       # solo muestra la configuración calculada
+
+Recarga sin cortar conexiones (gunicorn): kill -HUP <pid del master>.
+"""
+
+import argparse
+import math
+import os
+import sys
+from typing import Dict
+
+
+def autotune(cpu_count: int = None) -> Dict[str, int]:
+    """
+    Calcula procesos e hilos para un servicio dominado por la espera del LLM.
+
+    Por la ley de Little, la concurrencia necesaria es TARGET_RPS multiplicado
+    por EXPECTED_LLM_LATENCY (con un margen del 25%). Se usa un proceso por
+    núcleo (mínimo 2) y los hilos se reparten para cubrir esa concurrencia.
+    WEB_CONCURRENCY y SERVER_THREADS permiten fijar los valores a mano.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    expected_latency = float(os.getenv('EXPECTED_LLM_LATENCY', '2.0'))
+    target_rps = float(os.getenv('TARGET_RPS', '20'))
+
+    workers = int(os.getenv('WEB_CONCURRENCY', max(2, cpu_count)))
+    concurrency = math.ceil(target_rps * expected_latency * 1.25)
+    threads = int(os.getenv('SERVER_THREADS', min(64, max(4, math.ceil(concurrency / workers)))))
+    return {
+        "workers": workers,
+        "threads": threads,
+        # El worker debe sobrevivir a la respuesta más lenta del LLM
+        "timeout": int(os.getenv('SERVER_TIMEOUT', max(30, math.ceil(expected_latency * 10)))),
+    }
+
+
+def serve_waitress(host: str, port: int, tuning: Dict[str, int]) -> None:
+    from waitress import serve
+    from app_flask import create_app
+
+    # waitress corre en un solo proceso: se usan todos los hilos calculados
+    serve(create_app(), host=host, port=port, threads=tuning["workers"] * tuning["threads"],
+          channel_timeout=tuning["timeout"])
+
+
+def serve_gunicorn(host: str, port: int) -> None:
+    os.environ.setdefault('BIND', f"{host}:{port}")
+    os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["waitress", "gunicorn"], default="waitress")
+    parser.add_argument("--host", default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument("--print-config", action="store_true")
+    args = parser.parse_args()
+
+    tuning = autotune()
+    if args.print_config:
+        print(tuning)
+        return
+    if args.server == "gunicorn":
+        serve_gunicorn(args.host, args.port)
+    else:
+        serve_waitress(args.host, args.port, tuning)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Path: tests/conftest.py
+Fixtures compartidas: la aplicación Flask con FakeLLMClient, para probar las
+rutas sin red ni API key de Gemini.
+"""
+
+import os
+import pytest
+
+ROOT_API = os.getenv('ROOT_API', '/')
+
+PAYLOAD = {
+    "prompt_user": "¿Cuál es el horario de atención?",
+    "stream": False,
+    "user_data": {"id": "usuario-0", "browserData": {
+        "userAgent": "Mozilla/5.0", "screenResolution": "1920x1080", "language": "es-AR", "platform": "Win32"}},
+    "datetime": 1737400000,
+}
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """
+    Retorna una función que crea la app con LLM_PROVIDER=fake y las
+    variables de entorno indicadas, y devuelve su cliente de pruebas. Los
+    servicios se construyen en la primera solicitud, con esas variables.
+    """
+    def make(**env):
+        settings = {"LLM_PROVIDER": "fake", "IS_DEVELOPMENT": "false", "LOG_ASYNC": "false", **env}
+        for name, value in settings.items():
+            monkeypatch.setenv(name, str(value))
+        from app_flask import create_app
+        return create_app().test_client()
+
+    return make
@@ -0,0 +1,50 @@
+"""
+Path: tests/test_admission.py
+Pruebas de los backends de token buckets: la limpieza de buckets no debe
+devolver la ráfaga a un usuario limitado, aunque la dispare el bucket global.
+"""
+
+from core.services.admission import MemoryBucketBackend, SQLiteBucketBackend
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def drain(backend, key: str, rate: float, burst: float) -> None:
+    while backend.take(key, rate, burst) == 0:
+        pass
+
+def test_memory_prune_keeps_throttled_users():
+    clock = FakeClock()
+    backend = MemoryBucketBackend(shards=1, max_entries=2, clock=clock)
+    drain(backend, "user:a", rate=0.01, burst=5)
+    # El global se llena enseguida: con sus parámetros el usuario parecería lleno
+    backend.take("global", 1000.0, 100)
+    clock.now += 1.0
+    backend.take("user:b", 0.01, 5)
+    backend.take("user:c", 0.01, 5)
+    assert backend.take("user:a", 0.01, 5) > 0
+
+def test_memory_prune_drops_full_buckets():
+    clock = FakeClock()
+    backend = MemoryBucketBackend(shards=1, max_entries=2, clock=clock)
+    backend.take("user:a", 1.0, 5)
+    backend.take("user:b", 1.0, 5)
+    clock.now += 10.0
+    backend.take("user:c", 1.0, 5)
+    assert len(backend) == 1
+
+def test_sqlite_prune_uses_each_bucket_parameters(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteBucketBackend, "PRUNE_EVERY", 4)
+    clock = FakeClock()
+    backend = SQLiteBucketBackend(str(tmp_path / "admission.sqlite3"), clock=clock)
+    drain(backend, "user:a", rate=0.01, burst=3)
+    clock.now += 1.0
+    for _ in range(4):
+        backend.take("global", 1000.0, 100)
+    assert backend.take("user:a", 0.01, 3) > 0
+    rows = {row[0] for row in backend._conn.execute("SELECT key FROM token_buckets")}
+    assert "user:a" in rows
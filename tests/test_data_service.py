@@ -0,0 +1,55 @@
+"""
+Path: tests/test_data_service.py
+Pruebas del registro de turnos de DataService: las solicitudes sin
+historial no se guardan en el repositorio de conversaciones.
+"""
+
+import pytest
+from core.channels.web_channel import WebMessagingChannel
+from core.services.data_service import DataService
+from core.services.data_validator import CompiledDataValidator
+from tests.conftest import PAYLOAD
+
+class RecordingRepository:
+    def __init__(self):
+        self.turns = []
+
+    def record_turn(self, chat_id, message, response, browser_data=None, instruction=None):
+        self.turns.append((chat_id, message, response))
+
+class EchoGenerator:
+    def generate_response(self, message, session_id=None, instruction=None):
+        return f"respuesta a {message}"
+
+    def generate_response_stream(self, message, session_id=None, instruction=None):
+        yield "respuesta "
+        yield f"a {message}"
+
+def make_service(**options):
+    repository = RecordingRepository()
+    service = DataService(CompiledDataValidator(), EchoGenerator(), WebMessagingChannel(),
+                          conversation_repository=repository, **options)
+    return service, repository
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_records_turns_with_history(stream):
+    service, repository = make_service()
+    result = service.process_incoming_data(dict(PAYLOAD, stream=stream))
+    text = result if isinstance(result, str) else "".join(result)
+
+    assert repository.turns == [("usuario-0", PAYLOAD["prompt_user"], text)]
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_skips_stateless_requests(stream):
+    service, repository = make_service()
+    result = service.process_incoming_data(dict(PAYLOAD, stream=stream, stateless=True))
+    if not isinstance(result, str):
+        "".join(result)
+
+    assert repository.turns == []
+
+def test_skips_turns_when_sessions_are_disabled():
+    service, repository = make_service(chat_sessions_enabled=False)
+    service.process_incoming_data(PAYLOAD)
+
+    assert repository.turns == []
@@ -0,0 +1,46 @@
+"""
+Path: tests/test_data_validator.py
+Equivalencia entre CompiledDataValidator y el esquema de marshmallow
+(DataSchemaValidator): para payloads válidos, inválidos y con tipos límite
+ambos deben devolver los mismos datos o los mismos mensajes de error. Los
+casos y las mutaciones son los de benchmarks/bench_validation.py.
+"""
+
+import random
+import pytest
+from benchmarks.bench_hot_path import PAYLOAD
+from benchmarks.bench_validation import FIXED_CASES, SAMPLE_VALUES, mutate, outcome
+from core.services.data_validator import CompiledDataValidator, DataSchemaValidator
+
+EDGE_CASES = [
+    {**PAYLOAD, "stateless": True},
+    {**PAYLOAD, "stateless": "no"},
+    {**PAYLOAD, "stateless": None},
+] + [{**PAYLOAD, field: value} for field in ("stream", "datetime", "prompt_user") for value in SAMPLE_VALUES]
+
+reference, compiled = DataSchemaValidator(), CompiledDataValidator()
+
+def assert_same(expected, actual) -> None:
+    # repr() compara también los NaN y distingue True de 1
+    assert repr(actual) == repr(expected)
+
+@pytest.mark.parametrize("case", FIXED_CASES + EDGE_CASES, ids=repr)
+def test_same_outcome(case):
+    assert_same(outcome(reference.validate, case), outcome(compiled.validate, case))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_same_outcome_for_mutations(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        case = mutate(rng, PAYLOAD)
+        assert_same(outcome(reference.validate, case), outcome(compiled.validate, case))
+
+@pytest.mark.parametrize("batch", [
+    FIXED_CASES,
+    [PAYLOAD] * 3,
+    [PAYLOAD, {}, {**PAYLOAD, "stream": "maybe"}],
+    [],
+    "lote",
+], ids=["fijos", "validos", "mixto", "vacio", "no_lista"])
+def test_same_outcome_for_batches(batch):
+    assert_same(outcome(reference.validate_many, batch), outcome(compiled.validate_many, batch))
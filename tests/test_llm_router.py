@@ -0,0 +1,106 @@
+"""
+Path: tests/test_llm_router.py
+RoutingLLMClient y CircuitBreaker con clientes simulados (FakeLLMClient):
+failover, hedging en modo normal y streaming, y una sola llamada de prueba
+en 'half_open'.
+"""
+
+import threading
+import time
+import pytest
+from core.services.llm_dispatcher import LLMOverloadedError
+from core.services.llm_impl.fake_llm import FakeLLMClient
+from core.services.llm_router import CircuitBreaker, RoutingLLMClient
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def open_breaker(clock: FakeClock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    return breaker
+
+def test_breaker_opens_and_rejects_until_reset():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    assert breaker.state == "open" and not breaker.allow() and not breaker.try_acquire()
+    clock.now = 10.0
+    assert breaker.state == "half_open" and breaker.allow()
+
+def test_half_open_admits_a_single_trial():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    barrier = threading.Barrier(8)
+    acquired = []
+
+    def trial():
+        barrier.wait()
+        acquired.append(breaker.try_acquire())
+
+    threads = [threading.Thread(target=trial) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert acquired.count(True) == 1
+    assert not breaker.allow()
+
+@pytest.mark.parametrize("succeeded, state", [(True, "closed"), (False, "open")])
+def test_trial_result_closes_or_reopens(succeeded, state):
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 10.0
+    assert breaker.try_acquire()
+    if succeeded:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    assert breaker.state == state
+    assert breaker.try_acquire() == succeeded
+
+def test_failover_to_the_next_backend():
+    router = RoutingLLMClient([("caido", FakeLLMClient(scripted_failures=[True])),
+                               ("sano", FakeLLMClient(response_text="ok"))], hedge=False, failure_threshold=2)
+    assert [router.send_message(f"mensaje {index}") for index in range(5)] == ["ok"] * 5
+    assert "".join(router.stream_message("streaming")) == "ok"
+    stats = router.stats()
+    assert stats["caido"]["state"] == "open" and stats["caido"]["errors_total"] == 2
+
+def test_all_backends_open_raises_overloaded():
+    router = RoutingLLMClient([("caido", FakeLLMClient(scripted_failures=[True]))],
+                              failure_threshold=1, reset_timeout=60)
+    with pytest.raises(RuntimeError):
+        router.send_message("hola")
+    with pytest.raises(LLMOverloadedError):
+        router.send_message("hola")
+
+def slow_and_fast_router() -> RoutingLLMClient:
+    # Sin historial ambos tienen puntaje 0 y se prueban en el orden configurado: "lento" primero
+    return RoutingLLMClient([("lento", FakeLLMClient(response_text="lento", first_chunk_delay=0.5)),
+                             ("rapido", FakeLLMClient(response_text="rapido", first_chunk_delay=0.02))],
+                            hedge=True, hedge_min_delay=0.05)
+
+def test_send_is_hedged_on_the_second_backend():
+    router = slow_and_fast_router()
+    start = time.perf_counter()
+    assert router.send_message("hola") == "rapido"
+    assert time.perf_counter() - start < 0.4
+    assert router.stats()["rapido"]["hedges_total"] == 1
+
+def test_stream_is_hedged_on_the_first_chunk():
+    router = slow_and_fast_router()
+    start = time.perf_counter()
+    assert "".join(router.stream_message("hola")) == "rapido"
+    assert time.perf_counter() - start < 0.4
+    stats = router.stats()
+    assert stats["rapido"]["hedges_total"] == 1 and stats["rapido"]["avg_ttft"] > 0
+
+def test_calls_with_session_are_not_hedged():
+    router = slow_and_fast_router()
+    assert "".join(router.stream_message("hola", session_id="usuario-1")) == "lento"
+    assert router.stats()["rapido"]["hedges_total"] == 0
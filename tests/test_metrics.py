@@ -0,0 +1,75 @@
+"""
+Path: tests/test_metrics.py
+Pruebas de la exportación en formato Prometheus: cada métrica forma un solo
+bloque tras su # TYPE, en un proceso y con METRICS_DIR.
+"""
+
+import pytest
+from core.observability import metrics
+
+def families(text: str) -> list:
+    """
+    Retorna el nombre de la familia de cada línea, en orden, y verifica que
+    cada muestra esté precedida por el # TYPE de su familia.
+    """
+    order, current = [], None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            current = line.split()[2]
+            order.append(current)
+        elif not line.startswith("#"):
+            sample = line.split("{")[0].split(" ")[0]
+            assert current is not None and sample.startswith(current), line
+            order.append(current)
+    return order
+
+def assert_grouped(text: str) -> None:
+    order = families(text)
+    blocks = [name for index, name in enumerate(order) if index == 0 or order[index - 1] != name]
+    assert len(blocks) == len(set(blocks)), blocks
+
+@pytest.fixture
+def labelled_sources():
+    # Dos fuentes con etiquetas distintas intercalan sus series al recolectarse
+    for backend in ("a", "b"):
+        metrics.register_gauges("test_router", lambda: {"in_flight": 1, "errors_total": 2}, {"backend": backend})
+    yield
+    for backend in ("a", "b"):
+        metrics._gauge_sources.pop(metrics.series_key("test_router", {"backend": backend}), None)
+
+def test_render_groups_interleaved_series():
+    snapshot = {
+        "counters": [
+            {"name": "requests_total", "labels": {"route": "a"}, "value": 1},
+            {"name": "errors_total", "labels": {"route": "a"}, "value": 1},
+            {"name": "requests_total", "labels": {"route": "b"}, "value": 2},
+        ],
+        "gauges": [
+            {"name": "queue_depth", "labels": {"worker": "1"}, "value": 3},
+            {"name": "in_flight", "labels": {"worker": "1"}, "value": 1},
+            {"name": "queue_depth", "labels": {"worker": "2"}, "value": 4},
+        ],
+        "histograms": [
+            {"name": "duration_ms", "labels": {"route": "a"}, "bounds": [10], "counts": [1, 0], "sum": 5, "count": 1},
+            {"name": "size_bytes", "labels": {}, "bounds": [10], "counts": [0, 1], "sum": 50, "count": 1},
+            {"name": "duration_ms", "labels": {"route": "b"}, "bounds": [10], "counts": [0, 1], "sum": 20, "count": 1},
+        ],
+    }
+    text = metrics.render_prometheus(snapshot)
+
+    assert_grouped(text)
+    assert text.count("# TYPE madybot_requests_total counter") == 1
+    assert text.count("# TYPE madybot_duration_ms histogram") == 1
+
+def test_single_process_gauges_are_grouped(labelled_sources):
+    metrics.configure_metrics(None)
+    assert_grouped(metrics.render_prometheus(metrics.collect()))
+
+def test_multiprocess_gauges_are_grouped(labelled_sources, tmp_path):
+    metrics.configure_metrics(str(tmp_path))
+    try:
+        text = metrics.render_prometheus(metrics.collect())
+    finally:
+        metrics.configure_metrics(None)
+    assert_grouped(text)
+    assert 'madybot_test_router_in_flight{backend="b"} 1' in text
@@ -0,0 +1,135 @@
+"""
+Path: tests/test_outbound_channel.py
+Pruebas de WebhookMessagingChannel y OutboundDispatcher contra el servidor
+local de benchmarks/webhook_stub.py, y de la ruta webhook/ de punta a punta.
+"""
+
+import threading
+import pytest
+from benchmarks.webhook_stub import WebhookStubServer
+from core.channels.outbound_dispatcher import OutboundDispatcher, OutboundQueueFullError
+from core.channels.webhook_channel import WebhookMessagingChannel
+from tests.conftest import ROOT_API
+
+@pytest.fixture
+def stub():
+    with WebhookStubServer() as server:
+        yield server
+
+def make_channel(url, **options):
+    # Sin esperas entre reintentos para que las pruebas sean rápidas
+    options = {"batch_window": 0.01, "sleep": lambda seconds: None, **options}
+    return WebhookMessagingChannel(url, **options)
+
+def test_delivers_each_chat_in_order(stub):
+    channel = make_channel(stub.url, workers=3)
+    expected = {}
+    for index in range(60):
+        chat_id = f"chat-{index % 6}"
+        channel.send_message(f"mensaje {index}", chat_id=chat_id)
+        expected.setdefault(chat_id, []).append(f"mensaje {index}")
+    assert channel.dispatcher.flush()
+    channel.close()
+
+    assert dict(stub.messages) == expected
+    # Los mensajes del mismo chat se agrupan en menos POSTs que mensajes
+    assert stub.requests < 60
+    assert channel.stats()["sent_total"] == 60
+
+def test_retries_retryable_errors(stub):
+    stub.fail_next(2, 503)
+    channel = make_channel(stub.url, workers=1)
+    channel.send_message("hola", chat_id="1")
+    assert channel.dispatcher.flush()
+    channel.close()
+
+    assert stub.messages["1"] == ["hola"]
+    stats = channel.stats()
+    assert stats["retries_total"] == 2
+    assert stats["failed_total"] == 0
+
+def test_does_not_retry_client_errors(stub):
+    stub.fail_next(1, 400)
+    channel = make_channel(stub.url, workers=1)
+    channel.send_message("hola", chat_id="1")
+    assert channel.dispatcher.flush()
+    channel.close()
+
+    assert stub.received() == 0
+    assert stub.requests == 1
+    assert channel.stats()["failed_total"] == 1
+
+def test_gives_up_after_max_retries(stub):
+    stub.fail_next(10, 503)
+    channel = make_channel(stub.url, workers=1, max_retries=2)
+    channel.send_message("hola", chat_id="1")
+    assert channel.dispatcher.flush()
+    channel.close()
+
+    assert stub.requests == 3
+    assert channel.stats()["failed_total"] == 1
+
+def test_splits_long_messages(stub):
+    text = ("Una oración de prueba. " * 40).strip()
+    channel = make_channel(stub.url, workers=1, max_chars=100)
+    channel.send_message(text, chat_id="1")
+    assert channel.dispatcher.flush()
+    channel.close()
+
+    chunks = stub.messages["1"]
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == text
+
+def test_full_queue_raises():
+    release = threading.Event()
+    dispatcher = OutboundDispatcher(lambda chat_id, texts: release.wait(5), workers=1, max_queue=2,
+                                    batch_window=0.0, retry_after=3)
+    try:
+        with pytest.raises(OutboundQueueFullError) as excinfo:
+            for index in range(10):
+                dispatcher.enqueue("1", f"mensaje {index}")
+        assert excinfo.value.retry_after == 3
+        assert dispatcher.stats()["rejected_total"] == 1
+    finally:
+        release.set()
+        dispatcher.close()
+
+UPDATE = {"update_id": 1, "message": {"text": "¿Cuál es el horario de atención?", "chat": {"id": 42}}}
+
+def webhook_channel_of(client):
+    return client.application.extensions['madybot_services'].data_service.webhook_channel
+
+def test_route_sends_the_response_to_the_webhook(make_client, stub):
+    client = make_client(WEBHOOK_URL=stub.url, WEBHOOK_SECRET="secreto", WEBHOOK_BATCH_WINDOW=0.01)
+    response = client.post(ROOT_API + "webhook/", json=UPDATE, headers={"X-Webhook-Secret": "secreto"})
+    assert response.status_code == 200
+
+    channel = webhook_channel_of(client)
+    assert channel.dispatcher.flush()
+    channel.close()
+    assert len(stub.messages["42"]) == 1
+    assert stub.messages["42"][0]
+
+def test_route_ignores_updates_without_text(make_client, stub):
+    client = make_client(WEBHOOK_URL=stub.url)
+    response = client.post(ROOT_API + "webhook/", json={"update_id": 2, "edited_message": {}})
+    assert response.status_code == 200
+
+    channel = webhook_channel_of(client)
+    assert channel.dispatcher.flush()
+    channel.close()
+    assert stub.requests == 0
+
+def test_route_rejects_an_invalid_secret(make_client, stub):
+    client = make_client(WEBHOOK_URL=stub.url, WEBHOOK_SECRET="secreto")
+    response = client.post(ROOT_API + "webhook/", json=UPDATE, headers={"X-Webhook-Secret": "otro"})
+    assert response.status_code == 403
+    webhook_channel_of(client).close()
+    assert stub.requests == 0
+
+def test_route_is_disabled_without_url(make_client, monkeypatch):
+    monkeypatch.delenv("WEBHOOK_URL", raising=False)
+    client = make_client()
+    response = client.post(ROOT_API + "webhook/", json=UPDATE)
+    assert response.status_code == 404
@@ -0,0 +1,42 @@
+"""
+Path: tests/test_semantic_cache.py
+Pruebas de los namespaces de SemanticCache: cada versión de las
+instrucciones solo ve sus respuestas y los namespaces sin entradas se
+descartan.
+"""
+
+from core.services.semantic_cache import HashingEmbedder, SemanticCache
+
+def make_cache(max_entries: int = 4) -> SemanticCache:
+    return SemanticCache(HashingEmbedder(dim=64), threshold=0.99, max_entries=max_entries)
+
+def test_lookups_only_match_their_namespace():
+    cache = make_cache()
+    cache.add("¿Cuál es el horario?", "respuesta v1", namespace="v1")
+    cache.add("¿Cuál es el horario?", "respuesta v2", namespace="v2")
+
+    assert cache.lookup("¿Cuál es el horario?", namespace="v1") == "respuesta v1"
+    assert cache.lookup("¿Cuál es el horario?", namespace="v2") == "respuesta v2"
+    assert cache.lookup("¿Cuál es el horario?", namespace="v3") is None
+
+def test_namespaces_without_entries_are_dropped():
+    cache = make_cache(max_entries=4)
+    for version in range(50):
+        cache.add("¿Cuál es el horario?", f"respuesta {version}", namespace=f"v{version}")
+
+    # Quedan los namespaces de las 4 entradas vigentes y, a lo sumo, uno ya reemplazado
+    assert len(cache._namespace_ids) <= 5
+    for version in range(46, 50):
+        assert cache.lookup("¿Cuál es el horario?", namespace=f"v{version}") == f"respuesta {version}"
+    assert cache.lookup("¿Cuál es el horario?", namespace="v0") is None
+
+def test_reused_ids_do_not_mix_namespaces():
+    cache = make_cache(max_entries=2)
+    cache.add("precio del envío", "envío v1", namespace="v1")
+    cache.add("horario de atención", "horario v1", namespace="v1")
+    # v1 sigue vigente: v2 recibe otro id aunque v1 tenga entradas
+    cache.add("precio del envío", "envío v2", namespace="v2")
+
+    assert cache.lookup("precio del envío", namespace="v2") == "envío v2"
+    assert cache.lookup("horario de atención", namespace="v1") == "horario v1"
+    assert cache.lookup("horario de atención", namespace="v2") is None
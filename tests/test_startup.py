@@ -0,0 +1,29 @@
+"""
+Path: tests/test_startup.py
+Protege los imports diferidos del arranque: importar app_flask (lo que hace
+el master de gunicorn con preload_app) no debe cargar el SDK de Gemini,
+NumPy ni SQLAlchemy; esos módulos se importan al construir los servicios.
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.bench_startup import ROOT, parse_importtime
+
+HEAVY_MODULES = ("google.generativeai", "numpy", "sqlalchemy")
+
+@pytest.fixture(scope="module")
+def imported_modules():
+    env = dict(os.environ, IS_DEVELOPMENT="false")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app_flask"], cwd=ROOT, env=env,
+                               capture_output=True, text=True, check=True)
+    return [name for name, _ in parse_importtime(completed.stderr)]
+
+def test_import_is_measured(imported_modules):
+    assert "app_flask" in imported_modules
+
+@pytest.mark.parametrize("heavy", HEAVY_MODULES)
+def test_heavy_modules_are_not_imported(imported_modules, heavy):
+    loaded = [name for name in imported_modules if name == heavy or name.startswith(heavy + ".")]
+    assert loaded == []
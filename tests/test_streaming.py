@@ -0,0 +1,30 @@
+"""
+Path: tests/test_streaming.py
+Tiempo hasta el primer fragmento de receive-data/ en modo streaming, con
+FakeLLMClient: el primer evento SSE debe llegar al cliente mientras el
+modelo todavía genera el resto de la respuesta.
+"""
+
+import json
+import time
+from tests.conftest import PAYLOAD, ROOT_API
+
+def test_first_sse_chunk_arrives_before_the_response_completes(make_client):
+    client = make_client(FAKE_LLM_CHUNK_DELAY=0.01, FAKE_LLM_RESPONSE_TOKENS=200)
+
+    start = time.perf_counter()
+    response = client.post(ROOT_API + 'receive-data/', json=dict(PAYLOAD, stream=True), buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    arrivals, events = [], []
+    for data in response.response:
+        arrivals.append(time.perf_counter() - start)
+        events.extend(line for line in data.decode("utf-8").split("\n") if line.startswith("data: "))
+    response.close()
+
+    chunks = [json.loads(event[len("data: "):])["response_MadyBot_stream"] for event in events]
+    assert len(chunks) > 10
+    assert "".join(chunk or "" for chunk in chunks).startswith("Respuesta simulada para:")
+    # Con ~27 fragmentos separados por 10 ms, el primero llega mucho antes que el último
+    assert arrivals[0] < arrivals[-1] / 2
@@ -0,0 +1,37 @@
+"""
+Path: tests/test_system_instructions.py
+Pruebas de las variantes de SystemInstructionStore y de su validación en
+DataService.
+"""
+
+import pytest
+from marshmallow import ValidationError
+from core.services.data_service import DataService
+from core.services.system_instructions import SystemInstructionStore, UnknownInstructionError
+
+@pytest.fixture
+def store(tmp_path):
+    for file_name, text in {
+        "system_instruction.txt": "Instrucciones base.",
+        "system_instruction.txt.ventas": "Instrucciones de ventas.",
+        "system_instruction.txt.soporte_2": "Instrucciones de soporte.",
+        "system_instruction.txt.ventas~": "Copia del editor.",
+        "system_instruction.txt.ventas.bak": "Respaldo.",
+        "system_instruction.txt.": "Sin nombre.",
+    }.items():
+        (tmp_path / file_name).write_text(text, encoding="utf-8")
+    return SystemInstructionStore(str(tmp_path), poll_interval=0)
+
+def test_only_well_formed_variant_names_are_loaded(store):
+    assert store.variants() == ["default", "soporte_2", "ventas"]
+    assert store.get("ventas").text == "Instrucciones de ventas."
+    with pytest.raises(UnknownInstructionError):
+        store.get("ventas.bak")
+
+def test_unknown_variant_is_a_validation_error(store):
+    service = DataService(validator=None, response_generator=None, channel=None, instruction_store=store)
+    assert service._check_instruction("ventas") == "ventas"
+    assert service._check_instruction(None) is None
+    with pytest.raises(ValidationError) as excinfo:
+        service._check_instruction("marketing")
+    assert "instruction" in excinfo.value.messages
@@ -0,0 +1,8 @@
+"""
+Path: wsgi.py
+Objeto WSGI para servidores de producción (gunicorn wsgi:app, waitress-serve wsgi:app).
+"""
+
+from app_flask import create_app
+
+app = create_app()